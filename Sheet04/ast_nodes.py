@@ -0,0 +1,159 @@
+# Kompakte AST-Knoten für den Parser: eine Klasse mit __slots__ pro Knotentyp
+#
+# Die Klassen heißen wie der "type" der Dicts, die der Parser sonst liefert, und
+# haben dieselben Felder in derselben Reihenfolge. Knoten brauchen keinen
+# __dict__ (deutlich weniger Speicher) und man verzweigt über isinstance statt
+# über Strings. Parser(..., nodes=ast_nodes) baut sie direkt; to_dict und
+# from_dict wandeln zwischen beiden Formen um (z.B. für pretty_print).
+
+
+class Node:
+    __slots__ = ()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+    def __hash__(self):
+        # Passend zu __eq__ über Typ und Felder (Listen als Tupel); ein Knoten in
+        # einem Set oder als Dict-Schlüssel darf danach nicht mehr geändert werden
+        return hash((type(self).__name__,) + tuple(_hashable(getattr(self, n)) for n in self.__slots__))
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+class Program(Node):
+    __slots__ = ("statements",)
+
+    def __init__(self, statements):
+        self.statements = statements
+
+
+class ExpressionSequence(Node):
+    __slots__ = ("expressions",)
+
+    def __init__(self, expressions):
+        self.expressions = expressions
+
+
+class Operation(Node):
+    __slots__ = ("operator", "operands")
+
+    def __init__(self, operator, operands):
+        self.operator = operator
+        self.operands = operands
+
+
+class FunctionDefinition(Node):
+    __slots__ = ("name", "parameters", "body")
+
+    def __init__(self, name, parameters, body):
+        self.name = name
+        self.parameters = parameters
+        self.body = body
+
+
+class FunctionCall(Node):
+    __slots__ = ("name", "arguments")
+
+    def __init__(self, name, arguments):
+        self.name = name
+        self.arguments = arguments
+
+
+class Definition(Node):
+    __slots__ = ("name", "value")
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+
+class Let(Node):
+    __slots__ = ("bindings", "body")
+
+    def __init__(self, bindings, body):
+        self.bindings = bindings
+        self.body = body
+
+
+class Binding(Node):
+    """Ein Binding von let; als Dict ohne "type" ({"name": ..., "value": ...})"""
+    __slots__ = ("name", "value")
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+
+class Number(Node):
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Boolean(Node):
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class String(Node):
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Identifier(Node):
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Comment(Node):
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+
+NODE_TYPES = {cls.__name__: cls for cls in (Program, ExpressionSequence, Operation, FunctionDefinition,
+                                            FunctionCall, Definition, Let, Number, Boolean, String,
+                                            Identifier, Comment)}
+
+
+def to_dict(value):
+    """Knoten (auch in Listen) in die Dict-Form des Parsers umwandeln"""
+    if isinstance(value, list):
+        return [to_dict(v) for v in value]
+    if isinstance(value, Binding):
+        return {"name": value.name, "value": to_dict(value.value)}
+    if isinstance(value, Node):
+        result = {"type": type(value).__name__}
+        for name in value.__slots__:
+            result[name] = to_dict(getattr(value, name))
+        return result
+    return value
+
+
+def from_dict(value):
+    """Dict-Form des Parsers (auch in Listen) in Knoten umwandeln"""
+    if isinstance(value, list):
+        return [from_dict(v) for v in value]
+    if isinstance(value, dict):
+        if "type" not in value:
+            return Binding(value["name"], from_dict(value["value"]))
+        cls = NODE_TYPES[value["type"]]
+        return cls(*(from_dict(value[name]) for name in cls.__slots__))
+    return value
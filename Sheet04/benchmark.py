@@ -0,0 +1,241 @@
+# Durchsatz des Lexers auf mehreren MB Eingabe, Parser mit und ohne Streaming,
+# AST als Dicts oder als Klassen mit __slots__, Fehlersuche mit und ohne Recovery,
+# Auswerter mit Rekursion und langen Listen
+# Aufruf: python Sheet04/benchmark.py [lexer] [parser] [ast] [recovery] [evaluator] [--mb 1 2 4 8]
+import argparse
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+from lexer import Lexer
+from parser import DictNodes, ParseError, Parser
+from evaluator import Evaluator
+import ast_nodes
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test.txt")
+
+
+def make_input(megabytes):
+    """test.txt so oft wiederholt, bis die Eingabe mindestens `megabytes` MB groß ist"""
+    with open(SAMPLE, "r") as f:
+        sample = f.read() + "\n"
+    return sample * (megabytes * 1024 * 1024 // len(sample) + 1)
+
+
+def count_tokens(lexer):
+    count = 0
+    for _ in lexer:
+        count += 1
+    return count
+
+
+def measure(make_lexer, size):
+    start = time.perf_counter()
+    tokens = count_tokens(make_lexer())
+    elapsed = time.perf_counter() - start
+    return tokens, elapsed, size / elapsed / 1024 / 1024, tokens / elapsed
+
+
+def measure_parser(path, streaming):
+    """(Zeit bis zum ersten Statement, Gesamtzeit, Statements, Spitzenspeicher) beim Parsen einer Datei"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    count = 0
+    with open(path, "r") as f:
+        if streaming:
+            for _ in Parser(f).statements():
+                if first is None:
+                    first = time.perf_counter() - start
+                count += 1
+        else:
+            count = len(Parser(f.read()).parse_start()["statements"])
+            first = time.perf_counter() - start
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, elapsed, count, peak
+
+
+def bench_lexer(sizes):
+    print(f"{'MB':>4}  {'Quelle':<6}  {'Tokens':>10}  {'Zeit s':>7}  {'MB/s':>6}  {'Tokens/s':>11}")
+    for megabytes in sizes:
+        text = make_input(megabytes)
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write(text)
+        try:
+            # Der Durchsatz sollte bei doppelter Größe gleich bleiben (linear)
+            for name, make_lexer in [("str", lambda: Lexer(text)), ("mmap", lambda: Lexer.from_file(f.name)),
+                                     ("stream", lambda: Lexer.from_stream(open(f.name, "r")))]:
+                tokens, elapsed, mb_per_s, tokens_per_s = measure(make_lexer, len(text))
+                print(f"{megabytes:>4}  {name:<6}  {tokens:>10,}  {elapsed:>7.2f}  {mb_per_s:>6.1f}  {tokens_per_s:>11,.0f}")
+        finally:
+            os.unlink(f.name)
+
+    # Lange Folgen eingerückter Leerzeilen im Stream: gelesener Whitespace muss verworfen
+    # werden, sonst wächst der Puffer und die Zeit quadratisch
+    print(f"\n{'Leerzeilen':>10}  {'Quelle':<6}  {'Zeit s':>7}  {'Zeilen/s':>11}")
+    for lines in (20_000, 40_000, 80_000):
+        text = "    \t\n" * lines + "(a)\n"
+        start = time.perf_counter()
+        tokens = count_tokens(Lexer.from_stream(io.StringIO(text)))
+        elapsed = time.perf_counter() - start
+        assert tokens == 3, tokens
+        print(f"{lines:>10,}  {'stream':<6}  {elapsed:>7.3f}  {lines / elapsed:>11,.0f}")
+
+
+def bench_parser(sizes):
+    # parse_start() sammelt alles, statements() liefert jedes Statement sofort (Speicher bleibt konstant)
+    megabytes = sizes[0]
+    print(f"\nParser auf {megabytes} MB (mit tracemalloc):")
+    print(f"{'Modus':<13}  {'erstes s':>8}  {'Zeit s':>7}  {'Statements':>10}  {'Spitze MB':>9}")
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write(make_input(megabytes))
+    try:
+        for name, streaming in [("parse_start", False), ("statements", True)]:
+            first, elapsed, count, peak = measure_parser(f.name, streaming)
+            print(f"{name:<13}  {first:>8.4f}  {elapsed:>7.2f}  {count:>10,}  {peak / 1024 / 1024:>9.2f}")
+    finally:
+        os.unlink(f.name)
+
+
+def bench_ast(sizes):
+    # Der ganze AST bleibt im Speicher; gemessen wird, was nach dem Parsen belegt ist
+    megabytes = sizes[0]
+    text = make_input(megabytes)
+    print(f"\nAST auf {megabytes} MB: Dicts vs. Klassen mit __slots__ (ast_nodes.py):")
+    print(f"{'Knoten':<8}  {'Parsen s':>8}  {'AST MB':>7}  {'to_dict s':>9}  {'from_dict s':>11}")
+    for name, nodes in [("dict", DictNodes), ("slots", ast_nodes)]:
+        start = time.perf_counter()
+        Parser(text, nodes=nodes).parse_start()
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        program = Parser(text, nodes=nodes).parse_start()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        if nodes is ast_nodes:
+            start = time.perf_counter()
+            as_dicts = ast_nodes.to_dict(program)
+            to_dict = f"{time.perf_counter() - start:.2f}"
+            start = time.perf_counter()
+            ast_nodes.from_dict(as_dicts)
+            from_dict = f"{time.perf_counter() - start:.2f}"
+        else:
+            to_dict = from_dict = "-"
+        del program
+        print(f"{name:<8}  {elapsed:>8.2f}  {size / 1024 / 1024:>7.2f}  {to_dict:>9}  {from_dict:>11}")
+
+
+# Fehlerhafte Varianten von (def v (+ i 1)), jede gibt genau einen Fehler;
+# dazu, ob das def trotzdem im AST landet
+BROKEN_STATEMENTS = [
+    ("(def v (+ {i} 1)", False),     # fehlende ')'
+    ("(def v (+ {i} 1)))", True),    # ')' zu viel
+    ("(def v ({i} 1))", False),      # Zahl statt Operator
+    ("(def v (+ {i} # 1))", False),  # ungültiges Zeichen
+]
+RECOVERY_LINES = 20_000
+
+
+def bench_recovery(sizes):
+    # Ohne Recovery braucht jeder Fehler einen neuen Lauf (Fehler beheben, neu parsen),
+    # parse_recovering() findet alle in einem Lauf
+    print(f"\nFehlersuche in {RECOVERY_LINES:,} Zeilen: ein parse_recovering() vs. ein Lauf pro Fehler:")
+    print(f"{'Fehler':>6}  {'recovering s':>12}  {'Läufe':>5}  {'abbrechend s':>12}  {'Faktor':>6}")
+    good = [f"(def v (+ {i} 1))" for i in range(RECOVERY_LINES)]
+    for errors in (10, 30, 100):
+        broken = {i * RECOVERY_LINES // errors: BROKEN_STATEMENTS[i % len(BROKEN_STATEMENTS)]
+                  for i in range(errors)}
+        lines = [broken[i][0].format(i=i) if i in broken else line for i, line in enumerate(good)]
+
+        start = time.perf_counter()
+        parser = Parser("\n".join(lines))
+        program = parser.parse_recovering()
+        recovering = time.perf_counter() - start
+        assert len(parser.errors) == errors, parser.errors
+        # Die fehlerfreien Zeilen bleiben im AST (ohne Fehler dazwischen als ExpressionSequence)
+        kept = sum(1 for _, survives in broken.values() if survives)
+        assert sum(len(stmt["expressions"]) if stmt["type"] == "ExpressionSequence" else 1
+                   for stmt in program["statements"]) == RECOVERY_LINES - errors + kept
+
+        aborting, runs = 0.0, 0
+        for fixed in range(errors + 1):
+            # Die ersten `fixed` Fehler sind schon behoben
+            for i in sorted(broken)[:fixed]:
+                lines[i] = good[i]
+            text = "\n".join(lines)
+            start = time.perf_counter()
+            try:
+                Parser(text).parse_start()
+            except (ParseError, SyntaxError):
+                pass
+            aborting += time.perf_counter() - start
+            runs += 1
+        print(f"{errors:>6}  {recovering:>12.3f}  {runs:>5}  {aborting:>12.2f}  {aborting / recovering:>6.1f}")
+
+
+RECURSION_PROGRAMS = [
+    ("fib 22", "(defn fib (n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))", "(fib 22)", 17711),
+    ("fac 20 x 2000", "(defn fac (n) (if (< n 2) 1 (* n (fac (- n 1)))))"
+                      " (defn rep (i acc) (if (= i 0) acc (rep (- i 1) (fac 20))))",
+     "(rep 2000 0)", 2432902008176640000),
+    ("countdown 200000", "(defn down (n) (if (= n 0) 0 (down (- n 1))))", "(down 200000)", 0),
+]
+
+# Summe, Länge und nth über eine Liste mit n Elementen: tail ist O(1), also linear in n
+LIST_PROGRAM = """
+(defn sum (l acc) (if (= l (list)) acc (sum (tail l) (+ acc (head l)))))
+(defn len (l acc) (if (= l (list)) acc (len (tail l) (+ acc 1))))
+(def v (list %s))
+"""
+
+
+def run_program(source):
+    evaluator = Evaluator(out=io.StringIO())
+    start = time.perf_counter()
+    result = evaluator.run(Parser(source).parse_start())
+    return result, time.perf_counter() - start
+
+
+def bench_evaluator(sizes):
+    print("\nAuswerter, rekursive Funktionen:")
+    print(f"{'Programm':<18}  {'Zeit s':>7}")
+    for name, definitions, call, expected in RECURSION_PROGRAMS:
+        result, elapsed = run_program(f"{definitions}\n{call}")
+        assert result == expected, (name, result)
+        print(f"{name:<18}  {elapsed:>7.2f}")
+
+    print("\nAuswerter, lange Listen (ohne Parsen und Aufbau der Liste):")
+    print(f"{'Elemente':>9}  {'Ausdruck':<12}  {'Zeit s':>7}  {'µs/Element':>10}")
+    for n in (10_000, 100_000, 400_000):
+        evaluator = Evaluator(out=io.StringIO())
+        evaluator.run(Parser(LIST_PROGRAM % " ".join(map(str, range(n)))).parse_start())
+        for expr, expected in [("(sum v 0)", n * (n - 1) // 2), ("(len v 0)", n), (f"(nth v {n - 1})", n - 1)]:
+            program = Parser(expr).parse_start()
+            start = time.perf_counter()
+            result = evaluator.run(program)
+            elapsed = time.perf_counter() - start
+            assert result == expected, (expr, result)
+            print(f"{n:>9,}  {expr.split()[0][1:]:<12}  {elapsed:>7.3f}  {elapsed / n * 1e6:>10.2f}")
+
+
+BENCHMARKS = {"lexer": bench_lexer, "parser": bench_parser, "ast": bench_ast, "recovery": bench_recovery,
+              "evaluator": bench_evaluator}
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmarks für Lexer, Parser und Auswerter")
+    arg_parser.add_argument("groups", nargs="*",
+                            help=f"Gruppen: {', '.join(BENCHMARKS)} (Standard: alle)")
+    arg_parser.add_argument("--mb", type=int, nargs="+", default=[1, 2, 4, 8],
+                            help="Eingabegrößen in MB für Lexer und Parser")
+    args = arg_parser.parse_args()
+    unknown = [g for g in args.groups if g not in BENCHMARKS]
+    if unknown:
+        arg_parser.error(f"Unbekannte Gruppe(n): {', '.join(unknown)}")
+    for group in args.groups or list(BENCHMARKS):
+        BENCHMARKS[group](args.mb)
@@ -0,0 +1,469 @@
+# Auswerter für die Lisp-artige Sprache (Ausgabe von Parser.parse_start)
+#
+# Die AST-Dicts werden zuerst in Python-Closures übersetzt. Dabei wird jede
+# Variable auf eine Adresse (Tiefe, Index) aufgelöst: wie viele Frames nach
+# außen, welcher Platz im Frame. Zur Laufzeit wird nie nach Namen gesucht.
+#
+# Ein Frame ist eine Python-Liste [äußerer Frame, Wert 1, Wert 2, ...]:
+# - der globale Frame (def, defn) wächst mit jeder neuen globalen Variable;
+#   Namen, die eine Funktion vor ihrer Definition benutzt (Rekursion), bekommen
+#   ihren Platz schon beim ersten Auftreten
+# - jeder Funktionsaufruf legt einen Frame für die Parameter an, dessen äußerer
+#   Frame der Frame der Definition ist (lexikalische Bindung)
+# - jedes let legt einen Frame für seine Bindings an (nacheinander gebunden,
+#   ein Binding sieht die vorherigen)
+#
+# Listen sind unveränderlich und teilen sich ihre Reste (Cons-Zellen), tail ist
+# damit O(1). Aufrufe in Endposition (Rumpf, Zweige von if, letzter Ausdruck von
+# do, Rumpf von let) laufen als Schleife, Rekursion über lange Listen braucht
+# keinen Python-Stack.
+#
+# Aufruf: python Sheet04/evaluator.py programm.txt
+import re
+import sys
+
+from parser import Parser, ParseError
+
+KEYWORDS = ("if", "do", "print", "str", "list", "nth", "head", "tail")
+
+
+class EvalError(Exception):
+    """Fehler beim Übersetzen oder Auswerten"""
+    pass
+
+
+class Cons:
+    """Listenzelle: erstes Element und Rest der Liste"""
+    __slots__ = ("head", "tail")
+
+    def __init__(self, head, tail):
+        self.head = head
+        self.tail = tail
+
+    def __iter__(self):
+        node = self
+        while node is not EMPTY:
+            yield node.head
+            node = node.tail
+
+
+# Die leere Liste
+EMPTY = Cons(None, None)
+
+
+def make_list(values):
+    result = EMPTY
+    for value in reversed(values):
+        result = Cons(value, result)
+    return result
+
+
+class Function:
+    """Mit defn definierte Funktion samt Frame ihrer Definition"""
+    __slots__ = ("name", "arity", "body", "env")
+
+    def __init__(self, name, arity, body, env):
+        self.name = name
+        self.arity = arity
+        self.body = body
+        self.env = env
+
+
+class TailCall:
+    """Aufruf in Endposition; wird vom aufrufenden call() ausgeführt"""
+    __slots__ = ("function", "args")
+
+    def __init__(self, function, args):
+        self.function = function
+        self.args = args
+
+
+# Globale Variable, die noch keinen Wert hat
+UNSET = object()
+
+
+def show(value, nested=False):
+    """Textform eines Werts für print und str"""
+    if value is None:
+        return "nil"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, Cons):
+        return "(" + " ".join(show(v, True) for v in value) + ")"
+    if isinstance(value, Function):
+        return f"<fn {value.name}>"
+    if nested and isinstance(value, str):
+        return f'"{value}"'
+    return str(value)
+
+
+def call(function, args):
+    """Ruft eine Funktion auf; Endaufrufe werden in der Schleife ausgeführt"""
+    while True:
+        if not isinstance(function, Function):
+            raise EvalError(f"{show(function)} ist keine Funktion")
+        if len(args) != function.arity:
+            raise EvalError(f"{function.name} erwartet {function.arity} Argumente, bekam {len(args)}")
+        result = function.body([function.env, *args])
+        if type(result) is not TailCall:
+            return result
+        function, args = result.function, result.args
+
+
+class Scope:
+    """Namen eines Frames beim Übersetzen: Name -> Index im Frame"""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.names = {}
+        self.size = 0
+
+    def add(self, name):
+        self.size += 1
+        self.names[name] = self.size
+        return self.size
+
+
+class Evaluator:
+    def __init__(self, out=None):
+        self.out = out if out is not None else sys.stdout
+        self.globals = Scope()
+        self.global_frame = [None]
+
+    # Programme
+
+    def run(self, program):
+        """Wertet die Ausgabe von parse_start aus; liefert den Wert des letzten Statements"""
+        result = None
+        for stmt in program["statements"]:
+            result = self.evaluate(stmt)
+        return result
+
+    def evaluate(self, stmt):
+        """Wertet ein Top-Level-Statement aus (auch einzeln aus Parser.statements())"""
+        if stmt["type"] == "ExpressionSequence":
+            result = None
+            for expr in stmt["expressions"]:
+                result = self.evaluate(expr)
+            return result
+        try:
+            return self.compile(stmt, self.globals, False)(self.global_frame)
+        except RecursionError:
+            # Nur Aufrufe in Endposition laufen ohne Python-Stack
+            raise EvalError("Rekursion zu tief (nur Aufrufe in Endposition sind unbegrenzt)")
+
+    # Variablen
+
+    def global_index(self, name):
+        index = self.globals.names.get(name)
+        if index is None:
+            index = self.globals.add(name)
+            self.global_frame.append(UNSET)
+        return index
+
+    def resolve(self, name, scope):
+        """(Tiefe, Index) einer Variable; unbekannte Namen werden global"""
+        depth = 0
+        while scope is not self.globals:
+            index = scope.names.get(name)
+            if index is not None:
+                return depth, index
+            scope = scope.parent
+            depth += 1
+        return depth, self.global_index(name)
+
+    def compile_load(self, name, scope):
+        depth, index = self.resolve(name, scope)
+        if self.global_depth(scope) == depth:
+            def load_global(env):
+                for _ in range(depth):
+                    env = env[0]
+                value = env[index]
+                if value is UNSET:
+                    raise EvalError(f"Unbekannte Variable {name}")
+                return value
+            return load_global
+        if depth == 0:
+            return lambda env: env[index]
+        if depth == 1:
+            return lambda env: env[0][index]
+
+        def load(env):
+            for _ in range(depth):
+                env = env[0]
+            return env[index]
+        return load
+
+    def global_depth(self, scope):
+        depth = 0
+        while scope is not self.globals:
+            scope = scope.parent
+            depth += 1
+        return depth
+
+    # Übersetzung: tail gibt an, ob der Ausdruck in Endposition einer Funktion steht
+
+    def compile(self, node, scope, tail):
+        kind = node["type"]
+        if kind == "Number" or kind == "Boolean":
+            value = node["value"]
+            return lambda env: value
+        if kind == "String":
+            value = unescape(node["value"][1:-1])
+            return lambda env: value
+        if kind == "Comment":
+            return lambda env: None
+        if kind == "Identifier":
+            return self.compile_load(node["name"], scope)
+        if kind == "Operation":
+            return self.compile_operation(node["operator"], [self.compile(o, scope, False) for o in node["operands"]])
+        if kind == "Definition":
+            return self.compile_def(node["name"], self.compile(node["value"], scope, False), scope)
+        if kind == "FunctionDefinition":
+            return self.compile_defn(node, scope)
+        if kind == "Let":
+            return self.compile_let(node, scope, tail)
+        if kind == "FunctionCall":
+            if node["name"] in KEYWORDS:
+                return self.compile_keyword(node["name"], node["arguments"], scope, tail)
+            return self.compile_call(node["name"], node["arguments"], scope, tail)
+        if kind == "ExpressionSequence":
+            raise EvalError("Eine Folge von Ausdrücken ist nur auf oberster Ebene erlaubt")
+        raise EvalError(f"Unbekannter Knoten {kind}")
+
+    def compile_def(self, name, value, scope):
+        # def bindet immer global, auch innerhalb von Funktionen
+        index = self.global_index(name)
+        depth = self.global_depth(scope)
+
+        def define(env):
+            result = value(env)
+            for _ in range(depth):
+                env = env[0]
+            env[index] = result
+            return result
+        return define
+
+    def compile_defn(self, node, scope):
+        name = node["name"]
+        # Der Name ist vor dem Rumpf bekannt, damit Rekursion ihn findet
+        self.global_index(name)
+        function_scope = Scope(scope)
+        for param in node["parameters"]:
+            function_scope.add(param)
+        body = self.compile(node["body"], function_scope, True)
+        arity = len(node["parameters"])
+        return self.compile_def(name, lambda env: Function(name, arity, body, env), scope)
+
+    def compile_let(self, node, scope, tail):
+        let_scope = Scope(scope)
+        values = []
+        for binding in node["bindings"]:
+            values.append(self.compile(binding["value"], let_scope, False))
+            let_scope.add(binding["name"])
+        body = self.compile(node["body"], let_scope, tail)
+
+        def let(env):
+            frame = [env]
+            for value in values:
+                frame.append(value(frame))
+            return body(frame)
+        return let
+
+    def compile_call(self, name, arguments, scope, tail):
+        function = self.compile_load(name, scope)
+        args = [self.compile(a, scope, False) for a in arguments]
+        if tail:
+            return lambda env: TailCall(function(env), [a(env) for a in args])
+        return lambda env: call(function(env), [a(env) for a in args])
+
+    def compile_keyword(self, name, arguments, scope, tail):
+        count = len(arguments)
+        arity = {"if": (2, 3), "do": (1, None), "print": (1, 1), "str": (1, None), "list": (0, None),
+                 "nth": (2, 2), "head": (1, 1), "tail": (1, 1)}[name]
+        if count < arity[0] or (arity[1] is not None and count > arity[1]):
+            raise EvalError(f"Falsche Anzahl Argumente für {name}: {count}")
+
+        if name == "if":
+            cond = self.compile(arguments[0], scope, False)
+            then = self.compile(arguments[1], scope, tail)
+            otherwise = self.compile(arguments[2], scope, tail) if count == 3 else (lambda env: None)
+
+            def if_(env):
+                value = cond(env)
+                if value is not False and value is not None:
+                    return then(env)
+                return otherwise(env)
+            return if_
+        if name == "do":
+            first = [self.compile(a, scope, False) for a in arguments[:-1]]
+            last = self.compile(arguments[-1], scope, tail)
+
+            def do(env):
+                for expr in first:
+                    expr(env)
+                return last(env)
+            return do
+
+        args = [self.compile(a, scope, False) for a in arguments]
+        if name == "print":
+            value, out = args[0], self.out
+
+            def print_(env):
+                print(show(value(env)), file=out)
+                return None
+            return print_
+        if name == "str":
+            return lambda env: "".join(show(a(env)) for a in args)
+        if name == "list":
+            return lambda env: make_list([a(env) for a in args])
+
+        lst = args[0]
+        if name == "head":
+            def head(env):
+                value = check_list(lst(env), "head")
+                if value is EMPTY:
+                    raise EvalError("head einer leeren Liste")
+                return value.head
+            return head
+        if name == "tail":
+            def tail_(env):
+                value = check_list(lst(env), "tail")
+                return value if value is EMPTY else value.tail
+            return tail_
+
+        index = args[1]
+
+        def nth(env):
+            node = check_list(lst(env), "nth")
+            n = index(env)
+            if type(n) is not int or n < 0:
+                raise EvalError(f"Ungültiger Index {show(n)}")
+            for _ in range(n):
+                if node is EMPTY:
+                    break
+                node = node.tail
+            if node is EMPTY:
+                raise EvalError(f"Index {n} außerhalb der Liste")
+            return node.head
+        return nth
+
+    def compile_operation(self, op, operands):
+        if op in "=<>":
+            return compile_comparison(op, operands)
+        if len(operands) == 1:
+            operand = operands[0]
+            if op == "-":
+                return lambda env: arithmetic("-", 0, operand(env))
+            return lambda env: check_operand(op, operand(env))
+        if len(operands) == 2:
+            a, b = operands
+            if op == "+":
+                def add(env):
+                    x, y = a(env), b(env)
+                    if type(x) is int and type(y) is int:
+                        return x + y
+                    return arithmetic("+", x, y)
+                return add
+            if op == "-":
+                def sub(env):
+                    x, y = a(env), b(env)
+                    if type(x) is int and type(y) is int:
+                        return x - y
+                    return arithmetic("-", x, y)
+                return sub
+            return lambda env: arithmetic(op, a(env), b(env))
+
+        def fold(env):
+            result = operands[0](env)
+            for operand in operands[1:]:
+                result = arithmetic(op, result, operand(env))
+            return result
+        return fold
+
+
+def compile_comparison(op, operands):
+    if len(operands) == 2:
+        a, b = operands
+        return lambda env: compare(op, a(env), b(env))
+
+    def chain(env):
+        values = [o(env) for o in operands]
+        return all(compare(op, x, y) for x, y in zip(values, values[1:]))
+    return chain
+
+
+def check_operand(op, value):
+    if type(value) is not int and not (op == "+" and type(value) is str):
+        raise EvalError(f"Operator {op} nicht anwendbar auf {show(value)}")
+    return value
+
+
+def arithmetic(op, x, y):
+    if type(x) is str and type(y) is str and op == "+":
+        return x + y
+    if type(x) is not int or type(y) is not int:
+        raise EvalError(f"Operator {op} nicht anwendbar auf {show(x, True)} und {show(y, True)}")
+    if op == "+":
+        return x + y
+    if op == "-":
+        return x - y
+    if op == "*":
+        return x * y
+    if y == 0:
+        raise EvalError("Division durch 0")
+    # Ganzzahldivision wie in Java: Richtung 0 gerundet
+    quotient = abs(x) // abs(y)
+    return quotient if (x < 0) == (y < 0) else -quotient
+
+
+def compare(op, x, y):
+    if type(x) is not type(y):
+        raise EvalError(f"Operator {op}: verschiedene Typen {show(x, True)} und {show(y, True)}")
+    if op == "=":
+        if type(x) is Cons:
+            return same_list(x, y)
+        return x == y
+    if type(x) is not int and type(x) is not str:
+        raise EvalError(f"Operator {op} nicht anwendbar auf {show(x, True)}")
+    return x < y if op == "<" else x > y
+
+
+def same_list(a, b):
+    while a is not b:
+        if a is EMPTY or b is EMPTY:
+            return False
+        if type(a.head) is not type(b.head) or not compare("=", a.head, b.head):
+            return False
+        a, b = a.tail, b.tail
+    return True
+
+
+def check_list(value, name):
+    if type(value) is not Cons:
+        raise EvalError(f"{name} erwartet eine Liste, bekam {show(value, True)}")
+    return value
+
+
+def unescape(text):
+    """Escape-Sequenzen in String-Literalen: \\n, \\t, sonst das Zeichen selbst"""
+    if "\\" not in text:
+        return text
+    return re.sub(r"\\(.)", lambda m: {"n": "\n", "t": "\t"}.get(m.group(1), m.group(1)), text, flags=re.DOTALL)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Aufruf: python Sheet04/evaluator.py programm.txt")
+        sys.exit(2)
+    evaluator = Evaluator()
+    try:
+        # Jedes Statement wird ausgewertet, sobald es gelesen ist
+        with open(sys.argv[1], "r") as f:
+            for stmt in Parser(f).statements():
+                evaluator.evaluate(stmt)
+    except (EvalError, ParseError, SyntaxError, EOFError) as e:
+        print(f"Fehler: {e}")
+        sys.exit(1)
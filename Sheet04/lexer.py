@@ -1,6 +1,7 @@
-import string
+import mmap
+import re
 # Aus Text input wird Tokenstream :daumen_hoch:
-# Welche Lexer-Regeln haben wir? 
+# Welche Lexer-Regeln haben wir?
 
 #NUM     : [0-9]+ ;
 #BOOL    : 'true' | 'false';
@@ -10,115 +11,182 @@ import string
 #ARITH   : [+\-*/];
 #WS      : [ \t\n]+ -> skip;
 #COMMENT : ';;' ~[\n]*;
-char = ''
 
-class Token: 
-    def __init__(self, type:str, content:str):
+# Ein Match pro Token: Whitespace davor wird mitgeschluckt, STRING und COMMENT
+# werden nur am ersten Zeichen erkannt und dann per find() zu Ende gelesen
+TOKEN_PATTERN = r'[ \t\n]*(?:(?P<NUM>[0-9]+)|(?P<ID>[a-z][a-zA-Z]*)|(?P<COMP>[=<>])|(?P<ARITH>[+\-*/])' \
+                r'|(?P<LBRACKET>\()|(?P<RBRACKET>\))|(?P<STRING>")|(?P<COMMENT>;)|(?P<EOF>\Z))'
+TOKEN_RE = re.compile(TOKEN_PATTERN)
+TOKEN_RE_BYTES = re.compile(TOKEN_PATTERN.encode())
+WS_RE = re.compile(r'[ \t\n]*')
+WS_RE_BYTES = re.compile(rb'[ \t\n]*')
+
+
+class Token:
+    def __init__(self, type:str, content:str, line:int=0, column:int=0):
         self.type = type
         self.content = content
+        # Position des ersten Zeichens: Zeile ab 1, Spalte ab 0
+        self.line = line
+        self.column = column
 
     def __str__(self):
         return f"<{self.type}, {self.content}>"
-    
+
     def __repr__(self) -> str:
         return f"<{self.type}, {self.content}>"
 
-class Lexer: 
-    def __init__(self, string): 
+class Lexer:
+    def __init__(self, string):
+        # str oder bytes-artig (bytes, mmap); pos läuft über die Eingabe,
+        # jedes Lexem wird genau einmal herausgeschnitten
         self.string = string
-        self.peek = ' '
+        self.pos = 0
+        self.text = isinstance(string, str)
+        if self.text:
+            self.token_re, self.ws_re = TOKEN_RE, WS_RE
+            self.quote, self.semicolon, self.newline = '"', ';', '\n'
+        else:
+            self.token_re, self.ws_re = TOKEN_RE_BYTES, WS_RE_BYTES
+            self.quote, self.semicolon, self.newline = b'"', b';', b'\n'
+        # Nur bei from_stream: Quelle für weitere Eingabe, None sobald sie erschöpft ist
+        self.stream = None
+        self.chunk_size = 0
+        # Absolute Position von string[0] (der gelesene Teil eines Streams wird verworfen)
+        self.offset = 0
+        # Zeilenzählung: Zeilenumbrüche sind bis zur absoluten Position counted gezählt
+        self.line = 1
+        self.line_start = 0
+        self.counted = 0
+
+    @classmethod
+    def from_file(cls, path):
+        """Lexer über eine memory-mapped Datei: die Datei wird nicht komplett eingelesen"""
+        with open(path, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Leere Dateien lassen sich nicht mappen
+                data = b""
+        return cls(data)
+
+    @classmethod
+    def from_stream(cls, stream, chunk_size=65536):
+        """Lexer über einen Text-Stream (Datei, Pipe, stdin), der stückweise gelesen wird
+
+        Es wird zeilenweise (höchstens chunk_size Zeichen) nachgelesen und nur
+        so weit, bis das nächste Token feststeht; ein ')' am Zeilenende wird
+        also sofort geliefert. Im Speicher liegt nur das aktuelle Token.
+        """
+        lexer = cls("")
+        lexer.stream = stream
+        lexer.chunk_size = chunk_size
+        return lexer
+
+    def __iter__(self):
+        """Tokens bis vor <EOF>, erst beim Iterieren gelext"""
+        while True:
+            token = self.nextToken()
+            if token.type == "<EOF>":
+                return
+            yield token
 
     def nextToken(self):
-        while self.peek != "<EOF>":
-            match(self.peek):  
-                case ' ' | '\t' | '\n': #WS
-                    self.consume() 
-                case _ if self.peek in string.digits: #NUM
-                    return self.digits()
-                case _ if self.peek in string.ascii_lowercase: #ID, BOOL
-                    return self.idOrBool()
-                case '"': #STRING
-                    return self.stringerama()
-                case "=" | "<" | ">": #COMP
-                    tmp = self.peek
-                    self.consume()
-                    return Token("COMP", tmp)
-                case "+" | "-" | "*" | "/": #ARITH
-                    tmp = self.peek
-                    self.consume()
-                    return Token("ARITH", tmp)
-                case ";" : #COMMENT
-                    return self.comment()
-                case '(':
-                    self.consume()
-                    return Token("LBRACKET", "(")
-                case ')': 
-                    self.consume()
-                    return Token("RBRACKET", ")")
-                case _: 
-                    raise SyntaxError(f'Invalid Character {self.peek}')
-            
-            #print(char)
-        return Token("<EOF>", "<EOF>")
-
-    def consume(self):
-        try: 
-            self.peek = self.string[0]
-            self.string = self.string[1:]
-        except IndexError: 
-            self.peek="<EOF>"
-
-    def idOrBool(self): 
-        buffer = ''
-        while(True): 
-            buffer += self.peek
-            self.consume()
-            if self.peek not in string.ascii_letters:
-                break
-        if buffer in ['true', 'false']:
-            return Token("BOOL", buffer)
-        return Token("ID", buffer) 
-    
-    def digits(self):
-        buffer = ''
-        while(True): 
-            buffer += self.peek
-            self.consume()
-            if self.peek not in string.digits:
-                return Token("NUM", buffer)
-            
-    def stringerama(self):
-        buffer = ''
-        while(True): 
-            buffer += self.peek
-            self.consume()
-            if self.peek == '"':
-                buffer+=self.peek
-                self.consume()
-                return Token("STRING", buffer)
-            if self.peek == '<EOF>':
-                raise EOFError
-    
-    def comment(self):
-        buffer = ''
-        full_comment = False
-        while(True): 
-            buffer += self.peek
-            self.consume()
-            #print(self.peek)
-            if self.peek == ';':
-                full_comment = True
-            if full_comment and self.peek == "\n":
+        while True:
+            s = self.string
+            m = self.token_re.match(s, self.pos)
+            if m is None:
+                pos = self.ws_re.match(s, self.pos).end()
+                self.move(pos)
+                raise SyntaxError(f'Invalid Character {self.char(pos)}')
+            kind = m.lastgroup
+            start = m.start(kind)
+            end = self.token_end(s, kind, start, m)
+            if end is not None:
                 break
-            if self.peek == "<EOF>":
-                break
-        return Token("COMMENT", buffer)
+            # Das Token kann im nächsten Stück des Streams weitergehen; der Whitespace
+            # davor ist gelesen und wird mit verworfen (sonst sammeln sich Leerzeilen an)
+            self.move(start)
+            self.fill()
+
+        line, column = self.move(start)
+        if kind == "EOF":
+            return Token("<EOF>", "<EOF>", line, column)
+        if kind == "STRING" or kind == "COMMENT":
+            self.move(end)
+        else:
+            # Kein Zeilenumbruch im Lexem
+            self.pos = end
+            self.counted = self.offset + end
+
+        content = s[start:end]
+        if not self.text:
+            content = content.decode("utf-8")
+        if kind == "ID" and content in ('true', 'false'):
+            kind = "BOOL"
+        return Token(kind, content, line, column)
+
+    def token_end(self, s, kind, start, m):
+        """Ende des Tokens im Puffer, None wenn erst mehr vom Stream gelesen werden muss"""
+        more = self.stream is not None
+        if kind == "STRING":
+            end = s.find(self.quote, start + 1)
+            if end >= 0:
+                return end + 1
+            if more:
+                return None
+            self.move(len(s))
+            raise EOFError
+        if kind == "COMMENT":
+            # Wie bisher: der Kommentar endet am ersten Zeilenende nach einem
+            # weiteren ';' (das Zeilenende selbst gehört nicht dazu)
+            second = s.find(self.semicolon, start + 1)
+            end = s.find(self.newline, second + 1) if second >= 0 else -1
+            if end >= 0:
+                return end
+            return None if more else len(s)
+        if kind == "EOF":
+            return None if more else start
+        end = m.end()
+        if more and end == len(s) and kind in ("NUM", "ID"):
+            # Zahlen und Namen könnten im nächsten Stück weitergehen
+            return None
+        return end
+
+    def fill(self):
+        """Liest das nächste Stück des Streams; der schon gelexte Teil wird verworfen"""
+        chunk = self.stream.readline(self.chunk_size)
+        if not chunk:
+            self.stream = None
+            return
+        self.offset += self.pos
+        self.string = self.string[self.pos:] + chunk
+        self.pos = 0
+
+    def move(self, pos):
+        """Setzt pos und zählt die Zeilen bis dorthin; liefert (Zeile, Spalte) von pos"""
+        target = self.offset + pos
+        if target > self.counted:
+            s, begin = self.string, self.counted - self.offset
+            last = s.rfind(self.newline, begin, pos)
+            if last >= 0:
+                # mmap kann nicht zählen, nur finden
+                self.line += s.count(self.newline, begin, pos) if self.text else s[begin:pos].count(self.newline)
+                self.line_start = self.offset + last + 1
+            self.counted = target
+        self.pos = pos
+        return self.line, target - self.line_start
+
+    def char(self, pos):
+        if self.text:
+            return self.string[pos]
+        return bytes(self.string[pos:pos + 4]).decode("utf-8", errors="replace")[0]
 
 if __name__ == "__main__":
     tokens = []
     with open("Sheet04/test.txt", "r") as f:
         mylex = Lexer(f.read())
-        while True: 
+        while True:
             tokens.append(mylex.nextToken())
             if tokens[-1].type == "<EOF>":
                 break
@@ -3,18 +3,68 @@ from lexer import Lexer, Token
 
 class ParseError(Exception):
     """Exception für Parser-Fehler"""
-    pass
+    def __init__(self, message: str, token: Token = None):
+        # Position des Tokens, an dem der Fehler auftrat
+        self.line = token.line if token is not None else None
+        self.column = token.column if token is not None else None
+        if token is not None:
+            message = f"{message} (Zeile {token.line}, Spalte {token.column})"
+        super().__init__(message)
+
+class DictNodes:
+    """Knoten als Dicts (Standard); ast_nodes hat Klassen mit denselben Namen und Feldern"""
+    Program = staticmethod(lambda statements: {"type": "Program", "statements": statements})
+    ExpressionSequence = staticmethod(lambda expressions: {"type": "ExpressionSequence", "expressions": expressions})
+    Operation = staticmethod(lambda operator, operands: {"type": "Operation", "operator": operator, "operands": operands})
+    FunctionDefinition = staticmethod(lambda name, parameters, body: {
+        "type": "FunctionDefinition", "name": name, "parameters": parameters, "body": body})
+    FunctionCall = staticmethod(lambda name, arguments: {"type": "FunctionCall", "name": name, "arguments": arguments})
+    Definition = staticmethod(lambda name, value: {"type": "Definition", "name": name, "value": value})
+    Let = staticmethod(lambda bindings, body: {"type": "Let", "bindings": bindings, "body": body})
+    Binding = staticmethod(lambda name, value: {"name": name, "value": value})
+    Number = staticmethod(lambda value: {"type": "Number", "value": value})
+    Boolean = staticmethod(lambda value: {"type": "Boolean", "value": value})
+    String = staticmethod(lambda value: {"type": "String", "value": value})
+    Identifier = staticmethod(lambda name: {"type": "Identifier", "name": name})
+    Comment = staticmethod(lambda text: {"type": "Comment", "text": text})
 
 class Parser:
-    def __init__(self, input_string: str):
-        """Initialisiert den Parser mit einem Input-String"""
-        self.lexer = Lexer(input_string)
-        self.current_token: Token
+    def __init__(self, input_string, nodes=DictNodes):
+        """Initialisiert den Parser mit einem Input-String oder einem Text-Stream (Datei, stdin)
+
+        nodes baut die AST-Knoten: DictNodes (Dicts) oder das Modul ast_nodes (Klassen mit __slots__)
+        """
+        self.nodes = nodes
+        if isinstance(input_string, str):
+            self.lexer = Lexer(input_string)
+        else:
+            self.lexer = Lexer.from_stream(input_string)
+        self.token: Token = None
         self.advance()  # Lese das erste Token
-    
+        # Offene Klammern im aktuellen Top-Level-Statement (für parse_recovering)
+        self.depth = 0
+        # Von parse_recovering gesammelte Fehler
+        self.errors = []
+
+    @property
+    def current_token(self) -> Token:
+        """Das aktuelle Token; wird erst gelesen, wenn es gebraucht wird"""
+        if self.token is None:
+            self.token = self.lexer.nextToken()
+        return self.token
+
     def advance(self):
-        """Liest das nächste Token vom Lexer"""
-        self.current_token = self.lexer.nextToken()
+        """Geht zum nächsten Token weiter (gelesen wird es erst bei Bedarf)"""
+        self.token = None
+
+    def error(self, expected: str) -> ParseError:
+        """ParseError für ein unerwartetes aktuelles Token"""
+        token = self.current_token
+        return ParseError(
+            f"Erwartetes Token: {expected}, "
+            f"Tatsächliches Token: <{token.type}, {token.content}>",
+            token
+        )
     
     def match(self, expected_type: str):
         """
@@ -25,12 +75,13 @@ class Parser:
         if self.current_token.type == expected_type:
             token = self.current_token
             self.advance()
+            if expected_type == "LBRACKET":
+                self.depth += 1
+            elif expected_type == "RBRACKET":
+                self.depth -= 1
             return token
         else:
-            raise ParseError(
-                f"Erwartetes Token: {expected_type}, "
-                f"Tatsächliches Token: <{self.current_token.type}, {self.current_token.content}>"
-            )
+            raise self.error(expected_type)
     
     def check(self, token_type):
         """
@@ -53,7 +104,7 @@ class Parser:
                 continue
             stmt = self.parse_stmt()
             statements.append(stmt)
-        return {"type": "Program", "statements": statements}
+        return self.nodes.Program(statements)
     
     # stmt: literal | expr+
     def parse_stmt(self):
@@ -67,7 +118,7 @@ class Parser:
                 expressions.append(self.parse_expr())
             if len(expressions) == 1:
                 return expressions[0]
-            return {"type": "ExpressionSequence", "expressions": expressions}
+            return self.nodes.ExpressionSequence(expressions)
         else:
             # literal
             return self.parse_literal()
@@ -95,7 +146,7 @@ class Parser:
                 self.advance()
             
             self.match("RBRACKET")
-            return {"type": "Operation", "operator": op, "operands": operands}
+            return self.nodes.Operation(op, operands)
         
         elif self.check("ID"):
             # Könnte function oder functioncall sein
@@ -118,10 +169,7 @@ class Parser:
             return result
         
         else:
-            raise ParseError(
-                f"Erwartetes Token: COMP, ARITH oder ID am Anfang einer Expression, "
-                f"Tatsächliches Token: <{self.current_token.type}, {self.current_token.content}>"
-            )
+            raise self.error("COMP, ARITH oder ID am Anfang einer Expression")
     
     # operator: COMP | ARITH
     def parse_operator(self):
@@ -133,10 +181,7 @@ class Parser:
         elif self.check("ARITH"):
             return self.match("ARITH").content
         else:
-            raise ParseError(
-                f"Erwartetes Token: COMP oder ARITH, "
-                f"Tatsächliches Token: <{self.current_token.type}, {self.current_token.content}>"
-            )
+            raise self.error("COMP oder ARITH")
     
     # literal: NUM | ID | BOOL | COMMENT | STRING
     def parse_literal(self):
@@ -145,24 +190,21 @@ class Parser:
         """
         if self.check("NUM"):
             token = self.match("NUM")
-            return {"type": "Number", "value": int(token.content)}
+            return self.nodes.Number(int(token.content))
         elif self.check("BOOL"):
             token = self.match("BOOL")
-            return {"type": "Boolean", "value": token.content == "true"}
+            return self.nodes.Boolean(token.content == "true")
         elif self.check("STRING"):
             token = self.match("STRING")
-            return {"type": "String", "value": token.content}
+            return self.nodes.String(token.content)
         elif self.check("ID"):
             token = self.match("ID")
-            return {"type": "Identifier", "name": token.content}
+            return self.nodes.Identifier(token.content)
         elif self.check("COMMENT"):
             token = self.match("COMMENT")
-            return {"type": "Comment", "text": token.content}
+            return self.nodes.Comment(token.content)
         else:
-            raise ParseError(
-                f"Erwartetes Token: NUM, ID, BOOL, COMMENT oder STRING, "
-                f"Tatsächliches Token: <{self.current_token.type}, {self.current_token.content}>"
-            )
+            raise self.error("NUM, ID, BOOL, COMMENT oder STRING")
     
     # function: 'defn' ID '(' (ID)* ')' expr
     def parse_function(self):
@@ -173,7 +215,8 @@ class Parser:
         if defn_token.content != "defn":
             raise ParseError(
                 f"Erwartetes Token: 'defn', "
-                f"Tatsächliches Token: <ID, {defn_token.content}>"
+                f"Tatsächliches Token: <ID, {defn_token.content}>",
+                defn_token
             )
         
         name = self.match("ID")
@@ -190,12 +233,7 @@ class Parser:
         # Function body
         body = self.parse_expr()
         
-        return {
-            "type": "FunctionDefinition",
-            "name": name.content,
-            "parameters": parameters,
-            "body": body
-        }
+        return self.nodes.FunctionDefinition(name.content, parameters, body)
     
     # functioncall: ID (literal | expr)+
     def parse_functioncall(self):
@@ -211,11 +249,7 @@ class Parser:
             else:
                 arguments.append(self.parse_literal())
         
-        return {
-            "type": "FunctionCall",
-            "name": name.content,
-            "arguments": arguments
-        }
+        return self.nodes.FunctionCall(name.content, arguments)
     
     def parse_special_form(self):
         """
@@ -231,11 +265,7 @@ class Parser:
             else:
                 value = self.parse_literal()
             
-            return {
-                "type": "Definition",
-                "name": name.content,
-                "value": value
-            }
+            return self.nodes.Definition(name.content, value)
         
         elif keyword.content == "let":
             # (let (bindings...) body)
@@ -259,7 +289,7 @@ class Parser:
                     value = self.parse_expr()
                 else:
                     value = self.parse_literal()
-                bindings.append({"name": name.content, "value": value})
+                bindings.append(self.nodes.Binding(name.content, value))
                 
                 # Überspringe Kommentare nach dem Wert
                 while self.check("COMMENT"):
@@ -274,11 +304,7 @@ class Parser:
             # Body
             body = self.parse_expr()
             
-            return {
-                "type": "Let",
-                "bindings": bindings,
-                "body": body
-            }
+            return self.nodes.Let(bindings, body)
         
         else:
             # Fallback: behandle als function call
@@ -289,12 +315,104 @@ class Parser:
                 else:
                     arguments.append(self.parse_literal())
             
-            return {
-                "type": "FunctionCall",
-                "name": keyword.content,
-                "arguments": arguments
-            }
+            return self.nodes.FunctionCall(keyword.content, arguments)
     
+    def statements(self):
+        """
+        Generator über die Top-Level-Statements von start -> stmt*, ohne sie zu sammeln:
+        jede Top-Level-Expression wird geliefert, sobald ihre schließende Klammer
+        gelesen ist. Anders als bei parse_start() wird eine Folge von Expressions
+        ((a) (b)) nicht zu einer ExpressionSequence zusammengefasst, denn dafür
+        müsste auf das Token nach ihr gewartet werden; Kommentare werden wie dort
+        übersprungen.
+        """
+        while not self.check("<EOF>"):
+            if self.check("COMMENT"):
+                self.advance()
+                continue
+            if self.check("LBRACKET"):
+                yield self.parse_expr()
+            else:
+                yield self.parse_literal()
+
+    def parse_recovering(self):
+        """
+        Wie parse_start(), bricht aber beim ersten Fehler nicht ab (panic mode):
+        jeder Fehler wird als ParseError in self.errors gesammelt, der Rest des
+        fehlerhaften Top-Level-Statements übersprungen und danach weitergeparst.
+        Liefert ein Program mit allen fehlerfreien Statements; ohne Fehler ist es
+        dasselbe wie bei parse_start().
+        """
+        self.errors = []
+        statements = []
+        expressions = []  # expr+ des aktuellen stmt
+
+        def end_sequence():
+            if len(expressions) == 1:
+                statements.append(expressions[0])
+            elif expressions:
+                statements.append(self.nodes.ExpressionSequence(list(expressions)))
+            expressions.clear()
+
+        while True:
+            self.depth = 0
+            try:
+                if self.check("LBRACKET"):
+                    expressions.append(self.parse_expr())
+                    continue
+                end_sequence()
+                if self.check("<EOF>"):
+                    return self.nodes.Program(statements)
+                if self.check("COMMENT"):
+                    self.advance()
+                else:
+                    statements.append(self.parse_literal())
+            except (ParseError, SyntaxError, EOFError) as e:
+                # Ein Statement mit Fehler beendet auch die Folge von Expressions davor
+                end_sequence()
+                self.synchronize(e)
+
+    def synchronize(self, error):
+        """
+        Merkt sich den Fehler und überspringt Tokens bis zum Ende des fehlerhaften
+        Top-Level-Statements: bis zur ')', mit der die Klammertiefe wieder 0 ist.
+        Fehlt eine ')', endet das Statement schon vor einem '(' in Spalte 0, das als
+        Anfang des nächsten Statements gilt (sonst ginge der Rest der Datei verloren).
+        """
+        self.errors.append(self.to_parse_error(error))
+        if self.depth == 0:
+            # Fehler auf oberster Ebene: nur das fehlerhafte Token überspringen
+            if self.token is not None and self.token.type != "<EOF>":
+                self.advance()
+            return
+        while self.depth > 0:
+            try:
+                token = self.current_token
+            except (SyntaxError, EOFError) as e:
+                self.errors.append(self.to_parse_error(e))
+                continue
+            if token.type == "<EOF>" or token.type == "LBRACKET" and token.column == 0:
+                return
+            if token.type == "LBRACKET":
+                self.depth += 1
+            elif token.type == "RBRACKET":
+                self.depth -= 1
+            self.advance()
+
+    def to_parse_error(self, error):
+        """ParseError mit Position; bei Fehlern des Lexers wird die Eingabe dahinter fortgesetzt"""
+        if isinstance(error, ParseError):
+            return error
+        pos = self.lexer.pos
+        line, column = self.lexer.move(pos)
+        if isinstance(error, EOFError):
+            # Der Lexer steht schon am Ende der Eingabe
+            return ParseError("String ohne schließendes '\"'", Token("<EOF>", "<EOF>", line, column))
+        char = self.lexer.char(pos)
+        # Das ungültige Zeichen überspringen
+        self.lexer.move(pos + 1)
+        return ParseError(str(error), Token("INVALID", char, line, column))
+
     def parse(self):
         """
         Hauptmethode zum Parsen des gesamten Programms
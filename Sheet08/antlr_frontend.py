@@ -0,0 +1,97 @@
+from __future__ import annotations
+from typing import Optional, Tuple
+
+from antlr4 import CommonTokenStream, InputStream, ParserRuleContext
+from antlr4.PredictionContext import PredictionContextCache
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.dfa.DFA import DFA
+from antlr4.error.ErrorListener import ErrorListener
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+
+from gen.MiniCParser import MiniCParser
+from fast_lexer import create_lexer
+
+
+"""
+Two-stage ANTLR parsing
+
+Front-end for MiniCParser used wherever the ANTLR parser runs (the "antlr"
+parser of fast_parser.py, test.py). Every parse first runs with SLL
+prediction and the BailErrorStrategy, which is cheaper than full LL and
+correct for every input SLL can decide. Only if that stage fails (a syntax
+error, or an input that needs full-context prediction) the input is parsed
+again from the start with LL prediction and the default error strategy, so
+errors are reported and recovered from exactly as before.
+
+Both stages use the DFA cache the generated parser keeps in class attributes
+(decisionsToDFA, sharedContextCache), so it is shared by every MiniCParser
+of the process. warm_up() fills it with the decisions of a program that
+covers the grammar, so the first file of a batch run does not pay for
+learning them; clear_dfa_cache() starts over (used by benchmark.py).
+"""
+
+
+class FrontendStats:
+    def __init__(self):
+        self.sll_parses = 0
+        self.ll_fallbacks = 0
+
+    def __repr__(self):
+        return f"<FrontendStats sll_parses={self.sll_parses} ll_fallbacks={self.ll_fallbacks}>"
+
+
+stats = FrontendStats()
+
+
+def parse_rule(token_stream: CommonTokenStream, rule: str = "program",
+               error_listener: Optional[ErrorListener] = None) -> Tuple[MiniCParser, ParserRuleContext]:
+    """Parse tree of a rule: SLL with bail-out first, full LL with error reporting on failure
+
+    Returns the parser too, so callers can check getNumberOfSyntaxErrors().
+    """
+    parser = MiniCParser(token_stream)
+    parser.removeErrorListeners()
+    parser._interp.predictionMode = PredictionMode.SLL
+    parser._errHandler = BailErrorStrategy()
+    try:
+        tree = getattr(parser, rule)()
+        stats.sll_parses += 1
+        return parser, tree
+    except ParseCancellationException:
+        stats.ll_fallbacks += 1
+
+    # reset() rewinds the token stream
+    parser.reset()
+    parser._interp.predictionMode = PredictionMode.LL
+    parser._errHandler = DefaultErrorStrategy()
+    if error_listener is not None:
+        parser.addErrorListener(error_listener)
+    return parser, getattr(parser, rule)()
+
+
+# Uses every construct of MiniC.g4, so parsing it visits all parser decisions
+WARM_UP_PROGRAM = """
+class Base { public: int x; bool b = true; Base() { x = 0; } virtual int get(int& a) { return a; } };
+class Derived : public Base { public: Derived(int v) { x = v; } int get(int& a) { return x + a; } };
+void f(int a, Base& b, string s, char c) { }
+int main() {
+    int i = 0; Base& r = b; Derived d = Derived(1); Base b2;
+    while (i < 10 && !(i == 5) || i != 7) { i = i + 1 * 2 - 3 / 4 % 5; }
+    if (i <= 1) { return -i; } else if (i >= 2) return +i; else { }
+    if (i > 0) f(i, b, "s\\n", 'c');
+    d.get(i); d.x = d.x; { i = i; }
+    return;
+}
+"""
+
+
+def warm_up():
+    """Fill the shared DFA cache with the decisions of WARM_UP_PROGRAM"""
+    parse_rule(CommonTokenStream(create_lexer(InputStream(WARM_UP_PROGRAM))))
+
+
+def clear_dfa_cache():
+    """Drop everything MiniCParser has learned; parsers created afterwards start cold"""
+    MiniCParser.decisionsToDFA = [DFA(state, i) for i, state in enumerate(MiniCParser.atn.decisionToState)]
+    MiniCParser.sharedContextCache = PredictionContextCache()
@@ -0,0 +1,252 @@
+from __future__ import annotations
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+
+"""
+Persistent parse/AST cache
+
+Stores the AST built by fast_parser.py (or gen/ASTBuilder.py) with the semantic
+analysis results for a source text, so running an unchanged program again
+skips lexing, parsing, AST building and analysis.
+
+Entries are zlib-compressed pickles of the (ast, analyzer) pair, keyed by
+the SHA-256 of the source text, the lexer and parser that built the AST
+(--lexer/--parser antlr never get an AST the fast front-end built) and a
+toolchain tag. The tag hashes the grammar, both lexers, both parsers, the
+AST modules and semantic.py plus the ANTLR runtime version, so
+regenerating the parser or changing the analysis invalidates every entry.
+Pickling keeps the node identities the side tables (node_symbols,
+expression_types) are keyed by.
+
+The cache directory is bounded by entry count and total size; the least
+recently used entries are evicted first (a hit refreshes the entry's mtime).
+
+MINIC_AST_CACHE selects the cache directory, or disables the cache when set
+to "off" (default: .ast_cache next to this file).
+
+`python ast_cache.py` runs the positive suite with the cache disabled, cold
+and warm, through both front-ends.
+"""
+
+
+CACHE_FORMAT = 1
+MAGIC = b"MINICAST"
+SUFFIX = ".ast"
+
+DEFAULT_DIRECTORY = Path(__file__).parent / ".ast_cache"
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Files that decide what the cached objects look like
+TOOLCHAIN_FILES = ("MiniC.g4", "gen/MiniCLexer.py", "fast_lexer.py", "gen/MiniCParser.py",
+                   "fast_parser.py", "gen/ASTBuilder.py", "gen/AST.py", "semantic.py")
+
+_toolchain_tag: Optional[str] = None
+
+
+def toolchain_tag() -> str:
+    """Hash of the grammar, generated parser, AST and analysis sources"""
+    global _toolchain_tag
+    if _toolchain_tag is None:
+        digest = hashlib.sha256(f"{CACHE_FORMAT}:{pickle.HIGHEST_PROTOCOL}".encode())
+        try:
+            from importlib.metadata import version
+            digest.update(version("antlr4-python3-runtime").encode())
+        except Exception:
+            pass
+        base = Path(__file__).parent
+        for name in TOOLCHAIN_FILES:
+            path = base / name
+            if path.exists():
+                digest.update(name.encode())
+                digest.update(path.read_bytes())
+        _toolchain_tag = digest.hexdigest()
+    return _toolchain_tag
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return (f"<CacheStats hits={self.hits} misses={self.misses} "
+                f"stores={self.stores} evictions={self.evictions}>")
+
+
+class ASTCache:
+    """On-disk cache of analyzed programs keyed by source hash"""
+
+    def __init__(self, directory: Path, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+
+    def key(self, source: str, namespace: str, lexer: str = "fast", parser: str = "fast") -> str:
+        """Entry name of a source text; namespace is the module the analyzer classes live in"""
+        digest = hashlib.sha256(toolchain_tag().encode())
+        digest.update(f"{namespace}\0{lexer}\0{parser}\0".encode())
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def analyze(self, source: str, analyze: Callable[[str], Tuple[Any, Any]],
+                namespace: str, lexer: str = "fast", parser: str = "fast") -> Tuple[Any, Any]:
+        """Cached analyze(source) built by the given lexer and parser
+
+        Failures (SemanticError, ...) are not cached.
+        """
+        key = self.key(source, namespace, lexer, parser)
+        result = self.load(key)
+        if result is not None:
+            self.stats.hits += 1
+            return result
+
+        self.stats.misses += 1
+        result = analyze(source)
+        self.store(key, result)
+        return result
+
+    def load(self, key: str) -> Optional[Tuple[Any, Any]]:
+        path = self.directory / (key + SUFFIX)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            if not data.startswith(MAGIC):
+                raise ValueError("not a cache entry")
+            result = pickle.loads(zlib.decompress(data[len(MAGIC):]))
+        except (ValueError, pickle.UnpicklingError, zlib.error, EOFError, AttributeError, ImportError,
+                OSError):
+            # Corrupt or written by incompatible code: drop it
+            self._remove(path)
+            return None
+        try:
+            # Mark as recently used
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def store(self, key: str, result: Tuple[Any, Any]):
+        try:
+            # Deep ASTs pickle recursively
+            limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(max(limit, 20000))
+            try:
+                payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            finally:
+                sys.setrecursionlimit(limit)
+            data = MAGIC + zlib.compress(payload)
+            if len(data) > self.max_bytes:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see partial entries
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.directory / (key + SUFFIX))
+        except (OSError, pickle.PicklingError, RecursionError):
+            # The cache is an optimization only
+            return
+        self.stats.stores += 1
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the limits hold"""
+        entries = []
+        for path in self.directory.glob("*" + SUFFIX):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for _, size, path in entries:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._remove(path)
+            self.stats.evictions += 1
+            count -= 1
+            total -= size
+
+    def clear(self):
+        for path in self.directory.glob("*" + SUFFIX):
+            self._remove(path)
+
+    def _remove(self, path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+class NoCache:
+    """Stand-in when caching is disabled"""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def analyze(self, source: str, analyze: Callable[[str], Tuple[Any, Any]],
+                namespace: str, lexer: str = "fast", parser: str = "fast") -> Tuple[Any, Any]:
+        self.stats.misses += 1
+        return analyze(source)
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Process-wide cache configured by MINIC_AST_CACHE"""
+    global _default_cache
+    if _default_cache is None:
+        setting = os.environ.get("MINIC_AST_CACHE", "")
+        if setting.lower() in ("off", "0", "no", "false"):
+            _default_cache = NoCache()
+        else:
+            _default_cache = ASTCache(Path(setting) if setting else DEFAULT_DIRECTORY)
+    return _default_cache
+
+
+if __name__ == "__main__":
+    # interpreter.py imports this module by name; make it use the caches set below
+    sys.modules.setdefault("ast_cache", sys.modules[__name__])
+    from interpreter import check_file
+
+    files = sorted((Path(__file__).parent / "tests" / "positive").glob("*.cpp"))
+    passed = total = 0
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ASTCache(Path(directory))
+        for name, _default_cache in [("off", NoCache()), ("cold", cache), ("warm", cache)]:
+            for lexer, parser in [("fast", "fast"), ("antlr", "antlr")]:
+                print(f"\nCache {name}, lexer {lexer}, parser {parser}:")
+                for f in files:
+                    status, details = check_file(f, "tree", lexer, parser)
+                    if status == "SKIP":
+                        continue
+                    total += 1
+                    passed += status == "PASS"
+                    print(f"  [{status}] {f.name}")
+                    if details:
+                        print(details)
+        # Every warm run was a hit: one entry per file and front-end
+        print(f"\n{cache.stats}")
+        if cache.stats.hits != 2 * len(files) or cache.stats.misses != 2 * len(files):
+            total += 1
+            print("  [FAIL] the warm runs did not reuse the cold runs' entries")
+    print(f"\nSummary: {passed}/{total} tests passed")
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,824 @@
+from __future__ import annotations
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from antlr4 import CommonTokenStream, InputStream
+
+from interpreter import (ENGINES, BailErrorListener, ObjectValue, create_interpreter, load_program, load_source,
+                         extract_expected_output)
+from semantic import SemanticAnalyzer, SemanticError
+from repl_session import ReplAnalyzer
+from optimizer import optimize_program
+from profiler import ProfilingInterpreter
+from pipeline_stats import PHASES, measure_file
+from ast_cache import ASTCache
+from fast_lexer import LEXERS, tokenize
+from fast_parser import PARSERS, parse_program, parse_repl_input
+from fast_lexer import create_lexer
+import antlr_frontend
+
+
+"""
+MiniC Benchmarks
+
+Runs the programs in benchmarks/ and reports timings.
+
+Usage:
+    python benchmark.py                 # all benchmark groups
+    python benchmark.py engines         # selected groups only
+    python benchmark.py --repeat 5 engines
+
+Groups:
+- engines: execution time of every interpreter engine (parsing excluded)
+- slots: 1M-iteration counting loop, scope dicts vs. slot-resolved frames
+- recursion: call overhead of every engine on fib(25) and an Ackermann call storm
+- caches: inline cache hits and misses of method calls per engine
+- objects: memory per object and throughput of a program creating 100k objects
+- fields: getter/setter calls on a class with 60 fields
+- analysis: semantic analysis time of call arguments nested up to depth 160
+- startup: loading the test programs without, with a cold and with a warm AST cache
+- lexer: tokens per second of the hand-written and the ANTLR lexer on a 2 MB input
+- parser: hand-written parser vs. ANTLR parser + ASTBuilder on generated programs
+- prediction: ANTLR parse time per test file, LL vs. SLL-first and cold vs. shared DFA
+- server: files/second of one semantic.py process per file vs. the compile server
+- repl: per-input latency of a long scripted REPL session, full vs. incremental analysis
+- optimizer: execution time per engine with and without constant folding (optimizer.py)
+- calls: helper-heavy loop and 100k-deep tail recursion with and without inlining and tail calls
+- depth: calls/s of non-tail recursion 100 to 1M deep, recursive walkers vs. the VM's own frame stack
+- profiler: overhead of the profiling tree walker (profiler.py) over the plain one
+- phases: time per pipeline phase over all positive tests, per parser (pipeline_stats.py)
+"""
+
+
+BENCH_DIR = Path(__file__).parent / "benchmarks"
+
+
+def best_time(fn: Callable[[], object], repeat: int) -> float:
+    """Return the best wall time of `repeat` runs of fn"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def print_table(header: List[str], rows: List[List[str]]):
+    widths = [max(len(str(row[i])) for row in [header] + rows)
+              for i in range(len(header))]
+    print("  ".join(h.ljust(w) for h, w in zip(header, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+
+def bench_engines(repeat: int):
+    """Execution time per engine on every benchmark program"""
+    print("\nExecution time per engine (best of %d):" % repeat)
+    rows = []
+    for program in sorted(BENCH_DIR.glob("*.cpp")):
+        ast, analyzer = load_program(program)
+        expected = extract_expected_output(program)
+
+        times = {}
+        for engine in ENGINES:
+            def run():
+                interpreter = create_interpreter(engine, analyzer.node_symbols)
+                interpreter.interpret(ast)
+                output = '\n'.join(interpreter.output)
+                if expected is not None and output != expected:
+                    raise AssertionError(
+                        f"{engine} engine produced wrong output for {program.name}")
+            times[engine] = best_time(run, repeat)
+
+        baseline = times[ENGINES[0]]
+        rows.append([program.name] + [
+            f"{times[e] * 1000:.1f} ms ({baseline / times[e]:.2f}x)" for e in ENGINES])
+    print_table(["program"] + list(ENGINES), rows)
+
+
+COUNT_LOOP = """
+int main() {
+    int i = 0;
+    while (i < %d) {
+        int next = i + 1;
+        i = next;
+    }
+    print_int(i);
+    return 0;
+}
+"""
+
+
+def count_scope_dicts(engine: str, iterations: int) -> int:
+    """Number of scope dicts pushed while running the counting loop"""
+    ast, analyzer = load_source(COUNT_LOOP % iterations)
+    interpreter = create_interpreter(engine, analyzer.node_symbols)
+    pushed = 0
+    push_scope = interpreter.push_scope
+
+    def counting_push_scope():
+        nonlocal pushed
+        pushed += 1
+        push_scope()
+
+    interpreter.push_scope = counting_push_scope
+    interpreter.interpret(ast)
+    return pushed
+
+
+def bench_slots(repeat: int):
+    """Counting loop on the dict-scope tree walker and the slot-resolved one"""
+    iterations = 1_000_000
+    ast, analyzer = load_source(COUNT_LOOP % iterations)
+    print(f"\nCounting loop, {iterations} iterations (best of {repeat}):")
+
+    rows = []
+    times = {}
+    for engine in ("tree", "slots"):
+        def run():
+            interpreter = create_interpreter(engine, analyzer.node_symbols)
+            interpreter.interpret(ast)
+            if interpreter.output != [str(iterations)]:
+                raise AssertionError(f"{engine} engine produced wrong output")
+        times[engine] = best_time(run, repeat)
+        # Counted on a short loop, the instrumentation would distort the timing
+        per_iteration = count_scope_dicts(engine, 1000) / 1000
+        rows.append([engine, f"{times[engine] * 1000:.1f} ms",
+                     f"{times['tree'] / times[engine]:.2f}x", f"{per_iteration:.2f}"])
+    print_table(["engine", "time", "speedup", "scope dicts/iteration"], rows)
+
+
+RECURSION_PROGRAMS = {
+    "fib(25)": ("""
+int fib(int n) {
+    if (n < 2) { return n; }
+    return fib(n - 1) + fib(n - 2);
+}
+int main() { print_int(fib(25)); return 0; }
+""", "75025"),
+    "ack(2, 30) x 40": ("""
+int ack(int m, int n) {
+    if (m == 0) { return n + 1; }
+    if (n == 0) { return ack(m - 1, 1); }
+    return ack(m - 1, ack(m, n - 1));
+}
+int main() {
+    int i = 0;
+    int result = 0;
+    while (i < 40) {
+        result = ack(2, 30);
+        i = i + 1;
+    }
+    print_int(result);
+    return 0;
+}
+""", "63"),
+}
+
+
+def bench_recursion(repeat: int):
+    """Call-heavy recursive programs on every engine"""
+    print("\nRecursive calls per engine (best of %d):" % repeat)
+    rows = []
+    for name, (source, expected) in RECURSION_PROGRAMS.items():
+        ast, analyzer = load_source(source)
+        times = {}
+        for engine in ENGINES:
+            def run():
+                interpreter = create_interpreter(engine, analyzer.node_symbols)
+                interpreter.interpret(ast)
+                if interpreter.output != [expected]:
+                    raise AssertionError(f"{engine} engine produced wrong output for {name}")
+            times[engine] = best_time(run, repeat)
+
+        baseline = times[ENGINES[0]]
+        rows.append([name] + [
+            f"{times[e] * 1000:.1f} ms ({baseline / times[e]:.2f}x)" for e in ENGINES])
+    print_table(["program"] + list(ENGINES), rows)
+
+
+def bench_caches(repeat: int):
+    """Inline cache counters of every engine on the benchmark programs"""
+    print("\nMethod call inline caches:")
+    rows = []
+    for program in sorted(BENCH_DIR.glob("*.cpp")):
+        ast, analyzer = load_program(program)
+        for engine in ENGINES:
+            interpreter = create_interpreter(engine, analyzer.node_symbols)
+            interpreter.interpret(ast)
+            stats = interpreter.cache_stats
+            lookups = stats.hits + stats.misses
+            if lookups:
+                rows.append([program.name, engine, stats.hits, stats.misses, stats.megamorphic,
+                             f"{stats.hits / lookups:.1%}"])
+    print_table(["program", "engine", "hits", "misses", "megamorphic", "hit rate"], rows)
+
+
+OBJECTS_PROGRAM = """
+class Point {
+public:
+    int x;
+    int y;
+    int z = 7;
+    bool visible = true;
+    Point() { x = 0; y = 0; }
+    Point(int a, int b) { x = a; y = b; }
+};
+int main() {
+    int i = 0;
+    int sum = 0;
+    while (i < %d) {
+        Point p = Point(i, 2);
+        Point q;
+        sum = sum + p.x + p.y + q.z;
+        i = i + 1;
+    }
+    print_int(sum);
+    return 0;
+}
+"""
+
+
+class DictObjectValue:
+    """The object representation before class layouts: a fields dict and a vtable per instance"""
+
+    def __init__(self, class_name: str, fields: Dict[str, Any]):
+        self.class_name = class_name
+        self.fields = fields
+        self.vtable = {}
+
+
+def allocated_per_object(make: Callable[[], Any], count: int) -> float:
+    """Bytes allocated per object kept alive"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [make() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del objects
+    return allocated / count
+
+
+def bench_objects(repeat: int):
+    """Object memory footprint and instantiation throughput, against the dict layout"""
+    count = 100_000
+    ast, analyzer = load_source(OBJECTS_PROGRAM % (count // 2))
+
+    # Memory of instances kept alive, measured on the tree walker's objects
+    interpreter = create_interpreter("tree", analyzer.node_symbols)
+    interpreter.interpret(ast)
+    layout = interpreter.layout_for("Point")
+    fields = dict(zip(layout.field_names, interpreter.initial_values(layout)))
+    dict_size = allocated_per_object(lambda: DictObjectValue("Point", dict(fields)), count)
+    layout_size = allocated_per_object(lambda: interpreter.instantiate_class("Point", []), count)
+    print("\nMemory per Point object (4 fields):")
+    print_table(["representation", "bytes", "vs. dict"],
+                [["fields dict (before)", f"{dict_size:.0f}", "1.00x"],
+                 ["layout + values", f"{layout_size:.0f}", f"{layout_size / dict_size:.2f}x"]])
+
+    # Creating the bare object from the field defaults, without constructor calls
+    defaults = list(fields.values())
+    dict_time = best_time(lambda: [DictObjectValue("Point", dict(fields)) for _ in range(count)], repeat)
+    layout_time = best_time(lambda: [ObjectValue(layout, defaults.copy()) for _ in range(count)], repeat)
+    print(f"\nCreating {count} bare Point objects (best of {repeat}):")
+    print_table(["representation", "time", "throughput", "speedup"],
+                [["fields dict (before)", f"{dict_time * 1000:.1f} ms", f"{count / dict_time:,.0f} objects/s",
+                  "1.00x"],
+                 ["layout + values", f"{layout_time * 1000:.1f} ms", f"{count / layout_time:,.0f} objects/s",
+                  f"{dict_time / layout_time:.2f}x"]])
+
+    print(f"\nCreating {count} objects (best of {repeat}):")
+    rows = []
+    for engine in ENGINES:
+        def run():
+            interpreter = create_interpreter(engine, analyzer.node_symbols)
+            interpreter.interpret(ast)
+        elapsed = best_time(run, repeat)
+        rows.append([engine, f"{elapsed * 1000:.1f} ms", f"{count / elapsed:,.0f} objects/s"])
+    print_table(["engine", "time", "throughput"], rows)
+
+
+def wide_class_program(fields: int, iterations: int) -> str:
+    """A class with many fields, used through a getter, a setter and a method calling both"""
+    declarations = "\n".join(f"    int f{i} = {i};" for i in range(fields))
+    return f"""
+class Wide {{
+public:
+{declarations}
+    int getFirst() {{ return f0; }}
+    int getLast() {{ return f{fields - 1}; }}
+    void setLast(int v) {{ f{fields - 1} = v; }}
+    void rotate() {{ setLast(getFirst() + getLast()); }}
+}};
+int main() {{
+    Wide w;
+    int i = 0;
+    while (i < {iterations}) {{
+        w.setLast(w.getLast() + w.getFirst());
+        w.rotate();
+        i = i + 1;
+    }}
+    print_int(w.getLast());
+    return 0;
+}}
+"""
+
+
+def bench_fields(repeat: int):
+    """Method calls on a wide object, dominated by field access"""
+    fields, iterations = 60, 20_000
+    ast, analyzer = load_source(wide_class_program(fields, iterations))
+    calls = iterations * 7
+
+    print(f"\n{calls} getter/setter calls on a class with {fields} fields (best of {repeat}):")
+    rows = []
+    for engine in ENGINES:
+        def run():
+            interpreter = create_interpreter(engine, analyzer.node_symbols)
+            interpreter.interpret(ast)
+        elapsed = best_time(run, repeat)
+        rows.append([engine, f"{elapsed * 1000:.1f} ms", f"{calls / elapsed:,.0f} calls/s"])
+    print_table(["engine", "time", "throughput"], rows)
+
+
+def nested_calls_program(depth: int) -> str:
+    call = "0"
+    for _ in range(depth):
+        call = f"inc({call})"
+    return f"int inc(int x) {{ return x + 1; }}\nint main() {{ print_int({call}); return 0; }}\n"
+
+
+def bench_analysis(repeat: int):
+    """Semantic analysis of nested call arguments (parsing excluded)"""
+    print(f"\nSemantic analysis of nested calls (best of {repeat}):")
+    rows = []
+    for depth in (10, 20, 40, 80, 160):
+        ast, analyzer = load_source(nested_calls_program(depth))
+        elapsed = best_time(lambda: SemanticAnalyzer().visit_program(ast), repeat)
+        rows.append([depth, f"{elapsed * 1000:.2f} ms", len(analyzer.expression_types)])
+    print_table(["depth", "time", "typed expressions"], rows)
+
+
+def bench_startup(repeat: int):
+    """Lexing, parsing and analysis of the positive tests vs. the AST cache"""
+    sources = [path.read_text(encoding="utf-8")
+               for path in sorted((Path(__file__).parent / "tests" / "positive").glob("*.cpp"))]
+    namespace = SemanticAnalyzer.__module__
+
+    def uncached():
+        for source in sources:
+            load_source(source)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ASTCache(Path(directory))
+
+        def cold():
+            cache.clear()
+            for source in sources:
+                cache.analyze(source, load_source, namespace)
+
+        def warm():
+            for source in sources:
+                cache.analyze(source, load_source, namespace)
+
+        timings = [("no cache", best_time(uncached, repeat)),
+                   ("cold cache", best_time(cold, repeat)),
+                   ("warm cache", best_time(warm, repeat))]
+        size = sum(path.stat().st_size for path in Path(directory).iterdir())
+
+    print(f"\nLoading {len(sources)} test programs (best of {repeat}), cache size {size / 1024:.0f} KiB:")
+    base = timings[0][1]
+    print_table(["mode", "time", "speedup"],
+                [[mode, f"{elapsed * 1000:.1f} ms", f"{base / elapsed:.1f}x"] for mode, elapsed in timings])
+
+
+def bench_lexer(repeat: int):
+    """Lexing throughput on the test programs repeated to a multi-megabyte input"""
+    chunk = "\n".join(path.read_text(encoding="utf-8")
+                      for path in sorted((Path(__file__).parent / "tests").glob("*/*.cpp")))
+    text = chunk * (2 * 1024 * 1024 // len(chunk) + 1)
+
+    print(f"\nLexing {len(text) / (1024 * 1024):.1f} MB (best of {repeat}):")
+    rows = []
+    for lexer in LEXERS:
+        tokens = len(tokenize(text, fast=lexer == "fast"))
+        elapsed = best_time(lambda: tokenize(text, fast=lexer == "fast"), repeat)
+        rows.append([lexer, tokens, f"{elapsed * 1000:.0f} ms", f"{tokens / elapsed:,.0f} tokens/s"])
+    print_table(["lexer", "tokens", "time", "throughput"], rows)
+
+
+def large_program(classes: int) -> str:
+    """A syntactically varied program with `classes` classes and as many functions"""
+    parts = []
+    for i in range(classes):
+        parent = f" : public C{i - 1}" if i else ""
+        parts.append(f"""
+class C{i}{parent} {{
+public:
+    int a{i};
+    bool flag{i} = true;
+    C{i}() {{ a{i} = {i}; }}
+    virtual int get{i}(int& x, char c) {{
+        if (x > a{i} && flag{i} || !(x == 0)) {{ x = x - 1; }} else x = x + a{i} * 2;
+        return x % 7 + (a{i} - -x) / 3;
+    }}
+}};
+
+int f{i}(int n, string s) {{
+    int total = 0;
+    C{i} obj;
+    while (total < n * {i + 1}) {{
+        total = total + obj.get{i}(n, 'x') + f{max(i - 1, 0)}(n - 1, "str\n");
+        {{ bool done = total >= 100 || n <= 0; if (done) return total; }}
+    }}
+    return total;
+}}""")
+    parts.append("""
+int main() {
+    print_int(f0(3, "go"));
+    return 0;
+}""")
+    return "".join(parts)
+
+
+def bench_parser(repeat: int):
+    """Parse time and throughput of both parsers (fast lexer, analysis excluded)"""
+    print(f"\nParsing generated programs (best of {repeat}):")
+    rows = []
+    for classes in (100, 1000):
+        text = large_program(classes)
+        lines = text.count("\n") + 1
+        times = {}
+        for parser in PARSERS:
+            times[parser] = best_time(
+                lambda: parse_program(InputStream(text), BailErrorListener(), parser=parser), repeat)
+        for parser in PARSERS:
+            elapsed = times[parser]
+            rows.append([f"{lines} lines", parser, f"{elapsed * 1000:.0f} ms",
+                         f"{lines / elapsed:,.0f} lines/s", f"{times['antlr'] / elapsed:.1f}x"])
+    print_table(["program", "parser", "time", "throughput", "speedup"], rows)
+
+
+def bench_prediction(repeat: int):
+    """Parse time per test program of the ANTLR parser (lexing excluded)"""
+    from antlr4.atn.PredictionMode import PredictionMode
+    from gen.MiniCParser import MiniCParser
+
+    files = sorted((Path(__file__).parent / "tests").glob("*/*.cpp"))
+    texts = [f.read_text(encoding="utf-8") for f in files]
+
+    def token_stream(text: str) -> CommonTokenStream:
+        stream = CommonTokenStream(create_lexer(InputStream(text)))
+        stream.fill()
+        return stream
+
+    def parse_ll(stream: CommonTokenStream):
+        parser = MiniCParser(stream)
+        parser.removeErrorListeners()
+        parser._interp.predictionMode = PredictionMode.LL
+        parser.program()
+
+    def parse_two_stage(stream: CommonTokenStream):
+        antlr_frontend.parse_rule(stream, "program")
+
+    # (label, parse, DFA cleared before every file, DFA warmed before the run)
+    variants = [
+        ("LL, cold DFA", parse_ll, True, False),
+        ("LL, shared DFA", parse_ll, False, False),
+        ("SLL first, shared DFA", parse_two_stage, False, False),
+        ("SLL first, warmed DFA", parse_two_stage, False, True),
+    ]
+    times = {label: [float("inf")] * len(texts) for label, *_ in variants}
+    for _ in range(repeat):
+        for label, parse, cold, warm in variants:
+            antlr_frontend.clear_dfa_cache()
+            if warm:
+                antlr_frontend.warm_up()
+            for i, text in enumerate(texts):
+                if cold:
+                    antlr_frontend.clear_dfa_cache()
+                stream = token_stream(text)
+                start = time.perf_counter()
+                parse(stream)
+                times[label][i] = min(times[label][i], time.perf_counter() - start)
+
+    print(f"\nANTLR parse time per test file (best of {repeat}):")
+    labels = [label for label, *_ in variants]
+    rows = [[f.name] + [f"{times[label][i] * 1000:.1f} ms" for label in labels]
+            for i, f in enumerate(files)]
+    rows.append(["total"] + [f"{sum(times[label]) * 1000:.1f} ms" for label in labels])
+    print_table(["program"] + labels, rows)
+    print(f"LL fallbacks: {antlr_frontend.stats.ll_fallbacks}")
+
+
+def bench_server(repeat: int):
+    """Checking the test programs per process vs. on a running compile server (AST cache off)"""
+    from compile_server import send_jobs
+
+    base = Path(__file__).parent
+    files = sorted((base / "tests").glob("*/*.cpp"))
+    env = {**os.environ, "MINIC_AST_CACHE": "off"}
+
+    def per_process():
+        for f in files:
+            subprocess.run([sys.executable, str(base / "semantic.py"), str(f)],
+                           env=env, stdout=subprocess.DEVNULL, check=False)
+
+    print(f"\nChecking {len(files)} test programs (per process: 1 run, server: best of {repeat}):")
+    rows = []
+    elapsed = best_time(per_process, 1)
+    rows.append(["semantic.py per file", f"{elapsed * 1000:.0f} ms", f"{len(files) / elapsed:.1f} files/s"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "minic.sock")
+        jobs = os.cpu_count() or 1
+        server = subprocess.Popen([sys.executable, str(base / "compile_server.py"), "serve",
+                                   "--socket", path, "--jobs", str(jobs)], env=env, stderr=subprocess.DEVNULL)
+        try:
+            while not os.path.exists(path):
+                time.sleep(0.05)
+            for action in ("check", "run"):
+                requests = [{"action": action, "path": str(f)} for f in files]
+                elapsed = best_time(lambda: send_jobs(path, requests), repeat)
+                rows.append([f"server {action}, {jobs} workers", f"{elapsed * 1000:.0f} ms",
+                             f"{len(files) / elapsed:.1f} files/s"])
+        finally:
+            server.terminate()
+            server.wait()
+    print_table(["mode", "time", "throughput"], rows)
+
+
+def repl_session_script(blocks: int) -> List[str]:
+    """REPL inputs: per block a class, a function, a session variable, a call and now and then a redefinition"""
+    inputs = []
+    for i in range(blocks):
+        parent = f" : public C{i - 1}" if i % 20 else ""
+        inputs.append(f"class C{i}{parent} {{ public: int f{i}; C{i}() {{ f{i} = {i}; }} "
+                      f"int get{i}() {{ return f{i}; }} }};")
+        callee = f"fun{i // 2}(a)" if i else "a"
+        inputs.append(f"int fun{i}(int a) {{ return {callee} + 1; }}")
+        inputs.append(f"C{i} o{i} = C{i}();")
+        inputs.append(f"print_int(fun{i}(o{i}.get{i}()));")
+        if i % 10 == 9:
+            inputs.append(f"int fun{i - 3}(int a) {{ return fun{(i - 3) // 2}(a) + 2; }}")
+    return inputs
+
+
+def bench_repl(repeat: int):
+    """Per-input latency (analysis and execution, parsing excluded) as the REPL session grows"""
+    blocks, bucket = 1500, 1000
+    inputs = [parse_repl_input(InputStream(code), BailErrorListener()) for code in repl_session_script(blocks)]
+    print(f"\nREPL session of {len(inputs)} inputs ({blocks} classes, {blocks} functions), tree engine:")
+
+    def run(analyzer: SemanticAnalyzer, incremental: bool) -> List[Optional[float]]:
+        interpreter = create_interpreter("tree", analyzer.node_symbols)
+        latencies: List[Optional[float]] = []
+        for nodes in inputs:
+            start = time.perf_counter()
+            try:
+                for node in nodes:
+                    stale = analyzer.analyze_repl_node(node)
+                    if incremental:
+                        interpreter.forget(stale)
+                    interpreter.visit_repl_node(node)
+                latencies.append(time.perf_counter() - start)
+            except SemanticError:
+                # The full analyzer rejects redefinitions
+                latencies.append(None)
+            interpreter.output = []
+        return latencies
+
+    full = run(SemanticAnalyzer(), False)
+    incremental = run(ReplAnalyzer(), True)
+    rows = []
+    for start in range(0, len(inputs), bucket):
+        row = [f"{start}-{min(start + bucket, len(inputs)) - 1}"]
+        for latencies in (full, incremental):
+            chunk = [t for t in latencies[start:start + bucket] if t is not None]
+            row.append(f"{sum(chunk) / len(chunk) * 1000:.3f} ms")
+            row.append(f"{max(chunk) * 1000:.2f} ms")
+        rows.append(row)
+    print_table(["inputs", "full mean", "full max", "incremental mean", "incremental max"], rows)
+    print(f"Redefinitions rejected by the full analysis: {full.count(None)}, "
+          f"by the incremental analysis: {incremental.count(None)}")
+
+
+CONSTANT_LOOP = """
+int main() {
+    int i = 0;
+    int sum = 0;
+    while (i < %d) {
+        if (2 * 3 > 5 && true) {
+            sum = sum + (60 * 60 + 24) %% 7 - 0;
+        }
+        i = i + 1 * 1;
+    }
+    print_int(sum);
+    return 0;
+}
+"""
+
+
+def bench_optimizer(repeat: int):
+    """Execution time per engine with and without the optimizer pass (AST loading excluded)"""
+    programs = [(path.name, path.read_text(encoding="utf-8")) for path in sorted(BENCH_DIR.glob("*.cpp"))]
+    programs.append(("constant loop", CONSTANT_LOOP % 20000))
+    print(f"\nExecution time without / with optimizer.py (best of {repeat}):")
+    rows = []
+    for name, source in programs:
+        plain = load_source(source)
+        optimized = load_source(source)
+        report = optimize_program(optimized[0], optimized[1].node_symbols)
+        row = [name, str(report.folded + report.simplified + report.branches_pruned + report.loops_removed
+                         + report.inlined + report.tail_calls)]
+        for engine in ENGINES:
+            outputs, timings = [], []
+            for ast, analyzer in (plain, optimized):
+                def run():
+                    interpreter = create_interpreter(engine, analyzer.node_symbols)
+                    interpreter.interpret(ast)
+                    outputs.append(interpreter.output)
+                timings.append(best_time(run, repeat))
+            if any(output != outputs[0] for output in outputs):
+                raise AssertionError(f"optimizer changed the output of {name} on the {engine} engine")
+            row.append(f"{timings[0] * 1000:.1f} / {timings[1] * 1000:.1f} ms ({timings[0] / timings[1]:.2f}x)")
+        rows.append(row)
+    print_table(["program", "rewrites"] + list(ENGINES), rows)
+
+
+CALL_PROGRAMS = {
+    "helpers x 20k": ("""
+int square(int x) { return x * x; }
+int clamp(int x, int low, int high) { return max(low, min(x, high)); }
+int min(int a, int b) { if (a < b) { return a; } return b; }
+int max(int a, int b) { if (a > b) { return a; } return b; }
+bool is_even(int n) { return n % 2 == 0; }
+int main() {
+    int i = 0;
+    int sum = 0;
+    while (i < 20000) {
+        int j = i % 100;
+        if (is_even(i)) { sum = sum + clamp(square(j), 10, 5000); }
+        i = i + 1;
+    }
+    print_int(sum);
+    return 0;
+}
+""", "25931200"),
+    "countdown(100000)": ("""
+int countdown(int n, int acc) {
+    if (n == 0) { return acc; }
+    return countdown(n - 1, acc + 2);
+}
+int main() { print_int(countdown(100000, 0)); return 0; }
+""", "200000"),
+}
+
+
+def bench_calls(repeat: int):
+    """Small helper calls and deep tail recursion without and with inlining and tail calls"""
+    print(f"\nCalls without / with optimizer.py (best of {repeat}):")
+    rows = []
+    for name, (source, expected) in CALL_PROGRAMS.items():
+        plain = load_source(source)
+        optimized = load_source(source)
+        report = optimize_program(optimized[0], optimized[1].node_symbols)
+        row = [name, f"{report.inlined} / {report.tail_calls}"]
+        for engine in ENGINES:
+            timings = []
+            for ast, analyzer in (plain, optimized):
+                def run():
+                    interpreter = create_interpreter(engine, analyzer.node_symbols)
+                    interpreter.interpret(ast)
+                    if interpreter.output != [expected]:
+                        raise AssertionError(f"{engine} engine produced wrong output for {name}")
+                try:
+                    timings.append(best_time(run, repeat))
+                except RecursionError:
+                    timings.append(None)
+            if timings[0] is None:
+                row.append(f"RecursionError / {timings[1] * 1000:.1f} ms")
+            else:
+                row.append(f"{timings[0] * 1000:.1f} / {timings[1] * 1000:.1f} ms ({timings[0] / timings[1]:.2f}x)")
+        rows.append(row)
+    print_table(["program", "inlined / tail calls"] + list(ENGINES), rows)
+
+
+DEPTH_PROGRAM = """
+int sum(int n) {
+    if (n == 0) { return 0; }
+    return n + sum(n - 1);
+}
+int main() {
+    int i = 0;
+    int total = 0;
+    while (i < %d) {
+        total = total + sum(%d);
+        i = i + 1;
+    }
+    print_int(total);
+    return 0;
+}
+"""
+
+# (depth, calls of sum(depth)): about 100k MiniC calls per run
+DEPTH_CASES = [(100, 1000), (10_000, 10), (1_000_000, 1)]
+
+
+def bench_depth(repeat: int):
+    """Calls per second of non-tail recursion, recursive walkers vs. the VM's heap-allocated frames"""
+    print(f"\nNon-tail recursion per engine, calls/s (best of {repeat}):")
+    rows = []
+    for depth, calls in DEPTH_CASES:
+        ast, analyzer = load_source(DEPTH_PROGRAM % (calls, depth))
+        expected = str(depth * (depth + 1) // 2 * calls)
+        row = [f"{depth:,}", calls]
+        for engine in ENGINES:
+            def run():
+                # main and sum(depth) ... sum(1) are the frames below sum(0)
+                interpreter = create_interpreter(engine, analyzer.node_symbols, max_depth=depth + 1)
+                interpreter.interpret(ast)
+                if interpreter.output != [expected]:
+                    raise AssertionError(f"{engine} engine produced wrong output at depth {depth}")
+            try:
+                elapsed = best_time(run, repeat)
+            except RecursionError:
+                row.append("stack overflow")
+                continue
+            row.append(f"{(depth + 1) * calls / elapsed:,.0f}")
+        rows.append(row)
+    print_table(["depth", "runs"] + list(ENGINES), rows)
+
+
+def bench_profiler(repeat: int):
+    """Execution time of the tree walker without and with profiling (AST loading excluded)"""
+    print(f"\nProfiling overhead, tree engine (best of {repeat}):")
+    rows = []
+    for program in sorted(BENCH_DIR.glob("*.cpp")):
+        ast, analyzer = load_program(program)
+        plain = best_time(lambda: create_interpreter("tree", analyzer.node_symbols).interpret(ast), repeat)
+        profiled = best_time(lambda: ProfilingInterpreter(analyzer.node_symbols).interpret(ast), repeat)
+        rows.append([program.name, f"{plain * 1000:.1f}", f"{profiled * 1000:.1f}", f"{profiled / plain - 1:+.1%}"])
+    print_table(["program", "plain ms", "profiled ms", "overhead"], rows)
+
+
+def bench_phases(repeat: int):
+    """Time per pipeline phase summed over the positive tests (best of `repeat` per file)"""
+    files = sorted((Path(__file__).parent / "tests" / "positive").glob("*.cpp"))
+    print(f"\nPipeline phases over {len(files)} positive tests, tree engine (best of {repeat}):")
+    rows = []
+    for parser in PARSERS:
+        totals: Dict[str, float] = {}
+        for f in files:
+            runs = [measure_file(f, "tree", parser=parser, trace_memory=False) for _ in range(repeat)]
+            for phase in runs[0].phases:
+                totals[phase] = totals.get(phase, 0.0) + min(m.phases[phase].seconds for m in runs)
+        rows.append([parser] + [f"{totals[p] * 1000:.1f}" if p in totals else "-" for p in PHASES])
+    print_table(["parser"] + [f"{p} ms" for p in PHASES], rows)
+
+
+BENCHMARKS: Dict[str, Callable[[int], None]] = {
+    "engines": bench_engines,
+    "slots": bench_slots,
+    "recursion": bench_recursion,
+    "caches": bench_caches,
+    "objects": bench_objects,
+    "fields": bench_fields,
+    "analysis": bench_analysis,
+    "startup": bench_startup,
+    "lexer": bench_lexer,
+    "parser": bench_parser,
+    "prediction": bench_prediction,
+    "server": bench_server,
+    "repl": bench_repl,
+    "optimizer": bench_optimizer,
+    "calls": bench_calls,
+    "depth": bench_depth,
+    "profiler": bench_profiler,
+    "phases": bench_phases,
+}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="MiniC benchmarks")
+    arg_parser.add_argument("groups", nargs="*",
+                            help=f"benchmark groups to run: {', '.join(BENCHMARKS)} (default: all)")
+    arg_parser.add_argument("--repeat", type=int, default=3,
+                            help="runs per measurement, the best is reported")
+    args = arg_parser.parse_args()
+    unknown = [g for g in args.groups if g not in BENCHMARKS]
+    if unknown:
+        arg_parser.error(f"unknown benchmark group(s): {', '.join(unknown)}")
+
+    for group in args.groups or list(BENCHMARKS):
+        BENCHMARKS[group](args.repeat)
+    sys.exit(0)
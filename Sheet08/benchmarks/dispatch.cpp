@@ -0,0 +1,39 @@
+#include "hsbi_runtime.h"
+
+// Dispatch-heavy: virtual calls on three receiver classes through base references.
+class Shape {
+public:
+    int size;
+    Shape() { size = 1; }
+    virtual int area() { return size; }
+    int scale() { return 2; }
+};
+class Square : public Shape {
+public:
+    Square() { size = 2; }
+    virtual int area() { return size * size; }
+};
+class Cube : public Square {
+public:
+    Cube() { size = 3; }
+    virtual int area() { return size * size * size; }
+};
+int main() {
+    Shape s;
+    Square q;
+    Cube c;
+    Shape& a = s;
+    Shape& b = q;
+    Shape& d = c;
+    int total = 0;
+    int i = 0;
+    while (i < 20000) {
+        total = total + a.area() + b.area() + d.area() + c.scale();
+        i = i + 1;
+    }
+    print_int(total);
+    return 0;
+}
+/* EXPECT:
+680000
+*/
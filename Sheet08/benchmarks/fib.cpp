@@ -0,0 +1,17 @@
+#include "hsbi_runtime.h"
+
+// Call-heavy: naive recursion.
+int fib(int n) {
+    if (n < 2) {
+        return n;
+    }
+    return fib(n - 1) + fib(n - 2);
+}
+
+int main() {
+    print_int(fib(20));
+    return 0;
+}
+/* EXPECT:
+6765
+*/
@@ -0,0 +1,22 @@
+#include "hsbi_runtime.h"
+
+// Loop-heavy: arithmetic, comparisons and branches in a tight while loop.
+int main() {
+    int i = 0;
+    int sum = 0;
+    int odd = 0;
+    while (i < 100000) {
+        if (i % 2 == 1) {
+            odd = odd + 1;
+        }
+        sum = sum + i * 2 - 1;
+        i = i + 1;
+    }
+    print_int(sum);
+    print_int(odd);
+    return 0;
+}
+/* EXPECT:
+9999800000
+50000
+*/
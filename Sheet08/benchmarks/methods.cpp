@@ -0,0 +1,37 @@
+#include "hsbi_runtime.h"
+
+// Call-heavy: method calls, virtual dispatch and reference parameters.
+class Shape {
+public:
+    int size;
+    Shape() { size = 1; }
+    virtual int area() { return size; }
+    void grow(int &by) { size = size + by; }
+};
+
+class Square : public Shape {
+public:
+    int area() { return size * size; }
+};
+
+int main() {
+    Square sq;
+    Shape& s = sq;
+    int step = 1;
+    int total = 0;
+    int i = 0;
+    while (i < 20000) {
+        total = total + s.area() % 7;
+        if (i % 100 == 0) {
+            s.grow(step);
+        }
+        i = i + 1;
+    }
+    print_int(total);
+    print_int(sq.size);
+    return 0;
+}
+/* EXPECT:
+40397
+201
+*/
@@ -0,0 +1,542 @@
+from __future__ import annotations
+import operator
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from gen import AST
+from semantic import ReferenceType, FunctionSymbol, FieldSymbol
+from interpreter import Interpreter, RuntimeError, InlineCache, ClassLayout
+from resolver import FrameLayout, SlotResolver, FUNCTION, METHOD, CONSTRUCTOR, SESSION
+from optimizer import TailCallStatement
+
+
+"""
+MiniC Bytecode
+
+Lowers the AST (after semantic analysis filled node_symbols) into linear
+bytecode for the stack VM in vm.py.
+
+Every instruction occupies two slots of an array('l'): the opcode and one
+integer argument (a local slot, a constant index or a jump target given as
+an offset into the instruction array). Locals live in the numbered slots of
+a flat frame that resolver.py assigns.
+"""
+
+
+# Opcodes
+LOAD_CONST = 0          # push constants[arg]
+LOAD_LOCAL = 1          # push locals[arg] (following references)
+STORE_LOCAL = 2         # pop into locals[arg] (declaration)
+ASSIGN_LOCAL = 3        # assign top of stack to locals[arg], keep it on the stack
+LOAD_REF = 4            # push a reference to locals[arg]
+LOAD_FIELD_REF = 5      # pop object, push a reference to its field named constants[arg]
+POP = 6
+EXPR_STMT = 7           # pop the result of an expression statement (printed in REPL mode)
+BINARY_OP = 8           # pop right, pop left, push BINARY_OPERATORS[arg](left, right)
+UNARY_NOT = 9
+UNARY_NEG = 10
+UNARY_POS = 11
+TO_BOOL = 12
+JUMP = 13
+POP_JUMP_IF_FALSE = 14
+POP_JUMP_IF_TRUE = 15
+CALL = 16               # call the function of CallSite constants[arg]
+CALL_BY_NAME = 17       # call a function found by name and arity at runtime
+CALL_BUILTIN = 18
+CALL_METHOD = 19        # statically bound method call
+VCALL = 20              # method call dispatched on the dynamic type of the receiver
+RET = 21
+NEW = 22                # instantiate the class of NewSite constants[arg]
+GETFIELD = 23           # pop object, push its field of FieldSite constants[arg]
+SETFIELD = 24           # pop object, store top of stack into its field of FieldSite constants[arg]
+SLICE = 25              # slice the object on top of the stack to class constants[arg]
+LOAD_THIS_FIELD = 26    # push the receiver's field of FieldSite constants[arg]
+ASSIGN_THIS_FIELD = 27  # assign top of stack to the receiver's field of FieldSite constants[arg], keep it
+INIT_FIELD = 28         # pop into field number arg of the receiver
+INIT_PARENT = 29        # run the parent default constructor constants[arg] on the receiver
+COPY_FIELDS = 30        # copy all fields of locals[0] into the receiver
+RAISE = 31              # raise RuntimeError(constants[arg])
+LOAD_THIS = 32          # push the receiver
+TAIL_CALL = 33          # restart the current function with its arg arguments (TailCallStatement)
+
+OPNAMES = {value: name for name, value in list(globals().items())
+           if name.isupper() and isinstance(value, int)}
+
+
+def _divide(left, right):
+    if right == 0:
+        raise RuntimeError("Division by zero")
+    return left // right  # Integer division
+
+
+BINARY_SYMBOLS = ('+', '-', '*', '/', '%', '<', '<=', '>', '>=', '==', '!=')
+BINARY_OPERATORS = (operator.add, operator.sub, operator.mul, _divide, operator.mod,
+                    operator.lt, operator.le, operator.gt, operator.ge, operator.eq, operator.ne)
+
+
+class CallSite:
+    """Target of CALL, INIT_PARENT: a function body resolved at compile time"""
+
+    def __init__(self, node: Any, kind: str, argc: int):
+        self.node = node
+        self.kind = kind
+        self.argc = argc
+        self.code: Optional[CodeObject] = None
+
+    def __repr__(self):
+        return f"{self.node.name}/{self.argc}"
+
+
+class NameCallSite:
+    """Target of CALL_BY_NAME: overload picked by arity at runtime"""
+
+    def __init__(self, name: str, argc: int):
+        self.name = name
+        self.argc = argc
+
+    def __repr__(self):
+        return f"{self.name}/{self.argc}"
+
+
+class BuiltinSite:
+    def __init__(self, name: str, function: Any, argc: int):
+        self.name = name
+        self.function = function
+        self.argc = argc
+
+    def __repr__(self):
+        return f"{self.name}/{self.argc}"
+
+
+class MethodSite:
+    """Target of CALL_METHOD/VCALL; method is None for calls without symbol"""
+
+    def __init__(self, name: str, method: Optional[AST.MethodDefinition], is_virtual: bool, argc: int):
+        self.name = name
+        self.method = method
+        self.is_virtual = is_virtual
+        self.argc = argc
+        self.code: Optional[CodeObject] = None
+        self.cache = InlineCache()
+
+    def __repr__(self):
+        return f"{self.name}/{self.argc}"
+
+
+class FieldSite:
+    """Operand of GETFIELD/SETFIELD/LOAD_THIS_FIELD/ASSIGN_THIS_FIELD: remembers the field index for the receiver layout seen last"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.layout: Optional[ClassLayout] = None
+        self.index = 0
+
+    def __repr__(self):
+        return self.name
+
+
+class NewSite:
+    def __init__(self, class_name: str, argc: int):
+        self.class_name = class_name
+        self.argc = argc
+
+    def __repr__(self):
+        return f"{self.class_name}/{self.argc}"
+
+
+class CodeObject:
+    """Compiled body of a function, method, constructor or session input"""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.instructions = array('l')
+        self.constants: List[Any] = []
+        self.nparams = 0
+        self.nlocals = 0
+        # slot -> names that live in the slot (for the disassembler)
+        self.local_names: Dict[int, List[str]] = {}
+        # [None] * (nlocals - nparams), appended to the arguments of a call
+        self.padding: List[Any] = []
+        self._const_index: Dict[Tuple[type, Any], int] = {}
+
+    def add_constant(self, value: Any) -> int:
+        if isinstance(value, (int, str, bool, type(None))):
+            key = (type(value), value)
+            if key in self._const_index:
+                return self._const_index[key]
+            self._const_index[key] = len(self.constants)
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def __repr__(self):
+        return f"<code {self.kind} {self.name}>"
+
+
+class CodeGenerator:
+    """Generates the bytecode of one code object"""
+
+    def __init__(self, interp: Interpreter, code: CodeObject, layout: FrameLayout):
+        self.interp = interp
+        self.code = code
+        self.slots = layout.slots
+        code.nparams = layout.nparams
+        code.nlocals = layout.nlocals
+        code.local_names = layout.local_names
+
+    # Emission
+
+    def emit(self, op: int, arg: int = 0) -> int:
+        self.code.instructions.extend((op, arg))
+        return len(self.code.instructions) - 2
+
+    def emit_const(self, value: Any):
+        self.emit(LOAD_CONST, self.code.add_constant(value))
+
+    def emit_raise(self, message: str):
+        self.emit(RAISE, self.code.add_constant(message))
+
+    def here(self) -> int:
+        return len(self.code.instructions)
+
+    def patch(self, offset: int, target: int):
+        self.code.instructions[offset + 1] = target
+
+    def finish(self) -> CodeObject:
+        """Emit the implicit 'return;'"""
+        code = self.code
+        self.emit_const(None)
+        self.emit(RET)
+        code.padding = [None] * (code.nlocals - code.nparams)
+        return code
+
+    def is_field_of_this(self, expr: AST.IdentifierExpression) -> bool:
+        return isinstance(self.interp.node_symbols.get(expr), FieldSymbol)
+
+    def field_of_this_reference(self, expr: AST.IdentifierExpression):
+        self.emit(LOAD_THIS)
+        self.emit(LOAD_FIELD_REF, self.code.add_constant(expr.name))
+
+    # Statements
+
+    def statements(self, stmts: List[AST.Statement]):
+        for stmt in stmts:
+            self.statement(stmt)
+
+    def statement(self, stmt: AST.Statement):
+        if isinstance(stmt, AST.VariableDeclaration):
+            self.variable_declaration(stmt)
+        elif isinstance(stmt, AST.ExpressionStatement):
+            self.expression(stmt.expression)
+            self.emit(EXPR_STMT)
+        elif isinstance(stmt, AST.BlockStatement):
+            self.statements(stmt.statements)
+        elif isinstance(stmt, AST.IfStatement):
+            self.if_statement(stmt)
+        elif isinstance(stmt, AST.WhileStatement):
+            self.while_statement(stmt)
+        elif isinstance(stmt, AST.ReturnStatement):
+            self.return_statement(stmt)
+
+    def variable_declaration(self, node: AST.VariableDeclaration):
+        name = node.name
+        base_type = node.var_type.base_type
+
+        if node.var_type.is_reference:
+            init = node.initializer
+            if not init:
+                self.emit_raise(f"Reference '{name}' must be initialized.")
+                return
+            if isinstance(init, AST.IdentifierExpression):
+                slot = self.slots.get(init)
+                if slot is not None:
+                    self.emit(LOAD_REF, slot)
+                elif self.is_field_of_this(init):
+                    self.field_of_this_reference(init)
+                else:
+                    self.emit_raise(
+                        f"Cannot initialize reference with undefined variable '{init.name}'.")
+                    return
+            elif isinstance(init, AST.MemberAccessExpression):
+                self.expression(init.object)
+                self.emit(LOAD_FIELD_REF, self.code.add_constant(init.member))
+            else:
+                self.emit_raise(
+                    f"Reference '{name}' must be initialized with an lvalue.")
+                return
+        elif base_type in self.interp.classes:
+            if node.initializer:
+                self.expression(node.initializer)
+                self.emit(SLICE, self.code.add_constant(base_type))
+            else:
+                self.emit(NEW, self.code.add_constant(NewSite(base_type, 0)))
+        elif node.initializer:
+            self.expression(node.initializer)
+        else:
+            self.emit_const(None)
+
+        self.emit(STORE_LOCAL, self.slots[node])
+
+    def condition_jump(self, condition: AST.Expression) -> int:
+        self.expression(condition)
+        return self.emit(POP_JUMP_IF_FALSE)
+
+    def if_statement(self, stmt: AST.IfStatement):
+        to_else = self.condition_jump(stmt.condition)
+        self.statements(stmt.then_stmt)
+        if stmt.else_stmt:
+            to_end = self.emit(JUMP)
+            self.patch(to_else, self.here())
+            self.statements(stmt.else_stmt)
+            self.patch(to_end, self.here())
+        else:
+            self.patch(to_else, self.here())
+
+    def while_statement(self, stmt: AST.WhileStatement):
+        start = self.here()
+        to_end = self.condition_jump(stmt.condition)
+        self.statements(stmt.body)
+        self.emit(JUMP, start)
+        self.patch(to_end, self.here())
+
+    def return_statement(self, stmt: AST.ReturnStatement):
+        if isinstance(stmt, TailCallStatement):
+            call = stmt.expression
+            self.arguments(self.interp.node_symbols[call], call.arguments)
+            self.emit(TAIL_CALL, len(call.arguments))
+            return
+        if stmt.expression:
+            self.expression(stmt.expression)
+        else:
+            self.emit_const(None)
+        self.emit(RET)
+
+    # Expressions
+
+    def expression(self, expr: AST.Expression):
+        if isinstance(expr, AST.LiteralExpression):
+            self.emit_const(Interpreter.visit_literal_expression(self.interp, expr))
+        elif isinstance(expr, AST.IdentifierExpression):
+            slot = self.slots.get(expr)
+            if slot is not None:
+                self.emit(LOAD_LOCAL, slot)
+            elif self.is_field_of_this(expr):
+                self.emit(LOAD_THIS_FIELD, self.code.add_constant(FieldSite(expr.name)))
+            else:
+                self.emit_raise(f"Undefined variable '{expr.name}'.")
+        elif isinstance(expr, AST.BinaryExpression):
+            self.binary_expression(expr)
+        elif isinstance(expr, AST.UnaryExpression):
+            self.unary_expression(expr)
+        elif isinstance(expr, AST.AssignmentExpression):
+            self.assignment_expression(expr)
+        elif isinstance(expr, AST.CallExpression):
+            self.call_expression(expr)
+        elif isinstance(expr, AST.MemberAccessExpression):
+            self.expression(expr.object)
+            self.emit(GETFIELD, self.code.add_constant(FieldSite(expr.member)))
+        elif isinstance(expr, AST.MethodCallExpression):
+            self.method_call_expression(expr)
+        else:
+            self.emit_raise(f"Unknown expression type: {type(expr)}")
+
+    def binary_expression(self, expr: AST.BinaryExpression):
+        op = expr.operator
+        # Short-circuit evaluation for logical operators
+        if op in ('&&', '||'):
+            self.expression(expr.left)
+            short = self.emit(POP_JUMP_IF_FALSE if op == '&&' else POP_JUMP_IF_TRUE)
+            self.expression(expr.right)
+            self.emit(TO_BOOL)
+            to_end = self.emit(JUMP)
+            self.patch(short, self.here())
+            self.emit_const(op == '||')
+            self.patch(to_end, self.here())
+            return
+
+        self.expression(expr.left)
+        self.expression(expr.right)
+        if op in BINARY_SYMBOLS:
+            self.emit(BINARY_OP, BINARY_SYMBOLS.index(op))
+        else:
+            self.emit_raise(f"Unknown operator: {op}")
+
+    def unary_expression(self, expr: AST.UnaryExpression):
+        self.expression(expr.operand)
+        if expr.operator == '!':
+            self.emit(UNARY_NOT)
+        elif expr.operator == '-':
+            self.emit(UNARY_NEG)
+        elif expr.operator == '+':
+            self.emit(UNARY_POS)
+        else:
+            self.emit_raise(f"Unknown unary operator: {expr.operator}")
+
+    def assignment_expression(self, expr: AST.AssignmentExpression):
+        self.expression(expr.value)
+        target = expr.target
+        if isinstance(target, AST.IdentifierExpression):
+            slot = self.slots.get(target)
+            if slot is not None:
+                self.emit(ASSIGN_LOCAL, slot)
+            elif self.is_field_of_this(target):
+                self.emit(ASSIGN_THIS_FIELD, self.code.add_constant(FieldSite(target.name)))
+            else:
+                self.emit_raise(f"Undefined variable '{target.name}'.")
+        elif isinstance(target, AST.MemberAccessExpression):
+            self.expression(target.object)
+            self.emit(SETFIELD, self.code.add_constant(FieldSite(target.member)))
+        else:
+            self.emit_raise("Invalid assignment target")
+
+    def arguments(self, sym: Optional[FunctionSymbol], arguments: List[AST.Expression]):
+        """Push call arguments, binding reference parameters to lvalues"""
+        params = sym.parameters if sym is not None else []
+        for i, arg_expr in enumerate(arguments):
+            if i < len(params) and isinstance(params[i].type, ReferenceType):
+                if isinstance(arg_expr, AST.IdentifierExpression):
+                    slot = self.slots.get(arg_expr)
+                    if slot is not None:
+                        self.emit(LOAD_REF, slot)
+                    elif self.is_field_of_this(arg_expr):
+                        self.field_of_this_reference(arg_expr)
+                    else:
+                        self.emit_raise(
+                            f"Undefined variable '{arg_expr.name}'.")
+                    continue
+                if isinstance(arg_expr, AST.MemberAccessExpression):
+                    self.expression(arg_expr.object)
+                    self.emit(LOAD_FIELD_REF,
+                              self.code.add_constant(arg_expr.member))
+                    continue
+            self.expression(arg_expr)
+
+    def call_expression(self, expr: AST.CallExpression):
+        callee = expr.callee
+        argc = len(expr.arguments)
+
+        # Builtin function
+        if callee in self.interp.builtin_functions:
+            self.arguments(None, expr.arguments)
+            site = BuiltinSite(
+                callee, self.interp.builtin_functions[callee], argc)
+            self.emit(CALL_BUILTIN, self.code.add_constant(site))
+            return
+
+        # Constructor call
+        if callee in self.interp.classes:
+            self.arguments(None, expr.arguments)
+            self.emit(NEW, self.code.add_constant(NewSite(callee, argc)))
+            return
+
+        # User-defined function resolved by the semantic analysis
+        sym = self.interp.node_symbols.get(expr)
+        if isinstance(sym, (AST.FunctionDefinition, AST.MethodDefinition, AST.ConstructorDefinition)):
+            self.arguments(None, expr.arguments)
+            site = CallSite(sym, FUNCTION, argc)
+        elif isinstance(sym, FunctionSymbol) and sym.ast_node:
+            if sym.is_method:
+                # Method of the receiver called without object (implicit this)
+                self.emit(LOAD_THIS)
+                self.method_call(sym, callee, expr.arguments)
+                return
+            self.arguments(sym, expr.arguments)
+            site = CallSite(sym.ast_node, FUNCTION, argc)
+        else:
+            # Fallback to name search (less reliable for overloading)
+            self.arguments(None, expr.arguments)
+            self.emit(CALL_BY_NAME, self.code.add_constant(
+                NameCallSite(callee, argc)))
+            return
+        self.emit(CALL, self.code.add_constant(site))
+
+    def method_call_expression(self, expr: AST.MethodCallExpression):
+        self.expression(expr.object)
+        self.method_call(self.interp.node_symbols.get(expr), expr.method, expr.arguments)
+
+    def method_call(self, sym: Optional[FunctionSymbol], name: str, arguments: List[AST.Expression]):
+        """Push the arguments and call a method on the receiver below them"""
+        argc = len(arguments)
+        if isinstance(sym, FunctionSymbol):
+            self.arguments(sym, arguments)
+            site = MethodSite(name, sym.ast_node, sym.is_virtual, argc)
+            self.emit(VCALL if sym.is_virtual or not sym.ast_node else CALL_METHOD,
+                      self.code.add_constant(site))
+        else:
+            self.arguments(None, arguments)
+            site = MethodSite(name, None, True, argc)
+            self.emit(VCALL, self.code.add_constant(site))
+
+
+def compile_function(interp: Interpreter, resolver: SlotResolver, node: Any, kind: str) -> CodeObject:
+    """Compile a function body; constructors first run the parent default constructor"""
+    code = CodeObject(node.name, kind)
+    gen = CodeGenerator(interp, code, resolver.resolve_function(node, kind))
+
+    if kind in (METHOD, CONSTRUCTOR):
+        class_name = resolver.owner_class(node)
+        if kind == CONSTRUCTOR and class_name:
+            # Call parent's default constructor first if exists
+            class_def = interp.classes.get(class_name)
+            parent_def = interp.classes.get(class_def.parent) if class_def and class_def.parent else None
+            parent_ctor = interp.find_constructor(parent_def, 0) if parent_def else None
+            if parent_ctor:
+                gen.emit(INIT_PARENT, code.add_constant(
+                    CallSite(parent_ctor, CONSTRUCTOR, 0)))
+
+    gen.statements(node.body)
+    return gen.finish()
+
+
+def compile_session(interp: Interpreter, resolver: SlotResolver, stmts: List[AST.Statement], name: str) -> CodeObject:
+    """Compile top-level statements against the persistent session scope"""
+    code = CodeObject(name, SESSION)
+    gen = CodeGenerator(interp, code, resolver.resolve_session(stmts, name))
+    gen.statements(stmts)
+    return gen.finish()
+
+
+def compile_field_initializers(interp: Interpreter, layout: ClassLayout) -> CodeObject:
+    """Code that evaluates the field initializers of a class and its bases"""
+    code = CodeObject(f"{layout.class_name}.<fields>", FUNCTION)
+    # Initializers have no locals of their own
+    gen = CodeGenerator(interp, code, FrameLayout(code.name, FUNCTION))
+    for index, initializer in enumerate(layout.initializers):
+        if initializer:
+            gen.expression(initializer)
+        else:
+            gen.emit_const(None)
+        gen.emit(INIT_FIELD, index)
+    return gen.finish()
+
+
+# Copies the fields of the single argument into the receiver (implicit copy constructor)
+COPY_CODE = CodeObject("<copy>", FUNCTION)
+COPY_CODE.instructions.extend(
+    (COPY_FIELDS, 0, LOAD_CONST, COPY_CODE.add_constant(None), RET, 0))
+COPY_CODE.nparams = COPY_CODE.nlocals = 1
+
+
+# Disassembler
+
+def disassemble(code: CodeObject) -> str:
+    """Human readable listing of a code object"""
+    lines = [f"{code.kind} {code.name} (params={code.nparams}, locals={code.nlocals})"]
+    instructions = code.instructions
+    for offset in range(0, len(instructions), 2):
+        op, arg = instructions[offset], instructions[offset + 1]
+        name = OPNAMES.get(op, f"<{op}>")
+        detail = ""
+        if op in (LOAD_LOCAL, STORE_LOCAL, ASSIGN_LOCAL, LOAD_REF):
+            detail = f"{arg} ({'/'.join(code.local_names.get(arg, ['?']))})"
+        elif op in (JUMP, POP_JUMP_IF_FALSE, POP_JUMP_IF_TRUE):
+            detail = f"-> {arg}"
+        elif op == BINARY_OP:
+            detail = f"{arg} ({BINARY_SYMBOLS[arg]})"
+        elif op in (INIT_FIELD, TAIL_CALL):
+            detail = f"{arg}"
+        elif op in (LOAD_CONST, LOAD_FIELD_REF, CALL, CALL_BY_NAME, CALL_BUILTIN, CALL_METHOD, VCALL,
+                    NEW, GETFIELD, SETFIELD, LOAD_THIS_FIELD, ASSIGN_THIS_FIELD, SLICE, INIT_PARENT, RAISE):
+            detail = f"{arg} ({code.constants[arg]!r})"
+        lines.append(f"  {offset:4d} {name:<18} {detail}".rstrip())
+    return "\n".join(lines)
@@ -0,0 +1,730 @@
+from __future__ import annotations
+import operator
+from typing import Any, Callable, Dict, List, Optional
+
+from gen import AST
+from semantic import ReferenceType, FunctionSymbol, FieldSymbol
+from interpreter import (Interpreter, RuntimeError, ObjectValue,
+                         ReferenceValue, FieldReferenceValue, InlineCache, TailCall)
+from optimizer import TailCallStatement
+
+
+"""
+Closure-compiling execution engine for MiniC
+
+Instead of dispatching through the isinstance chains of
+Interpreter.visit_statement / visit_expression on every evaluation, every
+statement and expression node is translated once into a Python closure.
+Operators, literal values and the call targets resolved by the semantic
+analysis are baked into the closures, so executing a function body is just a
+chain of closure calls.
+
+Statement closures return None on normal completion and a one-element tuple
+(value,) once a return statement has been executed (a TailCall for a
+TailCallStatement, see Interpreter.visit_function_definition).
+"""
+
+
+Code = Callable[[], Any]
+
+BINARY_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '%': operator.mod,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+BOOLEAN_OPERATORS = {'<', '<=', '>', '>=', '==', '!=', '&&', '||'}
+
+RETURN_NONE = (None,)
+
+
+def _run_nothing():
+    return None
+
+
+class ClosureInterpreter(Interpreter):
+    """Interpreter that compiles function bodies into closures before running them"""
+
+    def __init__(self, node_symbols: Dict[Any, Any] = None):
+        super().__init__(node_symbols)
+        # AST node (statement, expression or function) -> compiled closure
+        self.compiled: Dict[Any, Code] = {}
+
+    def interpret(self, ast: AST.Program):
+        """Interpret the program"""
+        for decl in ast.declarations:
+            self.register_declaration(decl)
+
+        if 'main' in self.functions:
+            main_func = self.functions['main'][0][0]
+            # Execute main body in the session scope
+            self.compile_function(main_func)()
+
+    def forget(self, nodes):
+        for node in nodes:
+            self.compiled.pop(node, None)
+        super().forget(nodes)
+
+    # Generic entry points used by the inherited helpers (instantiate_class, ...)
+
+    def visit_statement(self, stmt: AST.Statement):
+        return self.compile_statement(stmt)()
+
+    def visit_expression(self, expr: AST.Expression) -> Any:
+        return self.compile_expression(expr)()
+
+    # Calls
+
+    def visit_function_definition(self, node: AST.FunctionDefinition, args: List[Any]) -> Any:
+        """Execute a function with given arguments"""
+        body = self.compiled.get(node) or self.compile_function(node)
+
+        old_scopes = self.scopes
+        try:
+            while True:
+                scope = {}
+                for param, arg in zip(node.parameters, args):
+                    scope[param.name] = arg
+                self.scopes = [scope]
+                completion = body()
+                if type(completion) is not TailCall:
+                    break
+                args = completion.args
+        finally:
+            self.scopes = old_scopes
+        return completion[0] if completion is not None else None
+
+    def visit_method_definition(self, node: AST.MethodDefinition, obj: ObjectValue, args: List[Any]) -> Any:
+        """Execute a method with given object and arguments"""
+        body = self.compiled.get(node) or self.compile_function(node)
+
+        scope = {}
+        for param, arg in zip(node.parameters, args):
+            scope[param.name] = arg
+
+        old_scopes, old_this = self.scopes, self.this
+        self.scopes = [scope]
+        self.this = obj
+        try:
+            completion = body()
+        finally:
+            self.scopes, self.this = old_scopes, old_this
+        return completion[0] if completion is not None else None
+
+    def visit_constructor_definition(self, node: AST.ConstructorDefinition, obj: ObjectValue, args: List[Any]):
+        """Execute a constructor"""
+        self.run_parent_default_constructor(node, obj)
+        body = self.compiled.get(node) or self.compile_function(node)
+
+        scope = {}
+        for param, arg in zip(node.parameters, args):
+            scope[param.name] = arg
+
+        old_scopes, old_this = self.scopes, self.this
+        self.scopes = [scope]
+        self.this = obj
+        try:
+            body()
+        finally:
+            self.scopes, self.this = old_scopes, old_this
+
+    # Compilation
+
+    def compile_function(self, node: Any) -> Code:
+        """Compile the body of a function, method or constructor"""
+        code = self._compile_statements(node.body)
+        self.compiled[node] = code
+        return code
+
+    def compile_statement(self, stmt: AST.Statement) -> Code:
+        code = self.compiled.get(stmt)
+        if code is None:
+            code = self._compile_statement(stmt)
+            self.compiled[stmt] = code
+        return code
+
+    def compile_expression(self, expr: AST.Expression) -> Code:
+        code = self.compiled.get(expr)
+        if code is None:
+            code = self._compile_expression(expr)
+            self.compiled[expr] = code
+        return code
+
+    def _compile_statements(self, stmts: List[AST.Statement]) -> Code:
+        codes = [self.compile_statement(s) for s in stmts]
+        if not codes:
+            return _run_nothing
+        if len(codes) == 1:
+            return codes[0]
+
+        def run_statements():
+            for code in codes:
+                completion = code()
+                if completion is not None:
+                    return completion
+            return None
+        return run_statements
+
+    def _compile_scoped(self, stmts: List[AST.Statement]) -> Code:
+        """Compile statements that run in a fresh scope"""
+        body = self._compile_statements(stmts)
+        interp = self
+
+        def run_scoped():
+            scopes = interp.scopes
+            scopes.append({})
+            try:
+                return body()
+            finally:
+                scopes.pop()
+        return run_scoped
+
+    def _compile_condition(self, expr: AST.Expression) -> Code:
+        cond = self.compile_expression(expr)
+        if isinstance(expr, AST.BinaryExpression) and expr.operator in BOOLEAN_OPERATORS:
+            return cond
+        if isinstance(expr, AST.UnaryExpression) and expr.operator == '!':
+            return cond
+        truthy = self.is_truthy
+
+        def test():
+            return truthy(cond())
+        return test
+
+    # Statements
+
+    def _compile_statement(self, stmt: AST.Statement) -> Code:
+        if isinstance(stmt, AST.VariableDeclaration):
+            return self._compile_variable_declaration(stmt)
+        elif isinstance(stmt, AST.ExpressionStatement):
+            return self._compile_expression_statement(stmt)
+        elif isinstance(stmt, AST.BlockStatement):
+            return self._compile_scoped(stmt.statements)
+        elif isinstance(stmt, AST.IfStatement):
+            return self._compile_if_statement(stmt)
+        elif isinstance(stmt, AST.WhileStatement):
+            return self._compile_while_statement(stmt)
+        elif isinstance(stmt, AST.ReturnStatement):
+            return self._compile_return_statement(stmt)
+        return _run_nothing
+
+    def _compile_variable_declaration(self, node: AST.VariableDeclaration) -> Code:
+        interp = self
+        name = node.name
+        base_type = node.var_type.base_type
+
+        # Check if this is a reference type
+        if node.var_type.is_reference:
+            if not node.initializer:
+                def reference_without_initializer():
+                    raise RuntimeError(
+                        f"Reference '{name}' must be initialized.")
+                return reference_without_initializer
+
+            if isinstance(node.initializer, AST.IdentifierExpression):
+                # Simple case: T& x = y;
+                target_name = node.initializer.name
+                if isinstance(self.node_symbols.get(node.initializer), FieldSymbol):
+                    def declare_field_of_this_reference():
+                        interp.scopes[-1][name] = FieldReferenceValue(
+                            interp.this, target_name)
+                    return declare_field_of_this_reference
+
+                def declare_reference():
+                    scopes = interp.scopes
+                    for scope in reversed(scopes):
+                        if target_name in scope:
+                            scopes[-1][name] = ReferenceValue(
+                                target_name, scope)
+                            return None
+                    raise RuntimeError(
+                        f"Cannot initialize reference with undefined variable '{target_name}'.")
+                return declare_reference
+
+            if isinstance(node.initializer, AST.MemberAccessExpression):
+                # Case: T& x = obj.field;
+                target = self.compile_expression(node.initializer.object)
+                member = node.initializer.member
+
+                def declare_field_reference():
+                    obj = target()
+                    if not isinstance(obj, ObjectValue):
+                        raise RuntimeError(
+                            "Cannot initialize reference with non-object member access.")
+                    interp.scopes[-1][name] = FieldReferenceValue(obj, member)
+                return declare_field_reference
+
+            def reference_to_rvalue():
+                raise RuntimeError(
+                    f"Reference '{name}' must be initialized with an lvalue.")
+            return reference_to_rvalue
+
+        # Check if this is a class type
+        if base_type in self.classes:
+            if not node.initializer:
+                # Use default constructor
+                def declare_default_object():
+                    interp.scopes[-1][name] = interp.instantiate_class(
+                        base_type, [])
+                return declare_default_object
+
+            init = self.compile_expression(node.initializer)
+
+            def declare_object():
+                value = init()
+                # Slice if a derived object is assigned to a base variable
+                if isinstance(value, ObjectValue) and value.class_name != base_type:
+                    if interp.is_subclass(value.class_name, base_type):
+                        value = interp.slice_object(value, base_type)
+                interp.scopes[-1][name] = value
+            return declare_object
+
+        # Primitive type
+        if not node.initializer:
+            def declare_uninitialized():
+                interp.scopes[-1][name] = None
+            return declare_uninitialized
+
+        init = self.compile_expression(node.initializer)
+
+        def declare():
+            interp.scopes[-1][name] = init()
+        return declare
+
+    def _compile_expression_statement(self, stmt: AST.ExpressionStatement) -> Code:
+        interp = self
+        value = self.compile_expression(stmt.expression)
+
+        def expression_statement():
+            result = value()
+            if interp.repl_mode and result is not None:
+                print(result)
+        return expression_statement
+
+    def _compile_if_statement(self, stmt: AST.IfStatement) -> Code:
+        test = self._compile_condition(stmt.condition)
+        then_branch = self._compile_scoped(stmt.then_stmt)
+        if not stmt.else_stmt:
+            def if_then():
+                if test():
+                    return then_branch()
+                return None
+            return if_then
+
+        else_branch = self._compile_scoped(stmt.else_stmt)
+
+        def if_then_else():
+            if test():
+                return then_branch()
+            return else_branch()
+        return if_then_else
+
+    def _compile_while_statement(self, stmt: AST.WhileStatement) -> Code:
+        interp = self
+        test = self._compile_condition(stmt.condition)
+        body = self._compile_statements(stmt.body)
+
+        def while_loop():
+            scopes = interp.scopes
+            while test():
+                scopes.append({})
+                try:
+                    completion = body()
+                finally:
+                    scopes.pop()
+                if completion is not None:
+                    return completion
+            return None
+        return while_loop
+
+    def _compile_return_statement(self, stmt: AST.ReturnStatement) -> Code:
+        if not stmt.expression:
+            def return_void():
+                return RETURN_NONE
+            return return_void
+
+        if isinstance(stmt, TailCallStatement):
+            call = stmt.expression
+            args = self._compile_arguments(self.node_symbols[call], call.arguments)
+
+            def tail_call():
+                return TailCall([arg() for arg in args])
+            return tail_call
+
+        value = self.compile_expression(stmt.expression)
+
+        def return_value():
+            return (value(),)
+        return return_value
+
+    # Expressions
+
+    def _compile_expression(self, expr: AST.Expression) -> Code:
+        if isinstance(expr, AST.LiteralExpression):
+            return self._compile_literal_expression(expr)
+        elif isinstance(expr, AST.IdentifierExpression):
+            return self._compile_identifier_expression(expr)
+        elif isinstance(expr, AST.BinaryExpression):
+            return self._compile_binary_expression(expr)
+        elif isinstance(expr, AST.UnaryExpression):
+            return self._compile_unary_expression(expr)
+        elif isinstance(expr, AST.AssignmentExpression):
+            return self._compile_assignment_expression(expr)
+        elif isinstance(expr, AST.CallExpression):
+            return self._compile_call_expression(expr)
+        elif isinstance(expr, AST.MemberAccessExpression):
+            return self._compile_member_access_expression(expr)
+        elif isinstance(expr, AST.MethodCallExpression):
+            return self._compile_method_call_expression(expr)
+
+        expr_type = type(expr)
+
+        def unknown_expression():
+            raise RuntimeError(f"Unknown expression type: {expr_type}")
+        return unknown_expression
+
+    def _compile_literal_expression(self, expr: AST.LiteralExpression) -> Code:
+        value = Interpreter.visit_literal_expression(self, expr)
+
+        def literal():
+            return value
+        return literal
+
+    def _compile_identifier_expression(self, expr: AST.IdentifierExpression) -> Code:
+        interp = self
+        name = expr.name
+
+        if isinstance(self.node_symbols.get(expr), FieldSymbol):
+            # Field of the receiver (implicit this), index cached per receiver layout
+            cached_layout = None
+            cached_index = 0
+
+            def load_field():
+                nonlocal cached_layout, cached_index
+                this = interp.this
+                if this.layout is not cached_layout:
+                    cached_index = interp.field_index(this, name)
+                    cached_layout = this.layout
+                return this.values[cached_index]
+            return load_field
+
+        def load():
+            for scope in reversed(interp.scopes):
+                if name in scope:
+                    value = scope[name]
+                    # If it's a reference, get the referenced value
+                    if isinstance(value, ReferenceValue):
+                        return value.get()
+                    return value
+            raise RuntimeError(f"Undefined variable '{name}'.")
+        return load
+
+    def _compile_binary_expression(self, expr: AST.BinaryExpression) -> Code:
+        op = expr.operator
+        left = self.compile_expression(expr.left)
+        right = self.compile_expression(expr.right)
+        truthy = self.is_truthy
+
+        # Short-circuit evaluation for logical operators
+        if op == '&&':
+            def logic_and():
+                if not truthy(left()):
+                    return False
+                return truthy(right())
+            return logic_and
+        if op == '||':
+            def logic_or():
+                if truthy(left()):
+                    return True
+                return truthy(right())
+            return logic_or
+
+        if op == '/':
+            def divide():
+                lhs = left()
+                rhs = right()
+                if rhs == 0:
+                    raise RuntimeError("Division by zero")
+                return lhs // rhs  # Integer division
+            return divide
+
+        fn = BINARY_OPERATORS.get(op)
+        if fn is None:
+            def unknown_operator():
+                left()
+                right()
+                raise RuntimeError(f"Unknown operator: {op}")
+            return unknown_operator
+
+        if isinstance(expr.right, AST.LiteralExpression):
+            constant = Interpreter.visit_literal_expression(self, expr.right)
+
+            def binary_constant():
+                return fn(left(), constant)
+            return binary_constant
+
+        def binary():
+            return fn(left(), right())
+        return binary
+
+    def _compile_unary_expression(self, expr: AST.UnaryExpression) -> Code:
+        op = expr.operator
+        operand = self.compile_expression(expr.operand)
+
+        if op == '!':
+            truthy = self.is_truthy
+
+            def logic_not():
+                return not truthy(operand())
+            return logic_not
+        if op == '+':
+            def plus():
+                return +operand()
+            return plus
+        if op == '-':
+            def minus():
+                return -operand()
+            return minus
+
+        def unknown_operator():
+            operand()
+            raise RuntimeError(f"Unknown unary operator: {op}")
+        return unknown_operator
+
+    def _compile_assignment_expression(self, expr: AST.AssignmentExpression) -> Code:
+        interp = self
+        value_code = self.compile_expression(expr.value)
+
+        if isinstance(expr.target, AST.IdentifierExpression):
+            name = expr.target.name
+
+            if isinstance(self.node_symbols.get(expr.target), FieldSymbol):
+                def assign_field_of_this():
+                    value = value_code()
+                    interp.assign_field_of_this(name, value)
+                    return value
+                return assign_field_of_this
+
+            def assign_variable():
+                value = value_code()
+                for scope in reversed(interp.scopes):
+                    if name in scope:
+                        target_value = scope[name]
+                        if isinstance(target_value, ReferenceValue):
+                            target_value.set(value)
+                        elif isinstance(target_value, ObjectValue) and isinstance(value, ObjectValue):
+                            # For object assignment, copy the fields
+                            interp.copy_fields(target_value, value)
+                        else:
+                            scope[name] = value
+                        return value
+                raise RuntimeError(f"Undefined variable '{name}'.")
+            return assign_variable
+
+        if isinstance(expr.target, AST.MemberAccessExpression):
+            target = self.compile_expression(expr.target.object)
+            member = expr.target.member
+            # Field index for the receiver layout seen last
+            cached_layout = None
+            cached_index = 0
+
+            def assign_field():
+                nonlocal cached_layout, cached_index
+                value = value_code()
+                obj = target()
+                if not isinstance(obj, ObjectValue):
+                    raise RuntimeError("Cannot access member of non-object")
+                if obj.layout is not cached_layout:
+                    cached_index = interp.field_index(obj, member)
+                    cached_layout = obj.layout
+                obj.values[cached_index] = value
+                return value
+            return assign_field
+
+        def invalid_target():
+            value_code()
+            raise RuntimeError("Invalid assignment target")
+        return invalid_target
+
+    def _compile_arguments(self, sym: Optional[FunctionSymbol], arguments: List[AST.Expression]) -> List[Code]:
+        """Compile call arguments, binding reference parameters to lvalues"""
+        params = sym.parameters if sym is not None else []
+        codes = []
+        for i, arg_expr in enumerate(arguments):
+            value = self.compile_expression(arg_expr)
+            if i < len(params) and isinstance(params[i].type, ReferenceType):
+                codes.append(self._compile_reference_argument(arg_expr, value))
+            else:
+                codes.append(value)
+        return codes
+
+    def _compile_reference_argument(self, arg_expr: AST.Expression, value: Code) -> Code:
+        interp = self
+        if isinstance(arg_expr, AST.IdentifierExpression):
+            name = arg_expr.name
+
+            if isinstance(self.node_symbols.get(arg_expr), FieldSymbol):
+                def bind_field_of_this_reference():
+                    return FieldReferenceValue(interp.this, name)
+                return bind_field_of_this_reference
+
+            def bind_reference():
+                for scope in reversed(interp.scopes):
+                    if name in scope:
+                        value = scope[name]
+                        if isinstance(value, ReferenceValue):
+                            # Passing a reference on: refer to its target, not to the reference
+                            return value
+                        return ReferenceValue(name, scope)
+                return ReferenceValue(name, None)
+            return bind_reference
+
+        if isinstance(arg_expr, AST.MemberAccessExpression):
+            target = self.compile_expression(arg_expr.object)
+            member = arg_expr.member
+
+            def bind_field_reference():
+                obj = target()
+                if isinstance(obj, ObjectValue):
+                    return FieldReferenceValue(obj, member)
+                return value()
+            return bind_field_reference
+
+        return value
+
+    def _compile_call_expression(self, expr: AST.CallExpression) -> Code:
+        interp = self
+        callee = expr.callee
+
+        # Builtin function
+        if callee in self.builtin_functions:
+            builtin = self.builtin_functions[callee]
+            args = [self.compile_expression(arg) for arg in expr.arguments]
+
+            def call_builtin():
+                builtin(*[arg() for arg in args])
+                return None
+            return call_builtin
+
+        # Constructor call
+        if callee in self.classes:
+            arguments = expr.arguments
+
+            def construct():
+                return interp.instantiate_class(callee, arguments)
+            return construct
+
+        # User-defined function resolved by the semantic analysis
+        sym = self.node_symbols.get(expr)
+        if isinstance(sym, (AST.FunctionDefinition, AST.MethodDefinition, AST.ConstructorDefinition)):
+            func_def = sym
+            args = self._compile_arguments(None, expr.arguments)
+        elif isinstance(sym, FunctionSymbol) and sym.ast_node:
+            if sym.is_method:
+                return self._compile_implicit_method_call(sym, expr)
+            func_def = sym.ast_node
+            args = self._compile_arguments(sym, expr.arguments)
+        else:
+            return self._compile_call_by_name(expr)
+
+        def call():
+            return interp.visit_function_definition(func_def, [arg() for arg in args])
+        return call
+
+    def _compile_implicit_method_call(self, sym: FunctionSymbol, expr: AST.CallExpression) -> Code:
+        # Method of the receiver called without object (implicit this)
+        interp = self
+        args = self._compile_arguments(sym, expr.arguments)
+        cache = InlineCache()
+
+        def call_method_of_this():
+            this = interp.this
+            method_def = interp.dispatch_method(sym, cache, this)
+            return interp.visit_method_definition(method_def, this, [arg() for arg in args])
+        return call_method_of_this
+
+    def _compile_call_by_name(self, expr: AST.CallExpression) -> Code:
+        # Fallback to name search (less reliable for overloading)
+        interp = self
+        callee = expr.callee
+        args = [self.compile_expression(arg) for arg in expr.arguments]
+
+        def call_by_name():
+            for func_def, closure in interp.functions.get(callee, []):
+                if len(func_def.parameters) == len(args):
+                    return interp.visit_function_definition(func_def, [arg() for arg in args])
+            raise RuntimeError(f"Unknown function '{callee}'.")
+        return call_by_name
+
+    def _compile_method_call_expression(self, expr: AST.MethodCallExpression) -> Code:
+        interp = self
+        target = self.compile_expression(expr.object)
+        method_name = expr.method
+        sym = self.node_symbols.get(expr)
+        cache = InlineCache()
+
+        if isinstance(sym, FunctionSymbol):
+            static_method = sym.ast_node
+            is_virtual = sym.is_virtual
+            args = self._compile_arguments(sym, expr.arguments)
+
+            def call_method():
+                obj = target()
+                if not isinstance(obj, ObjectValue):
+                    raise RuntimeError("Cannot call method on non-object")
+
+                method_def = static_method
+                if is_virtual:
+                    # Look for the method in the dynamic type
+                    actual_method = interp.lookup_method(
+                        cache, obj.class_name, method_name)
+                    if actual_method:
+                        method_def = actual_method
+                if not method_def:
+                    raise RuntimeError(f"Method '{method_name}' not found.")
+
+                return interp.visit_method_definition(method_def, obj, [arg() for arg in args])
+            return call_method
+
+        # Fallback
+        args = [self.compile_expression(arg) for arg in expr.arguments]
+
+        def call_method_by_name():
+            obj = target()
+            if not isinstance(obj, ObjectValue):
+                raise RuntimeError("Cannot call method on non-object")
+            class_def = interp.classes.get(obj.class_name)
+            if not class_def:
+                raise RuntimeError(f"Class '{obj.class_name}' not found.")
+            method = interp.lookup_method(cache, obj.class_name, method_name)
+            if not method:
+                raise RuntimeError(
+                    f"Method '{method_name}' not found in class '{obj.class_name}'.")
+            return interp.visit_method_definition(method, obj, [arg() for arg in args])
+        return call_method_by_name
+
+    def _compile_member_access_expression(self, expr: AST.MemberAccessExpression) -> Code:
+        interp = self
+        target = self.compile_expression(expr.object)
+        member = expr.member
+        # Field index for the receiver layout seen last
+        cached_layout = None
+        cached_index = 0
+
+        def member_access():
+            nonlocal cached_layout, cached_index
+            obj = target()
+            if not isinstance(obj, ObjectValue):
+                raise RuntimeError("Cannot access member of non-object")
+            if obj.layout is not cached_layout:
+                cached_index = interp.field_index(obj, member)
+                cached_layout = obj.layout
+            return obj.values[cached_index]
+        return member_access
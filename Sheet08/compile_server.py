@@ -0,0 +1,322 @@
+from __future__ import annotations
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+
+"""
+MiniC batch compile server
+
+A long-running process that keeps the lexer, both parsers, the analyzer and
+the interpreters imported (and the ANTLR prediction DFA warmed) in a pool of
+worker processes, so checking or running a file costs only the work on that
+file instead of a Python start and the ANTLR imports.
+
+Jobs are JSON objects, one per line, read from stdin (--stdio) or from the
+connections of a Unix socket (--socket PATH):
+
+    {"id": 1, "action": "check", "path": "tests/positive/P01_vars.cpp"}
+    {"id": 2, "action": "run", "source": "int main() { print_int(1); return 0; }",
+     "engine": "vm", "lexer": "fast", "parser": "fast", "optimize": true, "timeout": 5}
+
+action is "check" (parse and analyze) or "run" (also execute, default);
+engine, lexer, parser, optimize (run optimizer.py before executing),
+max_depth (call depth of the vm engine) and timeout (seconds, default 10)
+are optional. Every job gets one response line, in the order the jobs
+complete:
+
+    {"id": 1, "ok": true, "diagnostics": [], "output": null, "time": 0.0012}
+    {"id": 2, "ok": true, "diagnostics": [], "output": "1", "time": 0.0008}
+
+diagnostics holds the syntax, semantic, runtime, timeout or request errors;
+output is the program output of "run" jobs; time is the worker time in
+seconds. If a worker process dies (killed, out of memory), its jobs are
+answered with ok false and the pool is restarted for the following jobs.
+
+Usage:
+    python compile_server.py serve --socket /tmp/minic.sock --jobs 4
+    python compile_server.py serve --stdio < jobs.jsonl
+    python compile_server.py client --socket /tmp/minic.sock [--check] file.cpp...
+"""
+
+
+ACTIONS = ("check", "run")
+DEFAULT_TIMEOUT = 10.0
+
+
+class JobTimeout(BaseException):
+    """Raised by SIGALRM anywhere in a job
+
+    Not an Exception: an `except Exception` further down the stack would
+    swallow it, and the one-shot timer would not fire again.
+    """
+
+
+# Worker side
+
+def warm_worker():
+    """Process pool initializer: import everything a job needs once per worker"""
+    import gen.MiniCParser  # noqa: F401
+    import interpreter  # noqa: F401
+    import antlr_frontend
+
+    antlr_frontend.warm_up()
+
+
+def _raise_timeout(signum, frame):
+    raise JobTimeout()
+
+
+def process_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Check or run one job in a worker; never raises"""
+    from interpreter import RuntimeError, create_interpreter, load_cached_source, recursion_overflow
+    from optimizer import optimize_program
+    from semantic import SemanticError
+
+    start = time.perf_counter()
+    response: Dict[str, Any] = {"id": job.get("id"), "ok": False, "diagnostics": [], "output": None}
+    timeout = float(job.get("timeout", DEFAULT_TIMEOUT))
+    old_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        action = job.get("action", "run")
+        if action not in ACTIONS:
+            raise ValueError(f"unknown action '{action}'")
+        if "source" in job:
+            source = job["source"]
+        elif "path" in job:
+            source = Path(job["path"]).read_text(encoding="utf-8")
+        else:
+            raise ValueError("a job needs 'path' or 'source'")
+
+        ast, analyzer = load_cached_source(source, job.get("lexer", "fast"), job.get("parser", "fast"))
+        if action == "run":
+            if job.get("optimize"):
+                optimize_program(ast, analyzer.node_symbols)
+            engine = create_interpreter(job.get("engine", "tree"), analyzer.node_symbols, job.get("max_depth"))
+            try:
+                engine.interpret(ast)
+            finally:
+                response["output"] = "\n".join(engine.output)
+        response["ok"] = True
+    except (SemanticError, RuntimeError) as e:
+        response["diagnostics"].append(str(e))
+    except RecursionError:
+        response["diagnostics"].append(str(recursion_overflow()))
+    except JobTimeout:
+        response["diagnostics"].append(f"Timeout: no result after {timeout:g} s")
+    except (OSError, ValueError, TypeError) as e:
+        response["diagnostics"].append(f"Bad request: {e}")
+    except Exception as e:
+        response["diagnostics"].append(f"Internal error: {e}")
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, old_handler)
+    response["time"] = round(time.perf_counter() - start, 6)
+    return response
+
+
+# Server side
+
+def error_response(job_id: Any, diagnostic: str) -> Dict[str, Any]:
+    return {"id": job_id, "ok": False, "diagnostics": [diagnostic], "output": None, "time": 0.0}
+
+
+class CompileServer:
+    """Pool of warm workers shared by all connections"""
+
+    def __init__(self, jobs: int):
+        self.jobs = jobs
+        self.lock = threading.Lock()
+        self.pool = self._start_pool()
+        # Start and warm every worker now, before connections come in
+        for future in [self.pool.submit(time.sleep, 0) for _ in range(jobs)]:
+            future.result()
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.jobs, initializer=warm_worker)
+
+    def _restart_pool(self, broken: ProcessPoolExecutor):
+        """Replace a pool whose worker died; every other thread sees the new one"""
+        with self.lock:
+            if self.pool is broken:
+                self.pool = self._start_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, line: str) -> Future:
+        """Future of the response to a job line; it never fails"""
+        response: Future = Future()
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("a job must be a JSON object")
+        except ValueError as e:
+            response.set_result(error_response(None, f"Bad request: {e}"))
+            return response
+
+        pool = self.pool
+        try:
+            work = pool.submit(process_job, job)
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            pool = self.pool
+            work = pool.submit(process_job, job)
+
+        def finish(work: Future):
+            try:
+                response.set_result(work.result())
+            except BrokenProcessPool:
+                self._restart_pool(pool)
+                response.set_result(error_response(job.get("id"), "Internal error: the worker process died"))
+            except Exception as e:
+                response.set_result(error_response(job.get("id"), f"Internal error: {e}"))
+
+        work.add_done_callback(finish)
+        return response
+
+    def serve_stream(self, lines: Iterable[str], out: TextIO):
+        """Answer every job line; responses are written as they complete"""
+        done = threading.Condition()
+        counts = {"submitted": 0, "answered": 0}
+
+        def respond(future: Future):
+            with done:
+                try:
+                    out.write(json.dumps(future.result()) + "\n")
+                    out.flush()
+                except OSError:
+                    # The client went away
+                    pass
+                except Exception as e:
+                    out.write(json.dumps(error_response(None, f"Internal error: {e}")) + "\n")
+                    out.flush()
+                finally:
+                    # Always counted, or the wait below would never end
+                    counts["answered"] += 1
+                    done.notify()
+
+        for line in lines:
+            if line.strip():
+                with done:
+                    counts["submitted"] += 1
+                self.submit(line).add_done_callback(respond)
+        # Callbacks run after result() returns, so wait for the writes themselves
+        with done:
+            done.wait_for(lambda: counts["answered"] == counts["submitted"])
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+class _ConnectionHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        lines = (line.decode("utf-8") for line in self.rfile)
+        out = self.wfile
+
+        class Writer:
+            def write(self, text: str):
+                out.write(text.encode("utf-8"))
+
+            def flush(self):
+                out.flush()
+
+        try:
+            self.server.compile_server.serve_stream(lines, Writer())
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_socket(path: str, jobs: int):
+    if os.path.exists(path):
+        os.unlink(path)
+    server = CompileServer(jobs)
+    with _UnixServer(path, _ConnectionHandler) as unix_server:
+        unix_server.compile_server = server
+        print(f"MiniC compile server on {path} with {jobs} workers", file=sys.stderr)
+        # Clean up on kill as on Ctrl+C
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            unix_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            os.unlink(path)
+
+
+# Client side
+
+def send_jobs(path: str, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Send jobs over the server socket; responses in job order"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        payload = "".join(json.dumps({**job, "id": i}) + "\n" for i, job in enumerate(jobs))
+        sender = threading.Thread(target=lambda: (sock.sendall(payload.encode("utf-8")),
+                                                  sock.shutdown(socket.SHUT_WR)))
+        sender.start()
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+        with sock.makefile("r", encoding="utf-8") as reader:
+            for line in reader:
+                response = json.loads(line)
+                responses[response["id"]] = response
+        sender.join()
+    return responses
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="MiniC batch compile server")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="start the server")
+    transport = serve.add_mutually_exclusive_group(required=True)
+    transport.add_argument("--socket", help="Unix socket path to listen on")
+    transport.add_argument("--stdio", action="store_true", help="read jobs from stdin, answer on stdout")
+    serve.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                       help="worker processes (default: one per CPU)")
+
+    client = commands.add_parser("client", help="check or run files on a running server")
+    client.add_argument("--socket", required=True, help="Unix socket path of the server")
+    client.add_argument("--check", action="store_true", help="only parse and analyze")
+    client.add_argument("--engine", default="tree")
+    client.add_argument("files", nargs="+", type=Path)
+
+    args = arg_parser.parse_args()
+    if args.command == "serve":
+        if args.stdio:
+            server = CompileServer(args.jobs)
+            try:
+                server.serve_stream(sys.stdin, sys.stdout)
+            finally:
+                server.shutdown()
+        else:
+            serve_socket(args.socket, args.jobs)
+        sys.exit(0)
+
+    action = "check" if args.check else "run"
+    start = time.perf_counter()
+    responses = send_jobs(args.socket, [{"action": action, "path": str(f.resolve()), "engine": args.engine}
+                                        for f in args.files])
+    elapsed = time.perf_counter() - start
+    for f, response in zip(args.files, responses):
+        print(f"[{'OK' if response['ok'] else 'ERROR'}] {f} ({response['time'] * 1000:.1f} ms)")
+        for diagnostic in response["diagnostics"]:
+            print(f"    {diagnostic}")
+        if response["output"]:
+            print("\n".join("    " + line for line in response["output"].splitlines()))
+    print(f"\n{len(responses)} files in {elapsed:.2f} s ({len(responses) / elapsed:.1f} files/s)")
+    sys.exit(0 if all(r["ok"] for r in responses) else 1)
@@ -0,0 +1,255 @@
+from __future__ import annotations
+import re
+import sys
+from typing import Iterator, List, Optional
+
+from antlr4 import InputStream, Token
+from antlr4.CommonTokenFactory import CommonTokenFactory
+from antlr4.Token import CommonToken
+from antlr4.error.ErrorListener import ConsoleErrorListener, ErrorListener, ProxyErrorListener
+
+from gen.MiniCLexer import MiniCLexer
+
+
+"""
+Hand-written MiniC lexer
+
+Drop-in replacement for the ANTLR-generated gen/MiniCLexer.py: a token
+source for CommonTokenStream/MiniCParser that produces the same tokens
+(type, text, start/stop index, line and column) but matches them with one
+compiled master regex instead of running the ATN simulator in Python.
+
+The alternatives of the master regex follow the lexer rules of MiniC.g4 and
+are ordered so that the first alternative that matches is also the longest
+match ANTLR would pick: comments before '/', two-character operators before
+their one-character prefixes, and keywords/BoolLiteral split off the
+Identifier match by a table lookup (on equal length the earlier rule wins).
+WS, comments and '#' preprocessor lines are skipped like the '-> skip'
+rules. Input no rule matches is reported to the error listeners as a token
+recognition error and skipped the way the ANTLR lexer recovers: the longest
+prefix some rule could still have continued plus the offending character.
+"""
+
+
+_ESCAPE = r"""\\(?:[abfnrtv\\'"]|[0-7][0-7]?[0-7]?|x[0-9a-fA-F]+)"""
+
+_MASTER = re.compile("|".join([
+    r"(?P<skip>[ \t\r\n]+|//[^\r\n]*|/\*.*?\*/|\#[^\r\n]*)",
+    r"(?P<word>[a-zA-Z_][a-zA-Z0-9_]*)",
+    r"(?P<int>[0-9]+)",
+    rf"(?P<char>'(?:{_ESCAPE}|[^'\\])')",
+    rf'(?P<string>"(?:{_ESCAPE}|[^"\\])*")',
+    r"(?P<op>==|!=|<=|>=|&&|\|\||[-+*/%=<>!&.,;:(){}])",
+]), re.DOTALL)
+
+# Longest prefixes of unfinished tokens, used to skip input like ANTLR on errors
+_PARTIAL = re.compile("|".join([
+    r"""'(?:[^'\\]|\\(?:[abfnrtv\\'"]|[0-7]{1,3}|x[0-9a-fA-F]*)?)?""",
+    rf'"(?:{_ESCAPE}|[^"\\])*(?:\\x?)?',
+    r"\|",
+]), re.DOTALL)
+
+KEYWORDS = {
+    'if': MiniCLexer.IF,
+    'else': MiniCLexer.ELSE,
+    'while': MiniCLexer.WHILE,
+    'return': MiniCLexer.RETURN,
+    'class': MiniCLexer.CLASS,
+    'public': MiniCLexer.PUBLIC,
+    'virtual': MiniCLexer.VIRTUAL,
+    'bool': MiniCLexer.BOOL,
+    'int': MiniCLexer.INT,
+    'char': MiniCLexer.CHAR,
+    'string': MiniCLexer.STRING,
+    'void': MiniCLexer.VOID,
+    'true': MiniCLexer.BoolLiteral,
+    'false': MiniCLexer.BoolLiteral,
+}
+
+OPERATORS = {
+    '+': MiniCLexer.PLUS, '-': MiniCLexer.MINUS, '*': MiniCLexer.STAR,
+    '/': MiniCLexer.DIV, '%': MiniCLexer.MOD, '=': MiniCLexer.ASSIGN,
+    '==': MiniCLexer.EQ, '!=': MiniCLexer.NEQ, '<': MiniCLexer.LT,
+    '<=': MiniCLexer.LE, '>': MiniCLexer.GT, '>=': MiniCLexer.GE,
+    '&&': MiniCLexer.AND, '||': MiniCLexer.OR, '!': MiniCLexer.NOT,
+    '&': MiniCLexer.REF, '.': MiniCLexer.DOT, ',': MiniCLexer.COMMA,
+    ';': MiniCLexer.SEMI, ':': MiniCLexer.COLON, '(': MiniCLexer.LPAREN,
+    ')': MiniCLexer.RPAREN, '{': MiniCLexer.LBRACE, '}': MiniCLexer.RBRACE,
+}
+
+
+class FastLexer:
+    """Regex-based token source producing the tokens of MiniCLexer"""
+
+    # Attributes the parser reads from its token source
+    symbolicNames = MiniCLexer.symbolicNames
+    literalNames = MiniCLexer.literalNames
+
+    def __init__(self, input_stream: InputStream):
+        self._input = input_stream
+        self._factory = CommonTokenFactory.DEFAULT
+        self._listeners: List[ErrorListener] = [ConsoleErrorListener.INSTANCE]
+        # Position of the next token (read by CommonTokenFactory for conjured tokens)
+        self.line = 1
+        self.column = 0
+        self._tokens = self._scan()
+
+    # TokenSource interface
+
+    def nextToken(self) -> Token:
+        return next(self._tokens)
+
+    def getSourceName(self) -> str:
+        return self._input.getSourceName()
+
+    @property
+    def inputStream(self) -> InputStream:
+        return self._input
+
+    def getInputStream(self) -> InputStream:
+        return self._input
+
+    def removeErrorListeners(self):
+        self._listeners = []
+
+    def addErrorListener(self, listener: ErrorListener):
+        self._listeners.append(listener)
+
+    def getErrorListenerDispatch(self) -> ErrorListener:
+        return ProxyErrorListener(self._listeners)
+
+    # Scanning
+
+    def _scan(self) -> Iterator[Token]:
+        text = self._input.strdata
+        source = (self, self._input)
+        match = _MASTER.match
+        keywords = KEYWORDS
+        operators = OPERATORS
+        identifier = MiniCLexer.Identifier
+        new_token = CommonToken.__new__
+
+        pos = 0
+        end = len(text)
+        line = 1
+        line_start = 0
+        while pos < end:
+            m = match(text, pos)
+            if m is None:
+                partial = _PARTIAL.match(text, pos)
+                failed = partial.end() if partial else pos
+                # The character that failed is dropped too (unless it is EOF)
+                stop = min(failed + 1, end)
+                self.line, self.column = line, pos - line_start
+                self._report(text[pos:stop], line, pos - line_start)
+                newlines = text.count("\n", pos, stop)
+                if newlines:
+                    line += newlines
+                    line_start = text.rindex("\n", pos, stop) + 1
+                pos = stop
+                continue
+
+            kind = m.lastgroup
+            value = m.group()
+            stop = m.end()
+            if kind == "skip":
+                newlines = value.count("\n")
+                if newlines:
+                    line += newlines
+                    line_start = text.rindex("\n", pos, stop) + 1
+                pos = stop
+                continue
+
+            if kind == "word":
+                token_type = keywords.get(value, identifier)
+            elif kind == "op":
+                token_type = operators[value]
+            elif kind == "int":
+                token_type = MiniCLexer.IntLiteral
+            elif kind == "string":
+                token_type = MiniCLexer.StringLiteral
+            else:
+                token_type = MiniCLexer.CharLiteral
+
+            token = new_token(CommonToken)
+            token.source = source
+            token.type = token_type
+            token.channel = Token.DEFAULT_CHANNEL
+            token.start = pos
+            token.stop = stop - 1
+            token.tokenIndex = -1
+            token.line = line
+            token.column = pos - line_start
+            token._text = value
+            yield token
+
+            if kind in ("string", "char") and "\n" in value:
+                # Literals may span lines
+                line += value.count("\n")
+                line_start = text.rindex("\n", pos, stop) + 1
+            pos = stop
+
+        self.line, self.column = line, pos - line_start
+        eof = CommonToken(source, Token.EOF, Token.DEFAULT_CHANNEL, pos, pos - 1)
+        eof.text = "<EOF>"
+        while True:
+            yield eof
+
+    def _report(self, text: str, line: int, column: int):
+        display = text.replace("\n", "\\n").replace("\t", "\\t").replace("\r", "\\r")
+        msg = f"token recognition error at: '{display}'"
+        self.getErrorListenerDispatch().syntaxError(self, None, line, column, msg, None)
+
+
+LEXERS = ("fast", "antlr")
+
+
+def create_lexer(input_stream: InputStream, lexer: str = "fast"):
+    """Token source for MiniCParser: the hand-written lexer or the generated one"""
+    if lexer == "fast":
+        return FastLexer(input_stream)
+    if lexer == "antlr":
+        return MiniCLexer(input_stream)
+    raise ValueError(f"Unknown lexer '{lexer}'. Choose one of: {', '.join(LEXERS)}")
+
+
+def tokenize(text: str, fast: bool = True) -> List[Token]:
+    """All tokens of a text up to and including EOF"""
+    lexer = FastLexer(InputStream(text)) if fast else MiniCLexer(InputStream(text))
+    tokens = []
+    while True:
+        token = lexer.nextToken()
+        tokens.append(token)
+        if token.type == Token.EOF:
+            return tokens
+
+
+def compare_tokens(text: str) -> Optional[str]:
+    """None if both lexers agree on the text, otherwise the first difference"""
+    expected = tokenize(text, fast=False)
+    actual = tokenize(text, fast=True)
+    for i, (e, a) in enumerate(zip(expected, actual)):
+        if (e.type, e.text, e.start, e.stop, e.line, e.column) != \
+                (a.type, a.text, a.start, a.stop, a.line, a.column):
+            return f"token {i}: expected {e}, got {a}"
+    if len(expected) != len(actual):
+        return f"expected {len(expected)} tokens, got {len(actual)}"
+    return None
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+
+    # Verify token-for-token against the ANTLR lexer on all test programs
+    base = Path(__file__).parent
+    files = sorted(base.glob("tests/*/*.cpp")) + sorted(base.glob("benchmarks/*.cpp"))
+    agreed = 0
+    for f in files:
+        difference = compare_tokens(f.read_text(encoding="utf-8"))
+        if difference is None:
+            agreed += 1
+            print(f"  [PASS] {f.parent.name}/{f.name}")
+        else:
+            print(f"  [FAIL] {f.parent.name}/{f.name}: {difference}")
+    print(f"\nSummary: {agreed}/{len(files)} files lexed identically")
+    sys.exit(0 if agreed == len(files) else 1)
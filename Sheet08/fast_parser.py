@@ -0,0 +1,627 @@
+from __future__ import annotations
+import random
+import sys
+from typing import Any, FrozenSet, List, Optional
+
+from antlr4 import InputStream, Token
+from antlr4.error.ErrorListener import ConsoleErrorListener, ErrorListener, ProxyErrorListener
+
+from gen import AST
+from gen.MiniCLexer import MiniCLexer as T
+from fast_lexer import KEYWORDS, OPERATORS, create_lexer
+
+
+"""
+Hand-written MiniC parser
+
+Builds gen/AST.py nodes directly from the token source in one pass: a
+recursive-descent parser for declarations and statements and precedence
+climbing for expressions. Unlike MiniCParser + ASTBuilder it allocates no
+parse tree and needs no second walk over it.
+
+The parser follows MiniC.g4 exactly, including its quirks: every binary
+operator is left-associative (also '='), unary operators bind tighter than
+'*' but looser than '.', and program stops silently at the first token that
+cannot start a declaration. The decisions ANTLR needs lookahead for are
+made on at most three tokens (variable declaration vs. expression statement,
+method vs. field vs. constructor).
+
+Every node gets the same source span (AST.Span) as ASTBuilder gives it: from
+the first to the last token of its rule, a parenthesized expression being
+the node of the expression inside.
+
+Syntax errors are reported to the error listeners at the same line:column
+as MiniCParser reports its first error. The messages use ANTLR's wording
+(mismatched input, extraneous input, missing token, no viable alternative)
+but are not guaranteed to be identical: ANTLR tries single-token deletion
+and computes expected-token sets at more decisions than this parser does.
+Parsing stops at the first error; program() and statement() then return
+None.
+
+`python fast_parser.py` checks both parsers on all test programs and on
+broken variants of the positive tests (first error at the same position).
+"""
+
+
+PRIMITIVE_TYPES = frozenset({T.BOOL, T.INT, T.CHAR, T.STRING, T.VOID})
+TYPE_START = PRIMITIVE_TYPES | {T.Identifier}
+DECLARATION_START = TYPE_START | {T.CLASS}
+MEMBER_START = TYPE_START | {T.VIRTUAL}
+LITERALS = frozenset({T.BoolLiteral, T.IntLiteral, T.CharLiteral, T.StringLiteral})
+EXPRESSION_START = LITERALS | {T.Identifier, T.PLUS, T.MINUS, T.NOT, T.LPAREN}
+STATEMENT_START = EXPRESSION_START | PRIMITIVE_TYPES | {T.IF, T.WHILE, T.RETURN, T.LBRACE}
+
+# Precedence climbing levels, in the order of the expression alternatives in MiniC.g4
+BINARY_PRECEDENCE = {
+    T.ASSIGN: 1,
+    T.OR: 2,
+    T.AND: 3,
+    T.EQ: 4, T.NEQ: 4,
+    T.LT: 5, T.LE: 5, T.GT: 5, T.GE: 5,
+    T.PLUS: 6, T.MINUS: 6,
+    T.STAR: 7, T.DIV: 7, T.MOD: 7,
+}
+UNARY_PRECEDENCE = 8
+
+# Tokens that may follow an expression / an identifier starting an expression statement
+EXPRESSION_FOLLOW = frozenset(BINARY_PRECEDENCE) | {T.DOT, T.SEMI, T.RPAREN}
+IDENTIFIER_STATEMENT_FOLLOW = frozenset(BINARY_PRECEDENCE) | {T.DOT, T.SEMI, T.LPAREN}
+STATEMENT_FOLLOW = STATEMENT_START | {T.RBRACE, T.ELSE}
+MEMBER_FOLLOW = MEMBER_START | {T.RBRACE}
+
+
+class ParseStopped(Exception):
+    """Raised after a syntax error was reported, unwinds to the entry rule"""
+
+
+# Token types with a fixed text are shown as that text, like the parser's literalNames
+LITERAL_NAMES = {token_type: f"'{text}'" for text, token_type in {**KEYWORDS, **OPERATORS}.items()
+                 if token_type != T.BoolLiteral}
+
+
+def token_name(token_type: int) -> str:
+    """Name of a token type as ANTLR prints it in expected-token sets"""
+    if token_type == Token.EOF:
+        return "<EOF>"
+    return LITERAL_NAMES.get(token_type) or T.symbolicNames[token_type]
+
+
+def format_expected(types: FrozenSet[int]) -> str:
+    names = [token_name(t) for t in sorted(types)]
+    return names[0] if len(names) == 1 else "{" + ", ".join(names) + "}"
+
+
+def quote(text: str) -> str:
+    return "'" + text.replace("\n", "\\n").replace("\t", "\\t").replace("\r", "\\r") + "'"
+
+
+class FastParser:
+    """Recursive-descent parser producing the AST of ASTBuilder"""
+
+    def __init__(self, token_source: Any):
+        tokens = []
+        while True:
+            token = token_source.nextToken()
+            tokens.append(token)
+            if token.type == Token.EOF:
+                break
+        # Lookahead past the end keeps reading EOF
+        tokens.extend([token] * 3)
+        self.tokens = tokens
+        self.types = [t.type for t in tokens]
+        self.pos = 0
+        self._listeners: List[ErrorListener] = [ConsoleErrorListener.INSTANCE]
+
+    def removeErrorListeners(self):
+        self._listeners = []
+
+    def addErrorListener(self, listener: ErrorListener):
+        self._listeners.append(listener)
+
+    def getErrorListenerDispatch(self) -> ErrorListener:
+        return ProxyErrorListener(self._listeners)
+
+    # Entry rules
+
+    def program(self) -> Optional[AST.Program]:
+        """declaration*, up to the first token that cannot start a declaration"""
+        try:
+            return self._program()
+        except ParseStopped:
+            return None
+
+    def statement(self) -> Optional[AST.Statement]:
+        try:
+            return self._statement()
+        except ParseStopped:
+            return None
+
+    def at_eof(self) -> bool:
+        return self.types[self.pos] == Token.EOF
+
+    def reset(self):
+        self.pos = 0
+
+    # Error reporting
+
+    def _report(self, index: int, msg: str):
+        token = self.tokens[index]
+        self.getErrorListenerDispatch().syntaxError(self, token, token.line, token.column, msg, None)
+        raise ParseStopped(msg)
+
+    def _display(self, index: int) -> str:
+        return quote(self.tokens[index].text)
+
+    def _sync(self, expected: FrozenSet[int]):
+        """Error at a decision whose alternatives start with `expected`"""
+        if self.types[self.pos + 1] in expected:
+            self._report(self.pos, f"extraneous input {self._display(self.pos)} "
+                                   f"expecting {format_expected(expected)}")
+        self._report(self.pos, f"mismatched input {self._display(self.pos)} "
+                               f"expecting {format_expected(expected)}")
+
+    def _mismatch(self, expected: FrozenSet[int], follow: FrozenSet[int]):
+        """Error matching a token: one too many, one missing, or a wrong one"""
+        if self.types[self.pos + 1] in expected:
+            self._report(self.pos, f"extraneous input {self._display(self.pos)} "
+                                   f"expecting {format_expected(expected)}")
+        if self.types[self.pos] in follow:
+            self._report(self.pos, f"missing {format_expected(expected)} at {self._display(self.pos)}")
+        self._report(self.pos, f"mismatched input {self._display(self.pos)} "
+                               f"expecting {format_expected(expected)}")
+
+    def _no_viable(self, start: int, offending: int):
+        text = "".join(t.text for t in self.tokens[start:offending + 1] if t.type != Token.EOF)
+        self._report(offending, f"no viable alternative at input {quote(text)}")
+
+    def _at(self, node: AST.ASTNode, start: int) -> AST.ASTNode:
+        """Record the source range from token `start` to the last consumed token on the node"""
+        node.span = AST.Span.of_tokens(self.tokens[start], self.tokens[self.pos - 1])
+        return node
+
+    def _match(self, token_type: int, follow: FrozenSet[int] = frozenset()) -> Token:
+        if self.types[self.pos] != token_type:
+            self._mismatch(frozenset({token_type}), follow)
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    # Declarations
+
+    def _program(self) -> AST.Program:
+        declarations = []
+        types = self.types
+        while types[self.pos] in DECLARATION_START:
+            if types[self.pos] == T.CLASS:
+                declarations.append(self._class_definition())
+            else:
+                declarations.append(self._function_definition())
+        program = AST.Program(declarations)
+        if declarations:
+            first, last = declarations[0].span, declarations[-1].span
+            program.span = AST.Span(first.line, first.column, last.end_line, last.end_column)
+        return program
+
+    def _class_definition(self) -> AST.ClassDefinition:
+        start = self.pos
+        self.pos += 1
+        name = self._match(T.Identifier, frozenset({T.COLON, T.LBRACE})).text
+        parent = None
+        if self.types[self.pos] == T.COLON:
+            self.pos += 1
+            self._match(T.PUBLIC, frozenset({T.Identifier}))
+            parent = self._match(T.Identifier, frozenset({T.LBRACE})).text
+        elif self.types[self.pos] != T.LBRACE:
+            self._sync(frozenset({T.COLON, T.LBRACE}))
+        self._match(T.LBRACE, frozenset({T.PUBLIC}))
+        self._match(T.PUBLIC, frozenset({T.COLON}))
+        self._match(T.COLON, MEMBER_FOLLOW)
+
+        members = []
+        types = self.types
+        while types[self.pos] != T.RBRACE:
+            if types[self.pos] not in MEMBER_START:
+                self._sync(MEMBER_FOLLOW)
+            members.append(self._class_member())
+        self.pos += 1
+        if types[self.pos] == T.SEMI:
+            self.pos += 1
+        return self._at(AST.ClassDefinition(name, parent, members), start)
+
+    def _class_member(self) -> AST.ClassMember:
+        types = self.types
+        start = self.pos
+        if types[start] == T.VIRTUAL:
+            return self._method_definition()
+        if types[start] == T.Identifier and types[start + 1] == T.LPAREN:
+            return self._constructor_definition()
+
+        # type Identifier, then '(' for a method or '=' / ';' for a field
+        name = start + 2 if types[start + 1] == T.REF else start + 1
+        if types[name] != T.Identifier:
+            self._no_viable(start, name)
+        after = types[name + 1]
+        if after == T.LPAREN:
+            return self._method_definition()
+        if after == T.ASSIGN or after == T.SEMI:
+            return self._variable_declaration(MEMBER_FOLLOW)
+        self._no_viable(start, name + 1)
+
+    def _function_definition(self) -> AST.FunctionDefinition:
+        start = self.pos
+        return_type = self._type()
+        name = self._match(T.Identifier, frozenset({T.LPAREN})).text
+        parameters = self._parameters()
+        body = self._block()
+        return self._at(AST.FunctionDefinition(return_type, name, parameters, body), start)
+
+    def _method_definition(self) -> AST.MethodDefinition:
+        start = self.pos
+        is_virtual = self.types[self.pos] == T.VIRTUAL
+        if is_virtual:
+            self.pos += 1
+        return_type = self._type()
+        name = self._match(T.Identifier, frozenset({T.LPAREN})).text
+        parameters = self._parameters()
+        body = self._block()
+        return self._at(AST.MethodDefinition(is_virtual, return_type, name, parameters, body), start)
+
+    def _constructor_definition(self) -> AST.ConstructorDefinition:
+        start = self.pos
+        name = self.tokens[self.pos].text
+        self.pos += 1
+        parameters = self._parameters()
+        body = self._block()
+        return self._at(AST.ConstructorDefinition(name, parameters, body), start)
+
+    def _variable_declaration(self, follow: FrozenSet[int]) -> AST.VariableDeclaration:
+        start = self.pos
+        var_type = self._type()
+        name = self._match(T.Identifier, frozenset({T.ASSIGN, T.SEMI})).text
+        initializer = None
+        if self.types[self.pos] == T.ASSIGN:
+            self.pos += 1
+            initializer = self._expression(0)
+        elif self.types[self.pos] != T.SEMI:
+            self._sync(frozenset({T.ASSIGN, T.SEMI}))
+        self._match(T.SEMI, follow)
+        return self._at(AST.VariableDeclaration(var_type, name, initializer), start)
+
+    def _parameters(self) -> List[AST.Parameter]:
+        self._match(T.LPAREN, TYPE_START | {T.RPAREN})
+        parameters = []
+        types = self.types
+        if types[self.pos] != T.RPAREN:
+            if types[self.pos] not in TYPE_START:
+                self._sync(TYPE_START | {T.RPAREN})
+            while True:
+                start = self.pos
+                param_type = self._type()
+                name = self._match(T.Identifier, frozenset({T.COMMA, T.RPAREN})).text
+                parameters.append(self._at(AST.Parameter(param_type, name), start))
+                if types[self.pos] != T.COMMA:
+                    break
+                self.pos += 1
+        self._match(T.RPAREN, frozenset({T.LBRACE}))
+        return parameters
+
+    def _type(self) -> AST.Type:
+        if self.types[self.pos] not in TYPE_START:
+            self._mismatch(TYPE_START, frozenset({T.REF, T.Identifier}))
+        start = self.pos
+        base_type = self.tokens[self.pos].text
+        self.pos += 1
+        if self.types[self.pos] == T.REF:
+            self.pos += 1
+            return self._at(AST.Type(base_type, True), start)
+        return self._at(AST.Type(base_type, False), start)
+
+    # Statements
+
+    def _block(self) -> List[AST.Statement]:
+        """Statements of a block (without a BlockStatement node)"""
+        self._match(T.LBRACE, STATEMENT_FOLLOW)
+        statements = []
+        types = self.types
+        while types[self.pos] != T.RBRACE:
+            if types[self.pos] not in STATEMENT_START:
+                self._sync(STATEMENT_START | {T.RBRACE})
+            statements.append(self._statement())
+        self.pos += 1
+        return statements
+
+    def _body(self) -> List[AST.Statement]:
+        """Branch or loop body: the statements of a block, or a single statement"""
+        if self.types[self.pos] == T.LBRACE:
+            return self._block()
+        return [self._statement()]
+
+    def _statement(self) -> AST.Statement:
+        types = self.types
+        start = self.pos
+        t = types[self.pos]
+        if t == T.Identifier:
+            following = types[self.pos + 1]
+            if following == T.Identifier or following == T.REF:
+                return self._variable_declaration(STATEMENT_FOLLOW)
+            if following not in IDENTIFIER_STATEMENT_FOLLOW:
+                self._no_viable(self.pos, self.pos + 1)
+        elif t in PRIMITIVE_TYPES:
+            return self._variable_declaration(STATEMENT_FOLLOW)
+        elif t == T.IF:
+            self.pos += 1
+            self._match(T.LPAREN, EXPRESSION_START)
+            condition = self._expression(0)
+            self._match(T.RPAREN, STATEMENT_START)
+            then_stmt = self._body()
+            else_stmt = None
+            if types[self.pos] == T.ELSE:
+                self.pos += 1
+                else_stmt = self._body()
+            return self._at(AST.IfStatement(condition, then_stmt, else_stmt), start)
+        elif t == T.WHILE:
+            self.pos += 1
+            self._match(T.LPAREN, EXPRESSION_START)
+            condition = self._expression(0)
+            self._match(T.RPAREN, STATEMENT_START)
+            body = self._body()
+            return self._at(AST.WhileStatement(condition, body), start)
+        elif t == T.RETURN:
+            self.pos += 1
+            expression = None
+            if types[self.pos] in EXPRESSION_START:
+                expression = self._expression(0)
+            elif types[self.pos] != T.SEMI:
+                self._sync(EXPRESSION_START | {T.SEMI})
+            self._match(T.SEMI, STATEMENT_FOLLOW)
+            return self._at(AST.ReturnStatement(expression), start)
+        elif t == T.LBRACE:
+            return self._at(AST.BlockStatement(self._block()), start)
+        elif t not in EXPRESSION_START:
+            self._sync(STATEMENT_START)
+
+        expression = self._expression(0)
+        self._match(T.SEMI, STATEMENT_FOLLOW)
+        return self._at(AST.ExpressionStatement(expression), start)
+
+    # Expressions
+
+    def _expression(self, min_precedence: int) -> AST.Expression:
+        """Expression whose binary operators bind at least as tight as min_precedence"""
+        tokens = self.tokens
+        types = self.types
+        # Operator nodes span from the first token of their left operand (an opening parenthesis too)
+        start = self.pos
+        left = self._primary()
+        while True:
+            t = types[self.pos]
+            if t == T.DOT:
+                if types[self.pos + 1] != T.Identifier:
+                    self._no_viable(self.pos, self.pos + 1)
+                name = tokens[self.pos + 1].text
+                self.pos += 2
+                if types[self.pos] == T.LPAREN:
+                    left = AST.MethodCallExpression(left, name, self._arguments())
+                else:
+                    left = AST.MemberAccessExpression(left, name)
+                self._at(left, start)
+                continue
+
+            precedence = BINARY_PRECEDENCE.get(t)
+            if precedence is None or precedence < min_precedence:
+                return left
+            operator = tokens[self.pos].text
+            self.pos += 1
+            # Left-associative: the right operand only takes tighter operators
+            right = self._expression(precedence + 1)
+            if t == T.ASSIGN:
+                left = AST.AssignmentExpression(left, right)
+            else:
+                left = AST.BinaryExpression(left, operator, right)
+            self._at(left, start)
+
+    def _primary(self) -> AST.Expression:
+        types = self.types
+        start = self.pos
+        token = self.tokens[start]
+        t = token.type
+        if t == T.Identifier:
+            if types[self.pos + 1] == T.LPAREN:
+                self.pos += 1
+                return self._at(AST.CallExpression(token.text, self._arguments()), start)
+            self.pos += 1
+            return self._at(AST.IdentifierExpression(token.text), start)
+        if t == T.IntLiteral:
+            self.pos += 1
+            return self._at(AST.LiteralExpression(int(token.text), "int"), start)
+        if t == T.LPAREN:
+            self.pos += 1
+            expression = self._expression(0)
+            self._match(T.RPAREN, EXPRESSION_FOLLOW)
+            return expression
+        if t == T.PLUS or t == T.MINUS or t == T.NOT:
+            self.pos += 1
+            return self._at(AST.UnaryExpression(token.text, self._expression(UNARY_PRECEDENCE)), start)
+        if t == T.BoolLiteral:
+            self.pos += 1
+            return self._at(AST.LiteralExpression(token.text == "true", "bool"), start)
+        if t == T.StringLiteral:
+            self.pos += 1
+            # Remove surrounding double quotes
+            return self._at(AST.LiteralExpression(token.text[1:-1], "string"), start)
+        if t == T.CharLiteral:
+            self.pos += 1
+            # Remove surrounding single quotes
+            return self._at(AST.LiteralExpression(token.text[1:-1], "char"), start)
+        self._sync(EXPRESSION_START)
+
+    def _arguments(self) -> List[AST.Expression]:
+        self.pos += 1
+        arguments = []
+        types = self.types
+        if types[self.pos] != T.RPAREN:
+            if types[self.pos] not in EXPRESSION_START:
+                self._sync(EXPRESSION_START | {T.RPAREN})
+            arguments.append(self._expression(0))
+            while types[self.pos] == T.COMMA:
+                self.pos += 1
+                arguments.append(self._expression(0))
+        self._match(T.RPAREN, EXPRESSION_FOLLOW)
+        return arguments
+
+
+PARSERS = ("fast", "antlr")
+
+
+def parse_program(input_stream: InputStream, error_listener: ErrorListener,
+                  lexer: str = "fast", parser: str = "fast") -> Optional[AST.Program]:
+    """AST of a whole program, or None after syntax errors (reported to error_listener)"""
+    token_source = create_lexer(input_stream, lexer)
+    if parser == "fast":
+        fast_parser = FastParser(token_source)
+        fast_parser.removeErrorListeners()
+        fast_parser.addErrorListener(error_listener)
+        return fast_parser.program()
+    if parser == "antlr":
+        from antlr4 import CommonTokenStream
+        from gen.ASTBuilder import ASTBuilder
+        from antlr_frontend import parse_rule
+
+        antlr_parser, tree = parse_rule(CommonTokenStream(token_source), "program", error_listener)
+        if antlr_parser.getNumberOfSyntaxErrors():
+            return None
+        return ASTBuilder().visitProgram(tree)
+    raise ValueError(f"Unknown parser '{parser}'. Choose one of: {', '.join(PARSERS)}")
+
+
+def parse_repl_input(input_stream: InputStream, error_listener: ErrorListener,
+                     lexer: str = "fast", parser: str = "fast") -> Optional[List[AST.ASTNode]]:
+    """Declarations, or else a single statement, spanning the whole input
+
+    Returns None if neither parses; only the errors of the statement attempt
+    are reported to error_listener (none if the input just does not end there).
+    """
+    token_source = create_lexer(input_stream, lexer)
+    if parser == "fast":
+        fast_parser = FastParser(token_source)
+        fast_parser.removeErrorListeners()
+        program = fast_parser.program()
+        if program is not None and program.declarations and fast_parser.at_eof():
+            return program.declarations
+
+        fast_parser.reset()
+        fast_parser.addErrorListener(error_listener)
+        stmt = fast_parser.statement()
+        if stmt is not None and fast_parser.at_eof():
+            return [stmt]
+        return None
+    if parser == "antlr":
+        from antlr4 import CommonTokenStream
+        from gen.ASTBuilder import ASTBuilder
+        from antlr_frontend import parse_rule
+
+        token_stream = CommonTokenStream(token_source)
+        antlr_parser, tree = parse_rule(token_stream, "program")
+        # LA(1) == -1 is EOF
+        if not antlr_parser.getNumberOfSyntaxErrors() and tree.children and token_stream.LA(1) == -1:
+            return ASTBuilder().visitProgram(tree).declarations
+
+        token_stream.seek(0)
+        antlr_parser, tree = parse_rule(token_stream, "statement", error_listener)
+        if not antlr_parser.getNumberOfSyntaxErrors() and token_stream.LA(1) == -1:
+            return [ASTBuilder().visitStatement(tree)]
+        return None
+    raise ValueError(f"Unknown parser '{parser}'. Choose one of: {', '.join(PARSERS)}")
+
+
+def same_ast(a: Any, b: Any) -> bool:
+    """Structural equality of two ASTs (node types and all attributes)"""
+    if isinstance(a, AST.ASTNode):
+        if type(a) is not type(b) or vars(a).keys() != vars(b).keys():
+            return False
+        return all(same_ast(value, vars(b)[key]) for key, value in vars(a).items())
+    if isinstance(a, list):
+        return isinstance(b, list) and len(a) == len(b) and all(map(same_ast, a, b))
+    return type(a) is type(b) and a == b
+
+
+class _RecordingListener(ErrorListener):
+    def __init__(self):
+        self.errors = []
+
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        self.errors.append((line, column, msg))
+
+
+def compare_parsers(text: str) -> Optional[str]:
+    """None if both parsers build the same AST or report their first error at the same position"""
+    results = []
+    for parser in PARSERS:
+        listener = _RecordingListener()
+        ast = parse_program(InputStream(text), listener, parser=parser)
+        results.append((ast, listener.errors[:1]))
+    (expected, expected_errors), (actual, actual_errors) = results[1], results[0]
+    if expected_errors or actual_errors:
+        if [e[:2] for e in expected_errors] != [e[:2] for e in actual_errors]:
+            return f"expected error {expected_errors}, got {actual_errors}"
+        return None
+    if not same_ast(expected, actual):
+        return "ASTs differ"
+    return None
+
+
+# Tokens inserted by mutations()
+MUTATION_TOKENS = (";", ")", "(", "{", "}", "int", "x", "=", ",", "+", "1")
+
+
+def mutations(text: str, count: int, seed: int) -> List[str]:
+    """Broken variants of a program: a token inserted, or a word between spaces removed or doubled"""
+    rng = random.Random(seed)
+    words = text.split(" ")
+    # Breaking string or char literals or comments would make lexer errors instead
+    candidates = [i for i, word in enumerate(words)
+                  if not any(c in word for c in "\"'/")]
+    variants = []
+    for _ in range(count):
+        mutated = list(words)
+        i = rng.choice(candidates)
+        kind = rng.randrange(3)
+        if kind == 0:
+            mutated.insert(i, rng.choice(MUTATION_TOKENS))
+        elif kind == 1:
+            del mutated[i]
+        else:
+            mutated.insert(i, mutated[i])
+        variants.append(" ".join(mutated))
+    return variants
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+
+    # Verify against MiniCParser + ASTBuilder on all test programs
+    base = Path(__file__).parent
+    files = sorted(base.glob("tests/*/*.cpp")) + sorted(base.glob("benchmarks/*.cpp"))
+    agreed = 0
+    for f in files:
+        difference = compare_parsers(f.read_text(encoding="utf-8"))
+        if difference is None:
+            agreed += 1
+            print(f"  [PASS] {f.parent.name}/{f.name}")
+        else:
+            print(f"  [FAIL] {f.parent.name}/{f.name}: {difference}")
+    print(f"\nSummary: {agreed}/{len(files)} files parsed identically")
+
+    # Syntax errors: the first one at the same line:column (the message may differ)
+    positive = sorted(base.glob("tests/positive/*.cpp"))
+    broken = agreed_errors = 0
+    for seed, f in enumerate(positive):
+        for variant in mutations(f.read_text(encoding="utf-8"), 8, seed):
+            broken += 1
+            difference = compare_parsers(variant)
+            if difference is None:
+                agreed_errors += 1
+            else:
+                print(f"  [FAIL] mutated {f.name}: {difference}")
+    print(f"Summary: {agreed_errors}/{broken} mutated files with the same first error position")
+    sys.exit(0 if agreed == len(files) and agreed_errors == broken else 1)
@@ -1,10 +1,45 @@
 from abc import ABC, abstractmethod
 from typing import List, Optional
 
+# Source positions
+
+
+class Span:
+    """Source range of a node: line:column of its first token to the end of its last token
+
+    Lines count from 1 and columns from 0, like ANTLR tokens and syntax errors."""
+    __slots__ = ("line", "column", "end_line", "end_column")
+
+    def __init__(self, line: int, column: int, end_line: int, end_column: int):
+        self.line = line
+        self.column = column
+        self.end_line = end_line
+        self.end_column = end_column
+
+    @staticmethod
+    def of_tokens(first, last) -> 'Span':
+        return Span(first.line, first.column, last.line, last.column + len(last.text))
+
+    def __eq__(self, other):
+        return (isinstance(other, Span) and self.line == other.line and self.column == other.column
+                and self.end_line == other.end_line and self.end_column == other.end_column)
+
+    def __hash__(self):
+        return hash((self.line, self.column, self.end_line, self.end_column))
+
+    def __str__(self):
+        return f"{self.line}:{self.column}"
+
+    def __repr__(self):
+        return f"Span({self.line}:{self.column}-{self.end_line}:{self.end_column})"
+
 # Base AST Node
 
 
 class ASTNode(ABC):
+    # Set by the parsers (ASTBuilder, fast_parser.py); None for nodes built by later passes
+    span: Optional[Span] = None
+
     @abstractmethod
     def accept(self, visitor):
         pass
@@ -6,13 +6,22 @@ from .AST import *
 class ASTBuilder(MiniCVisitor):
     """Builds AST from ANTLR parse tree using the Visitor pattern"""
 
+    def _at(self, ctx, node: ASTNode) -> ASTNode:
+        """Record the source range of the rule context on the node"""
+        node.span = Span.of_tokens(ctx.start, ctx.stop)
+        return node
+
     def visitProgram(self, ctx: MiniCParser.ProgramContext) -> Program:
         declarations = []
         for decl_ctx in ctx.declaration():
             decl = self.visitDeclaration(decl_ctx)
             if decl:
                 declarations.append(decl)
-        return Program(declarations)
+        program = Program(declarations)
+        if declarations:
+            first, last = declarations[0].span, declarations[-1].span
+            program.span = Span(first.line, first.column, last.end_line, last.end_column)
+        return program
 
     def visitDeclaration(self, ctx: MiniCParser.DeclarationContext) -> Declaration:
         if ctx.classDefinition():
@@ -30,7 +39,7 @@ class ASTBuilder(MiniCVisitor):
             member = self.visitClassMember(member_ctx)
             if member:
                 members.append(member)
-        return ClassDefinition(name, parent, members)
+        return self._at(ctx, ClassDefinition(name, parent, members))
 
     def visitClassMember(self, ctx: MiniCParser.ClassMemberContext) -> ClassMember:
         if ctx.methodDefinition():
@@ -48,7 +57,7 @@ class ASTBuilder(MiniCVisitor):
             ctx.parameterList()) if ctx.parameterList() else []
         # Gibt jetzt eine Liste zurück
         body = self.visitBlockStatements(ctx.block())
-        return FunctionDefinition(return_type, name, parameters, body)
+        return self._at(ctx, FunctionDefinition(return_type, name, parameters, body))
 
     def visitMethodDefinition(self, ctx: MiniCParser.MethodDefinitionContext) -> MethodDefinition:
         is_virtual = ctx.VIRTUAL() is not None
@@ -58,7 +67,7 @@ class ASTBuilder(MiniCVisitor):
             ctx.parameterList()) if ctx.parameterList() else []
         # Gibt jetzt eine Liste zurück
         body = self.visitBlockStatements(ctx.block())
-        return MethodDefinition(is_virtual, return_type, name, parameters, body)
+        return self._at(ctx, MethodDefinition(is_virtual, return_type, name, parameters, body))
 
     def visitConstructorDefinition(self, ctx: MiniCParser.ConstructorDefinitionContext) -> ConstructorDefinition:
         name = ctx.Identifier().getText()
@@ -66,14 +75,14 @@ class ASTBuilder(MiniCVisitor):
             ctx.parameterList()) if ctx.parameterList() else []
         # Gibt jetzt eine Liste zurück
         body = self.visitBlockStatements(ctx.block())
-        return ConstructorDefinition(name, parameters, body)
+        return self._at(ctx, ConstructorDefinition(name, parameters, body))
 
     def visitVariableDeclaration(self, ctx: MiniCParser.VariableDeclarationContext) -> VariableDeclaration:
         var_type = self.visitType(ctx.type_())
         name = ctx.Identifier().getText()
         initializer = self.visitExpression(
             ctx.expression()) if ctx.expression() else None
-        return VariableDeclaration(var_type, name, initializer)
+        return self._at(ctx, VariableDeclaration(var_type, name, initializer))
 
     def visitParameterList(self, ctx: MiniCParser.ParameterListContext) -> List[Parameter]:
         return [self.visitParameter(param) for param in ctx.parameter()]
@@ -81,12 +90,12 @@ class ASTBuilder(MiniCVisitor):
     def visitParameter(self, ctx: MiniCParser.ParameterContext) -> Parameter:
         param_type = self.visitType(ctx.type_())
         name = ctx.Identifier().getText()
-        return Parameter(param_type, name)
+        return self._at(ctx, Parameter(param_type, name))
 
     def visitType(self, ctx: MiniCParser.TypeContext) -> Type:
         base_type = self.visitPrimitiveType(ctx.primitiveType())
         is_reference = ctx.REF() is not None
-        return Type(base_type, is_reference)
+        return self._at(ctx, Type(base_type, is_reference))
 
     def visitPrimitiveType(self, ctx: MiniCParser.PrimitiveTypeContext) -> str:
         if ctx.INT():
@@ -122,10 +131,10 @@ class ASTBuilder(MiniCVisitor):
         elif ctx.returnStatement():
             return self.visitReturnStatement(ctx.returnStatement())
         elif ctx.block():
-            return BlockStatement(self.visitBlockStatements(ctx.block()))
+            return self._at(ctx, BlockStatement(self.visitBlockStatements(ctx.block())))
         elif ctx.expression():
             expr = self.visitExpression(ctx.expression())
-            return ExpressionStatement(expr)
+            return self._at(ctx, ExpressionStatement(expr))
         return None
 
     def visitExpression(self, ctx):
@@ -181,7 +190,7 @@ class ASTBuilder(MiniCVisitor):
                 stmt = self.visitStatement(else_stmt_ctx)
                 else_stmt = [stmt] if stmt else []
 
-        return IfStatement(condition, then_stmt, else_stmt)
+        return self._at(ctx, IfStatement(condition, then_stmt, else_stmt))
 
     def visitWhileStatement(self, ctx: MiniCParser.WhileStatementContext) -> WhileStatement:
         condition = self.visitExpression(ctx.expression())
@@ -194,20 +203,20 @@ class ASTBuilder(MiniCVisitor):
             stmt = self.visitStatement(body_ctx)
             body = [stmt] if stmt else []
 
-        return WhileStatement(condition, body)
+        return self._at(ctx, WhileStatement(condition, body))
 
     def visitReturnStatement(self, ctx: MiniCParser.ReturnStatementContext) -> ReturnStatement:
         expression = self.visitExpression(
             ctx.expression()) if ctx.expression() else None
-        return ReturnStatement(expression)
+        return self._at(ctx, ReturnStatement(expression))
 
     # Expression visitors
     def visitIdExpr(self, ctx: MiniCParser.IdExprContext) -> IdentifierExpression:
         name = ctx.Identifier().getText()
-        return IdentifierExpression(name)
+        return self._at(ctx, IdentifierExpression(name))
 
     def visitLiteralExpr(self, ctx: MiniCParser.LiteralExprContext) -> LiteralExpression:
-        return self.visitLiteral(ctx.literal())
+        return self._at(ctx, self.visitLiteral(ctx.literal()))
 
     def visitParenExpr(self, ctx: MiniCParser.ParenExprContext) -> Expression:
         return self.visitExpression(ctx.expression())
@@ -215,66 +224,66 @@ class ASTBuilder(MiniCVisitor):
     def visitUnaryExpr(self, ctx: MiniCParser.UnaryExprContext) -> UnaryExpression:
         operator = ctx.getChild(0).getText()
         operand = self.visitExpression(ctx.expression())
-        return UnaryExpression(operator, operand)
+        return self._at(ctx, UnaryExpression(operator, operand))
 
     def visitMultiplicativeExpr(self, ctx: MiniCParser.MultiplicativeExprContext) -> BinaryExpression:
         left = self.visitExpression(ctx.expression(0))
         operator = ctx.getChild(1).getText()
         right = self.visitExpression(ctx.expression(1))
-        return BinaryExpression(left, operator, right)
+        return self._at(ctx, BinaryExpression(left, operator, right))
 
     def visitAdditiveExpr(self, ctx: MiniCParser.AdditiveExprContext) -> BinaryExpression:
         left = self.visitExpression(ctx.expression(0))
         operator = ctx.getChild(1).getText()
         right = self.visitExpression(ctx.expression(1))
-        return BinaryExpression(left, operator, right)
+        return self._at(ctx, BinaryExpression(left, operator, right))
 
     def visitComparisonExpr(self, ctx: MiniCParser.ComparisonExprContext) -> BinaryExpression:
         left = self.visitExpression(ctx.expression(0))
         operator = ctx.getChild(1).getText()
         right = self.visitExpression(ctx.expression(1))
-        return BinaryExpression(left, operator, right)
+        return self._at(ctx, BinaryExpression(left, operator, right))
 
     def visitEqualityExpr(self, ctx: MiniCParser.EqualityExprContext) -> BinaryExpression:
         left = self.visitExpression(ctx.expression(0))
         operator = ctx.getChild(1).getText()
         right = self.visitExpression(ctx.expression(1))
-        return BinaryExpression(left, operator, right)
+        return self._at(ctx, BinaryExpression(left, operator, right))
 
     def visitLogicAndExpr(self, ctx: MiniCParser.LogicAndExprContext) -> BinaryExpression:
         left = self.visitExpression(ctx.expression(0))
         operator = "&&"
         right = self.visitExpression(ctx.expression(1))
-        return BinaryExpression(left, operator, right)
+        return self._at(ctx, BinaryExpression(left, operator, right))
 
     def visitLogicOrExpr(self, ctx: MiniCParser.LogicOrExprContext) -> BinaryExpression:
         left = self.visitExpression(ctx.expression(0))
         operator = "||"
         right = self.visitExpression(ctx.expression(1))
-        return BinaryExpression(left, operator, right)
+        return self._at(ctx, BinaryExpression(left, operator, right))
 
     def visitAssignmentExpr(self, ctx: MiniCParser.AssignmentExprContext) -> AssignmentExpression:
         target = self.visitExpression(ctx.expression(0))
         value = self.visitExpression(ctx.expression(1))
-        return AssignmentExpression(target, value)
+        return self._at(ctx, AssignmentExpression(target, value))
 
     def visitCallExpr(self, ctx: MiniCParser.CallExprContext) -> CallExpression:
         callee = ctx.Identifier().getText()
         arguments = self.visitArgumentList(
             ctx.argumentList()) if ctx.argumentList() else []
-        return CallExpression(callee, arguments)
+        return self._at(ctx, CallExpression(callee, arguments))
 
     def visitMemberAccessExpr(self, ctx: MiniCParser.MemberAccessExprContext) -> MemberAccessExpression:
         obj = self.visitExpression(ctx.expression())
         member = ctx.Identifier().getText()
-        return MemberAccessExpression(obj, member)
+        return self._at(ctx, MemberAccessExpression(obj, member))
 
     def visitMethodCallExpr(self, ctx: MiniCParser.MethodCallExprContext) -> MethodCallExpression:
         obj = self.visitExpression(ctx.expression())
         method = ctx.Identifier().getText()
         arguments = self.visitArgumentList(
             ctx.argumentList()) if ctx.argumentList() else []
-        return MethodCallExpression(obj, method, arguments)
+        return self._at(ctx, MethodCallExpression(obj, method, arguments))
 
     def visitArgumentList(self, ctx: MiniCParser.ArgumentListContext) -> List[Expression]:
         return [self.visitExpression(expr) for expr in ctx.expression()]
@@ -1,15 +1,17 @@
 from __future__ import annotations
 import sys
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
-from antlr4 import FileStream, CommonTokenStream, InputStream
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from antlr4 import FileStream, InputStream
 from antlr4.error.ErrorListener import ErrorListener
 
-from gen.MiniCLexer import MiniCLexer
-from gen.MiniCParser import MiniCParser
-from gen.ASTBuilder import ASTBuilder
 from gen import AST
-from semantic import SemanticAnalyzer, SemanticError, ReferenceType, ClassSymbol, FunctionSymbol
+from semantic import SemanticAnalyzer, SemanticError, ReferenceType, ClassSymbol, FunctionSymbol, FieldSymbol
+from ast_cache import default_cache
+from fast_lexer import LEXERS
+from fast_parser import PARSERS, parse_program, parse_repl_input
+from repl_session import ReplAnalyzer
+from optimizer import ConstantExpression, TailCallStatement, literal_value, optimize_program
 
 
 """
@@ -28,6 +30,13 @@ It supports:
   - Copy semantics
 - Basic inheritance
 - Short-circuit evaluation for && and ||
+
+Statements report how they completed: visit_statement returns None on normal
+completion and a one-element tuple (value,) once a return statement has been
+executed, so returns unwind through blocks and loops without exceptions.
+A TailCallStatement (optimizer.py) completes with a TailCall instead, which
+visit_function_definition answers by running the body again with the new
+arguments.
 """
 
 
@@ -35,20 +44,51 @@ class RuntimeError(Exception):
     pass
 
 
-class ReturnException(Exception):
-    """Used to implement return statements"""
+# Completion of a statement: None, or (value,) after a return statement
+# (a TailCall after a TailCallStatement)
+Completion = Optional[Tuple[Any]]
+
+
+class TailCall:
+    """Completion of a TailCallStatement: the function restarts with these arguments"""
+    __slots__ = ("args",)
+
+    def __init__(self, args: List[Any]):
+        self.args = args
 
-    def __init__(self, value):
-        self.value = value
+
+class ClassLayout:
+    """Instantiation data of a class, computed once per class
+
+    Fields are numbered base class first, so a field has the same index in
+    the layouts of all subclasses."""
+
+    def __init__(self, class_name: str, field_names: List[str], initializers: List[Optional[AST.Expression]],
+                 defaults: Optional[List[Any]], parent_ctor: Optional[AST.ConstructorDefinition],
+                 constructors: Dict[int, AST.ConstructorDefinition]):
+        self.class_name = class_name
+        self.field_names = field_names
+        # field name -> index into ObjectValue.values
+        self.index = {name: i for i, name in enumerate(field_names)}
+        # Initializer per field (None for uninitialized fields)
+        self.initializers = initializers
+        # Initial values if all initializers are literals, else they are evaluated per instance
+        self.defaults = defaults
+        self.parent_ctor = parent_ctor
+        # arity -> first constructor with that many parameters
+        self.constructors = constructors
 
 
 class ObjectValue:
     """Represents an instance of a class"""
 
-    def __init__(self, class_name: str, fields: Dict[str, Any]):
-        self.class_name = class_name
-        self.fields = fields
-        self.vtable = {}  # Virtual method table: method_name -> actual implementation
+    __slots__ = ("class_name", "layout", "values")
+
+    def __init__(self, layout: ClassLayout, values: List[Any]):
+        self.class_name = layout.class_name
+        self.layout = layout
+        # Field values in the order of layout.field_names
+        self.values = values
 
     def __repr__(self):
         return f"<{self.class_name} object>"
@@ -62,33 +102,99 @@ class ReferenceValue:
         self.scope = scope
 
     def get(self) -> Any:
-        # Follow the reference chain in case we have a reference to a reference
+        # Follow the reference chain in case we have a reference to a reference;
+        # a loop, chains can be as long as the call depth
         value = self.scope[self.target_name]
-        if isinstance(value, ReferenceValue):
-            return value.get()
+        while isinstance(value, ReferenceValue):
+            if type(value) is not ReferenceValue:
+                # A field reference ends the chain
+                return value.get()
+            value = value.scope[value.target_name]
         return value
 
     def set(self, value: Any):
         # Follow the reference chain
-        current = self.scope[self.target_name]
-        if isinstance(current, ReferenceValue):
-            current.set(value)
-        else:
-            self.scope[self.target_name] = value
+        ref = self
+        current = ref.scope[ref.target_name]
+        while isinstance(current, ReferenceValue):
+            if type(current) is not ReferenceValue:
+                current.set(value)
+                return
+            ref = current
+            current = ref.scope[ref.target_name]
+        ref.scope[ref.target_name] = value
 
 
-class FieldReferenceValue:
+class FieldReferenceValue(ReferenceValue):
     """Represents a reference to an object field"""
 
     def __init__(self, obj: ObjectValue, field_name: str):
+        super().__init__(field_name, obj.values)
         self.obj = obj
         self.field_name = field_name
 
     def get(self) -> Any:
-        return self.obj.fields[self.field_name]
+        obj = self.obj
+        return obj.values[obj.layout.index[self.field_name]]
 
     def set(self, value: Any):
-        self.obj.fields[self.field_name] = value
+        obj = self.obj
+        obj.values[obj.layout.index[self.field_name]] = value
+
+
+# Classes an inline cache remembers before the call site counts as megamorphic
+POLYMORPHIC_LIMIT = 4
+
+
+class InlineCache:
+    """Method lookups of one call site, keyed by the receiver's class name
+
+    Monomorphic while the site has seen a single receiver class, then
+    polymorphic up to POLYMORPHIC_LIMIT classes. Lookups for further classes
+    go to the vtable without being cached (megamorphic)."""
+
+    def __init__(self):
+        self.epoch = -1
+        self.class_name: Optional[str] = None
+        self.method: Optional[AST.MethodDefinition] = None
+        self.entries: Optional[Dict[str, Optional[AST.MethodDefinition]]] = None
+
+    def reset(self, epoch: int):
+        self.epoch = epoch
+        self.class_name = None
+        self.method = None
+        self.entries = None
+
+    def add(self, class_name: str, method: Optional[AST.MethodDefinition]) -> bool:
+        """Remember a lookup; returns False if the site is megamorphic"""
+        if self.class_name is None:
+            self.class_name = class_name
+            self.method = method
+            return True
+        if self.entries is None:
+            self.entries = {}
+        if len(self.entries) + 1 >= POLYMORPHIC_LIMIT:
+            return False
+        self.entries[class_name] = method
+        return True
+
+
+class CacheStats:
+    """Hit/miss counters of the inline caches, for profiling"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.megamorphic = 0
+        # Times the class caches were dropped because a class was (re)defined
+        self.invalidations = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses,
+                "megamorphic": self.megamorphic, "invalidations": self.invalidations}
+
+    def __repr__(self):
+        return f"<CacheStats hits={self.hits} misses={self.misses} megamorphic={self.megamorphic}>"
 
 
 class Interpreter:
@@ -105,7 +211,18 @@ class Interpreter:
         }
         self.output = []
         self.repl_mode = False
-        self.node_symbols = node_symbols or {}
+        # Receiver of the running method or constructor
+        self.this: Optional[ObjectValue] = None
+        # Per-class method and constructor tables, rebuilt lazily after a class is (re)defined
+        self.vtables: Dict[str, Dict[str, AST.MethodDefinition]] = {}
+        self.constructor_tables: Dict[str, Dict[int, AST.ConstructorDefinition]] = {}
+        self.layouts: Dict[str, ClassLayout] = {}
+        self.class_epoch = 0
+        # Call site node -> InlineCache (tree walker; other engines keep the cache in the site)
+        self.inline_caches: Dict[Any, InlineCache] = {}
+        self.cache_stats = CacheStats()
+        # Keep the caller's dict: the REPL analyzer fills it after construction
+        self.node_symbols = node_symbols if node_symbols is not None else {}
         # The first scope is our persistent session scope
         self.push_scope()
 
@@ -133,6 +250,50 @@ class Interpreter:
                 return
         raise RuntimeError(f"Variable '{name}' not found.")
 
+    def declare_local(self, node: AST.VariableDeclaration, value: Any):
+        """Bind the variable of a declaration statement"""
+        self.declare_variable(node.name, value)
+
+    def reference_to_variable(self, expr: AST.IdentifierExpression) -> ReferenceValue:
+        """Reference to a variable; its scope is None if the variable is undefined"""
+        if isinstance(self.node_symbols.get(expr), FieldSymbol):
+            return FieldReferenceValue(self.this, expr.name)
+        value, scope = self.resolve_variable(expr.name)
+        if isinstance(value, ReferenceValue):
+            # Passing a reference on: refer to its target, not to the reference
+            return value
+        return ReferenceValue(expr.name, scope)
+
+    def assign_variable(self, target: AST.IdentifierExpression, value: Any):
+        if isinstance(self.node_symbols.get(target), FieldSymbol):
+            self.assign_field_of_this(target.name, value)
+            return
+
+        target_value, scope = self.resolve_variable(target.name)
+        if scope is None:
+            raise RuntimeError(f"Undefined variable '{target.name}'.")
+
+        if isinstance(target_value, ReferenceValue):
+            target_value.set(value)
+        else:
+            # Check if we're assigning an object
+            if isinstance(target_value, ObjectValue) and isinstance(value, ObjectValue):
+                # For object assignment, copy the fields
+                self.copy_fields(target_value, value)
+            else:
+                self.set_variable(target.name, value)
+
+    def assign_field_of_this(self, name: str, value: Any):
+        """Assign a field of the receiver named without object (implicit this)"""
+        this = self.this
+        i = self.field_index(this, name)
+        current = this.values[i]
+        if isinstance(current, ObjectValue) and isinstance(value, ObjectValue):
+            # For object assignment, copy the fields
+            self.copy_fields(current, value)
+        else:
+            this.values[i] = value
+
     def _builtin_print_int(self, value: int):
         self.output.append(str(value))
 
@@ -152,33 +313,52 @@ class Interpreter:
         """Interpret the program"""
         # First pass: collect classes and functions
         for decl in ast.declarations:
-            if isinstance(decl, AST.ClassDefinition):
-                self.classes[decl.name] = decl
-            elif isinstance(decl, AST.FunctionDefinition):
-                if decl.name not in self.functions:
-                    self.functions[decl.name] = []
-                self.functions[decl.name].append((decl, {}))
+            self.register_declaration(decl)
 
         # Second pass: execute functions (look for main)
         if 'main' in self.functions:
-            try:
-                main_func = self.functions['main'][0][0]
-                # Execute main body in the session scope
-                for stmt in main_func.body:
-                    self.visit_statement(stmt)
-            except ReturnException:
-                pass
+            main_func = self.functions['main'][0][0]
+            # Execute main body in the session scope
+            self.execute_statements(main_func.body)
 
     def visit_repl_node(self, node: Union[AST.Declaration, AST.Statement]):
         """Execute a single node (declaration or statement) in REPL mode"""
-        if isinstance(node, AST.ClassDefinition):
-            self.classes[node.name] = node
-        elif isinstance(node, AST.FunctionDefinition):
-            if node.name not in self.functions:
-                self.functions[node.name] = []
-            self.functions[node.name].append((node, {}))
-        elif isinstance(node, AST.Statement):
+        if isinstance(node, (AST.Statement, AST.VariableDeclaration)):
             self.visit_statement(node)
+        else:
+            self.register_declaration(node)
+
+    def register_declaration(self, decl: AST.Declaration):
+        """Make a class or function known to the interpreter (or replace it, in the REPL)"""
+        if isinstance(decl, AST.ClassDefinition):
+            redefined = decl.name in self.classes
+            self.classes[decl.name] = decl
+            if redefined:
+                # A redefined class can change the tables of its subclasses
+                self.invalidate_class_caches()
+        elif isinstance(decl, AST.FunctionDefinition):
+            if decl.name not in self.functions:
+                self.functions[decl.name] = []
+            overloads = self.functions[decl.name]
+            param_types = [(p.param_type.base_type, p.param_type.is_reference) for p in decl.parameters]
+            for i, (func_def, closure) in enumerate(overloads):
+                if [(p.param_type.base_type, p.param_type.is_reference) for p in func_def.parameters] == param_types:
+                    overloads[i] = (decl, {})
+                    return
+            overloads.append((decl, {}))
+
+    def forget(self, nodes: Iterable[AST.ASTNode]):
+        """Drop what was cached for nodes whose semantic analysis changed (REPL redefinitions)"""
+        for node in nodes:
+            self.inline_caches.pop(node, None)
+
+    def invalidate_class_caches(self):
+        """Drop vtables and constructor tables; inline caches expire with the epoch"""
+        self.vtables.clear()
+        self.constructor_tables.clear()
+        self.layouts.clear()
+        self.class_epoch += 1
+        self.cache_stats.invalidations += 1
 
     def visit_program(self, node: AST.Program):
         self.interpret(node)
@@ -186,35 +366,34 @@ class Interpreter:
     def visit_function_definition(self, node: AST.FunctionDefinition, args: List[Any]) -> Any:
         """Execute a function with given arguments"""
         old_scopes = self.scopes
-        self.scopes = [{}]
+        try:
+            while True:
+                self.scopes = [{}]
 
-        # Bind parameters
-        for i, param in enumerate(node.parameters):
-            if i < len(args):
-                self.declare_variable(param.name, args[i])
+                # Bind parameters
+                for i, param in enumerate(node.parameters):
+                    if i < len(args):
+                        self.declare_variable(param.name, args[i])
 
-        # Execute body
-        try:
-            for stmt in node.body:
-                self.visit_statement(stmt)
-            # No explicit return, return None/void
-            return None
-        except ReturnException as e:
-            return e.value
+                # Execute body; a tail call runs it again instead of nesting
+                completion = self.execute_statements(node.body)
+                if type(completion) is not TailCall:
+                    break
+                args = completion.args
         finally:
             self.scopes = old_scopes
+        # No explicit return, return None/void
+        return completion[0] if completion is not None else None
 
     def visit_class_definition(self, node: AST.ClassDefinition):
         pass  # Classes are handled during instantiation
 
     def visit_method_definition(self, node: AST.MethodDefinition, obj: ObjectValue, args: List[Any]) -> Any:
         """Execute a method with given object and arguments"""
-        old_scopes = self.scopes
+        old_scopes, old_this = self.scopes, self.this
+        # Fields are not copied into the scope: they are accessed through self.this
         self.scopes = [{}]
-
-        # Make object fields available as variables
-        for field_name, field_value in obj.fields.items():
-            self.declare_variable(field_name, field_value)
+        self.this = obj
 
         # Bind parameters
         for i, param in enumerate(node.parameters):
@@ -223,40 +402,18 @@ class Interpreter:
 
         # Execute body
         try:
-            for stmt in node.body:
-                self.visit_statement(stmt)
-            return None
-        except ReturnException as e:
-            return e.value
+            completion = self.execute_statements(node.body)
         finally:
-            # Update object fields from scope
-            param_names = {p.name for p in node.parameters}
-            for field_name in obj.fields:
-                if field_name in self.scopes[-1] and field_name not in param_names:
-                    obj.fields[field_name] = self.scopes[-1][field_name]
-
-            self.scopes = old_scopes
+            self.scopes, self.this = old_scopes, old_this
+        return completion[0] if completion is not None else None
 
     def visit_constructor_definition(self, node: AST.ConstructorDefinition, obj: ObjectValue, args: List[Any]):
         """Execute a constructor"""
-        # Call parent's default constructor first if exists
-        sym = self.node_symbols.get(node)
-        from semantic import FunctionSymbol
-        if isinstance(sym, FunctionSymbol) and sym.class_name:
-            class_def = self.classes.get(sym.class_name)
-            if class_def and class_def.parent:
-                parent_def = self.classes.get(class_def.parent)
-                if parent_def:
-                    parent_ctor = self.find_constructor(parent_def, 0)
-                    if parent_ctor:
-                        self.visit_constructor_definition(parent_ctor, obj, [])
+        self.run_parent_default_constructor(node, obj)
 
-        old_scopes = self.scopes
+        old_scopes, old_this = self.scopes, self.this
         self.scopes = [{}]
-
-        # Make object fields available as variables
-        for field_name, field_value in obj.fields.items():
-            self.declare_variable(field_name, field_value)
+        self.this = obj
 
         # Bind parameters
         for i, param in enumerate(node.parameters):
@@ -265,19 +422,21 @@ class Interpreter:
 
         # Execute body
         try:
-            for stmt in node.body:
-                self.visit_statement(stmt)
-        except ReturnException:
-            pass
+            self.execute_statements(node.body)
         finally:
-            # Update object fields from scope
-            # Ensure we don't overwrite fields with parameters that shaded them
-            param_names = {p.name for p in node.parameters}
-            for field_name in obj.fields:
-                if field_name in self.scopes[-1] and field_name not in param_names:
-                    obj.fields[field_name] = self.scopes[-1][field_name]
+            self.scopes, self.this = old_scopes, old_this
 
-            self.scopes = old_scopes
+    def run_parent_default_constructor(self, node: AST.ConstructorDefinition, obj: ObjectValue):
+        """Call the parent's default constructor (if any) before a constructor body"""
+        sym = self.node_symbols.get(node)
+        if isinstance(sym, FunctionSymbol) and sym.class_name:
+            class_def = self.classes.get(sym.class_name)
+            if class_def and class_def.parent:
+                parent_def = self.classes.get(class_def.parent)
+                if parent_def:
+                    parent_ctor = self.find_constructor(parent_def, 0)
+                    if parent_ctor:
+                        self.visit_constructor_definition(parent_ctor, obj, [])
 
     def visit_variable_declaration(self, node: AST.VariableDeclaration):
         """Declare a variable"""
@@ -293,13 +452,10 @@ class Interpreter:
             # For reference variables, we need to extract the variable name from the initializer
             if isinstance(node.initializer, AST.IdentifierExpression):
                 # Simple case: T& x = y;
-                target_var_name = node.initializer.name
-                target_val, target_scope = self.resolve_variable(
-                    target_var_name)
-                if target_scope is None:
+                value = self.reference_to_variable(node.initializer)
+                if value.scope is None:
                     raise RuntimeError(
-                        f"Cannot initialize reference with undefined variable '{target_var_name}'.")
-                value = ReferenceValue(target_var_name, target_scope)
+                        f"Cannot initialize reference with undefined variable '{node.initializer.name}'.")
             elif isinstance(node.initializer, AST.MemberAccessExpression):
                 # Case: T& x = obj.field;
                 # This is more complex - we'll evaluate it as a reference
@@ -326,16 +482,7 @@ class Interpreter:
                 if isinstance(value, ObjectValue) and value.class_name != node.var_type.base_type:
                     # Check if value.class_name is a subclass of node.var_type.base_type
                     if self.is_subclass(value.class_name, node.var_type.base_type):
-                        # Slice: create a new object of the base type and copy only base fields
-                        sliced_obj = ObjectValue(node.var_type.base_type, {})
-                        base_class_def = self.classes[node.var_type.base_type]
-                        # Collect only the base class fields
-                        self.collect_fields(base_class_def, sliced_obj)
-                        # Copy the base class fields from the original object
-                        for field_name in sliced_obj.fields:
-                            if field_name in value.fields:
-                                sliced_obj.fields[field_name] = value.fields[field_name]
-                        value = sliced_obj
+                        value = self.slice_object(value, node.var_type.base_type)
             else:
                 # Use default constructor
                 value = self.instantiate_class(node.var_type.base_type, [])
@@ -344,21 +491,30 @@ class Interpreter:
             if node.initializer:
                 value = self.visit_expression(node.initializer)
 
-        self.declare_variable(node.name, value)
+        self.declare_local(node, value)
 
-    def visit_statement(self, stmt: AST.Statement):
+    def visit_statement(self, stmt: AST.Statement) -> Completion:
         if isinstance(stmt, AST.VariableDeclaration):
             self.visit_variable_declaration(stmt)
         elif isinstance(stmt, AST.ExpressionStatement):
-            return self.visit_expression_statement(stmt)
+            self.visit_expression_statement(stmt)
         elif isinstance(stmt, AST.BlockStatement):
-            self.visit_block_statement(stmt)
+            return self.visit_block_statement(stmt)
         elif isinstance(stmt, AST.IfStatement):
-            self.visit_if_statement(stmt)
+            return self.visit_if_statement(stmt)
         elif isinstance(stmt, AST.WhileStatement):
-            self.visit_while_statement(stmt)
+            return self.visit_while_statement(stmt)
         elif isinstance(stmt, AST.ReturnStatement):
-            self.visit_return_statement(stmt)
+            return self.visit_return_statement(stmt)
+        return None
+
+    def execute_statements(self, stmts: List[AST.Statement]) -> Completion:
+        """Execute statements in order until one of them returns"""
+        for stmt in stmts:
+            completion = self.visit_statement(stmt)
+            if completion is not None:
+                return completion
+        return None
 
     def visit_expression_statement(self, stmt: AST.ExpressionStatement) -> Any:
         result = self.visit_expression(stmt.expression)
@@ -370,40 +526,45 @@ class Interpreter:
                 print(result)
         return result
 
-    def visit_block_statement(self, stmt: AST.BlockStatement):
+    def visit_block_statement(self, stmt: AST.BlockStatement) -> Completion:
         """Execute a block statement with new scope"""
         self.push_scope()
         try:
-            for inner_stmt in stmt.statements:
-                self.visit_statement(inner_stmt)
+            return self.execute_statements(stmt.statements)
         finally:
             self.pop_scope()
 
-    def visit_if_statement(self, stmt: AST.IfStatement):
+    def visit_if_statement(self, stmt: AST.IfStatement) -> Completion:
         condition = self.visit_expression(stmt.condition)
         if self.is_truthy(condition):
             self.push_scope()
-            for s in stmt.then_stmt:
-                self.visit_statement(s)
+            completion = self.execute_statements(stmt.then_stmt)
             self.pop_scope()
+            return completion
         elif stmt.else_stmt:
             self.push_scope()
-            for s in stmt.else_stmt:
-                self.visit_statement(s)
+            completion = self.execute_statements(stmt.else_stmt)
             self.pop_scope()
+            return completion
+        return None
 
-    def visit_while_statement(self, stmt: AST.WhileStatement):
+    def visit_while_statement(self, stmt: AST.WhileStatement) -> Completion:
         while self.is_truthy(self.visit_expression(stmt.condition)):
             self.push_scope()
-            for s in stmt.body:
-                self.visit_statement(s)
+            completion = self.execute_statements(stmt.body)
             self.pop_scope()
+            if completion is not None:
+                return completion
+        return None
 
-    def visit_return_statement(self, stmt: AST.ReturnStatement):
+    def visit_return_statement(self, stmt: AST.ReturnStatement) -> Completion:
+        if isinstance(stmt, TailCallStatement):
+            call = stmt.expression
+            return TailCall(self.evaluate_arguments(self.node_symbols[call], call.arguments))
         value = None
         if stmt.expression:
             value = self.visit_expression(stmt.expression)
-        raise ReturnException(value)
+        return (value,)
 
     def visit_expression(self, expr: AST.Expression) -> Any:
         if isinstance(expr, AST.LiteralExpression):
@@ -426,28 +587,16 @@ class Interpreter:
             raise RuntimeError(f"Unknown expression type: {type(expr)}")
 
     def visit_literal_expression(self, expr: AST.LiteralExpression) -> Any:
-        if expr.literal_type == 'int':
-            return int(expr.value)
-        elif expr.literal_type == 'bool':
-            if isinstance(expr.value, bool):
-                return expr.value
-            return str(expr.value).lower() == 'true'
-        elif expr.literal_type == 'char':
-            # Remove quotes
-            s = str(expr.value)
-            if s.startswith("'") and s.endswith("'"):
-                s = s[1:-1]
-            return s
-        elif expr.literal_type == 'string':
-            # Remove quotes
-            s = str(expr.value)
-            if s.startswith('"') and s.endswith('"'):
-                s = s[1:-1]
-            return s
-        else:
+        if isinstance(expr, ConstantExpression):
+            # Converted by the optimizer
             return expr.value
+        return literal_value(expr)
 
     def visit_identifier_expression(self, expr: AST.IdentifierExpression) -> Any:
+        if isinstance(self.node_symbols.get(expr), FieldSymbol):
+            this = self.this
+            return this.values[self.field_index(this, expr.name)]
+
         value, scope = self.resolve_variable(expr.name)
         if scope is None:
             raise RuntimeError(f"Undefined variable '{expr.name}'.")
@@ -520,24 +669,11 @@ class Interpreter:
 
         # Handle different target types
         if isinstance(expr.target, AST.IdentifierExpression):
-            target_value, scope = self.resolve_variable(expr.target.name)
-            if scope is None:
-                raise RuntimeError(f"Undefined variable '{expr.target.name}'.")
-
-            if isinstance(target_value, ReferenceValue):
-                target_value.set(value)
-            else:
-                # Check if we're assigning an object
-                if isinstance(target_value, ObjectValue) and isinstance(value, ObjectValue):
-                    # For object assignment, copy the fields
-                    target_value.fields.clear()
-                    target_value.fields.update(value.fields)
-                else:
-                    self.set_variable(expr.target.name, value)
+            self.assign_variable(expr.target, value)
         elif isinstance(expr.target, AST.MemberAccessExpression):
             obj = self.visit_expression(expr.target.object)
             if isinstance(obj, ObjectValue):
-                obj.fields[expr.target.member] = value
+                obj.values[self.field_index(obj, expr.target.member)] = value
             else:
                 raise RuntimeError("Cannot access member of non-object")
         else:
@@ -567,28 +703,15 @@ class Interpreter:
             return self.visit_function_definition(func_def, args)
 
         if isinstance(sym, FunctionSymbol) and sym.ast_node:
+            if sym.is_method:
+                # Method of the receiver called without object (implicit this)
+                this = self.this
+                method_def = self.dispatch_method(sym, self.inline_cache(expr), this)
+                args = self.evaluate_arguments(sym, expr.arguments)
+                return self.visit_method_definition(method_def, this, args)
+
             func_def = sym.ast_node
-            args = []
-            for i, arg_expr in enumerate(expr.arguments):
-                if i < len(sym.parameters):
-                    param_type = sym.parameters[i].type
-                    if isinstance(param_type, ReferenceType):
-                        if isinstance(arg_expr, AST.IdentifierExpression):
-                            val, scope = self.resolve_variable(arg_expr.name)
-                            args.append(ReferenceValue(arg_expr.name, scope))
-                        elif isinstance(arg_expr, AST.MemberAccessExpression):
-                            obj_val = self.visit_expression(arg_expr.object)
-                            if isinstance(obj_val, ObjectValue):
-                                args.append(FieldReferenceValue(
-                                    obj_val, arg_expr.member))
-                            else:
-                                args.append(self.visit_expression(arg_expr))
-                        else:
-                            args.append(self.visit_expression(arg_expr))
-                    else:
-                        args.append(self.visit_expression(arg_expr))
-                else:
-                    args.append(self.visit_expression(arg_expr))
+            args = self.evaluate_arguments(sym, expr.arguments)
             return self.visit_function_definition(func_def, args)
 
         # Fallback to name search (less reliable for overloading)
@@ -611,42 +734,8 @@ class Interpreter:
         sym = self.node_symbols.get(expr)
 
         if isinstance(sym, FunctionSymbol):
-            method_def = sym.ast_node
-
-            # Virtual dispatch
-            if sym.is_virtual:
-                # Look for the method in the dynamic type
-                dynamic_class_def = self.classes.get(obj.class_name)
-                actual_method = self.find_method(
-                    dynamic_class_def, expr.method)
-                if actual_method:
-                    method_def = actual_method
-
-            if not method_def:
-                raise RuntimeError(f"Method '{expr.method}' not found.")
-
-            # Prepare arguments
-            args = []
-            for i, arg_expr in enumerate(expr.arguments):
-                if i < len(sym.parameters):
-                    param_type = sym.parameters[i].type
-                    if isinstance(param_type, ReferenceType):
-                        if isinstance(arg_expr, AST.IdentifierExpression):
-                            val, scope = self.resolve_variable(arg_expr.name)
-                            args.append(ReferenceValue(arg_expr.name, scope))
-                        elif isinstance(arg_expr, AST.MemberAccessExpression):
-                            obj_val = self.visit_expression(arg_expr.object)
-                            if isinstance(obj_val, ObjectValue):
-                                args.append(FieldReferenceValue(
-                                    obj_val, arg_expr.member))
-                            else:
-                                args.append(self.visit_expression(arg_expr))
-                        else:
-                            args.append(self.visit_expression(arg_expr))
-                    else:
-                        args.append(self.visit_expression(arg_expr))
-                else:
-                    args.append(self.visit_expression(arg_expr))
+            method_def = self.dispatch_method(sym, self.inline_cache(expr), obj)
+            args = self.evaluate_arguments(sym, expr.arguments)
 
             return self.visit_method_definition(method_def, obj, args)
 
@@ -655,7 +744,8 @@ class Interpreter:
         if not class_def:
             raise RuntimeError(f"Class '{obj.class_name}' not found.")
 
-        method = self.find_method(class_def, expr.method)
+        method = self.lookup_method(
+            self.inline_cache(expr), obj.class_name, expr.method)
         if not method:
             raise RuntimeError(
                 f"Method '{expr.method}' not found in class '{obj.class_name}'.")
@@ -663,70 +753,153 @@ class Interpreter:
         args = [self.visit_expression(arg) for arg in expr.arguments]
         return self.visit_method_definition(method, obj, args)
 
+    def dispatch_method(self, sym: FunctionSymbol, cache: InlineCache, obj: ObjectValue) -> AST.MethodDefinition:
+        """Method a call resolved to sym runs on obj"""
+        method_def = sym.ast_node
+
+        # Virtual dispatch
+        if sym.is_virtual:
+            # Look for the method in the dynamic type
+            actual_method = self.lookup_method(cache, obj.class_name, sym.name)
+            if actual_method:
+                method_def = actual_method
+
+        if not method_def:
+            raise RuntimeError(f"Method '{sym.name}' not found.")
+        return method_def
+
+    def evaluate_arguments(self, sym: FunctionSymbol, arguments: List[AST.Expression]) -> List[Any]:
+        """Evaluate call arguments, binding reference parameters to lvalues"""
+        args = []
+        for i, arg_expr in enumerate(arguments):
+            if i < len(sym.parameters):
+                param_type = sym.parameters[i].type
+                if isinstance(param_type, ReferenceType):
+                    if isinstance(arg_expr, AST.IdentifierExpression):
+                        args.append(self.reference_to_variable(arg_expr))
+                    elif isinstance(arg_expr, AST.MemberAccessExpression):
+                        obj_val = self.visit_expression(arg_expr.object)
+                        if isinstance(obj_val, ObjectValue):
+                            args.append(FieldReferenceValue(
+                                obj_val, arg_expr.member))
+                        else:
+                            args.append(self.visit_expression(arg_expr))
+                    else:
+                        args.append(self.visit_expression(arg_expr))
+                else:
+                    args.append(self.visit_expression(arg_expr))
+            else:
+                args.append(self.visit_expression(arg_expr))
+        return args
+
     def visit_member_access_expression(self, expr: AST.MemberAccessExpression) -> Any:
         obj = self.visit_expression(expr.object)
 
         if not isinstance(obj, ObjectValue):
             raise RuntimeError("Cannot access member of non-object")
 
-        if expr.member not in obj.fields:
-            raise RuntimeError(
-                f"Field '{expr.member}' not found in class '{obj.class_name}'.")
+        return obj.values[self.field_index(obj, expr.member)]
 
-        return obj.fields[expr.member]
+    def field_index(self, obj: ObjectValue, member: str) -> int:
+        index = obj.layout.index.get(member)
+        if index is None:
+            raise RuntimeError(
+                f"Field '{member}' not found in class '{obj.class_name}'.")
+        return index
 
     def instantiate_class(self, class_name: str, arguments: List[AST.Expression]) -> ObjectValue:
         """Create an instance of a class"""
-        class_def = self.classes.get(class_name)
-        if not class_def:
-            raise RuntimeError(f"Class '{class_name}' not found.")
+        layout = self.layout_for(class_name)
 
         # Initialize fields with default values
-        obj = ObjectValue(class_name, {})
-
-        # Collect fields from class hierarchy
-        self.collect_fields(class_def, obj)
+        obj = ObjectValue(layout, self.initial_values(layout))
 
         # Evaluate arguments
         args = [self.visit_expression(arg) for arg in arguments]
 
         # Call parent's default constructor if this class has a parent
-        if class_def.parent:
-            parent_def = self.classes.get(class_def.parent)
-            if parent_def:
-                # Find parent's default constructor (no arguments)
-                parent_default_constructor = self.find_constructor(
-                    parent_def, 0, [])
-                if parent_default_constructor:
-                    self.visit_constructor_definition(
-                        parent_default_constructor, obj, [])
+        if layout.parent_ctor:
+            self.visit_constructor_definition(layout.parent_ctor, obj, [])
 
         # Find and call the appropriate constructor
-        constructor = self.find_constructor(class_def, len(args), args)
-        if constructor:
-            self.visit_constructor_definition(constructor, obj, args)
-        elif len(args) == 1 and isinstance(args[0], ObjectValue) and args[0].class_name == class_name:
+        if len(args) == 1 and isinstance(args[0], ObjectValue) and args[0].class_name == class_name:
             # Implicit copy constructor
-            for field_name, field_value in args[0].fields.items():
-                obj.fields[field_name] = field_value
+            self.copy_fields(obj, args[0])
+        else:
+            constructor = layout.constructors.get(len(args))
+            if constructor:
+                self.visit_constructor_definition(constructor, obj, args)
 
         return obj
 
-    def collect_fields(self, class_def: AST.ClassDefinition, obj: ObjectValue):
-        """Collect fields from class and parent classes"""
-        # Collect from parent first (if any)
-        if class_def.parent:
-            parent_def = self.classes.get(class_def.parent)
-            if parent_def:
-                self.collect_fields(parent_def, obj)
+    def slice_object(self, value: ObjectValue, class_name: str) -> ObjectValue:
+        """Copy a derived object into a new object of its base class (slicing)"""
+        sliced_obj = ObjectValue(self.layout_for(class_name), [])
+        self.copy_fields(sliced_obj, value)
+        return sliced_obj
+
+    def copy_fields(self, target: ObjectValue, source: ObjectValue):
+        """Overwrite the fields of target with the same-named fields of source"""
+        if target.layout is source.layout:
+            target.values[:] = source.values
+            return
+        index = source.layout.index
+        values = source.values
+        target.values[:] = [values[index[name]] if name in index else None
+                            for name in target.layout.field_names]
+
+    def layout_for(self, class_name: str) -> ClassLayout:
+        """Layout of a class (computed on first use after the class was defined)"""
+        layout = self.layouts.get(class_name)
+        if layout is None:
+            layout = self.layouts[class_name] = self.build_layout(class_name)
+        return layout
+
+    def build_layout(self, class_name: str) -> ClassLayout:
+        class_def = self.classes.get(class_name)
+        if not class_def:
+            raise RuntimeError(f"Class '{class_name}' not found.")
 
-        # Collect from this class
-        for member in class_def.members:
-            if isinstance(member, AST.VariableDeclaration):
-                value = None
-                if member.initializer:
-                    value = self.visit_expression(member.initializer)
-                obj.fields[member.name] = value
+        chain = []
+        current = class_def
+        while current:
+            chain.append(current)
+            current = self.classes.get(current.parent) if current.parent else None
+
+        # Collect fields from the class hierarchy, base class first
+        field_names: List[str] = []
+        initializers: List[Optional[AST.Expression]] = []
+        for current in reversed(chain):
+            for member in current.members:
+                if isinstance(member, AST.VariableDeclaration):
+                    if member.name in field_names:
+                        # A redeclared field keeps its slot and takes the new initializer
+                        initializers[field_names.index(member.name)] = member.initializer
+                    else:
+                        field_names.append(member.name)
+                        initializers.append(member.initializer)
+
+        defaults: Optional[List[Any]] = []
+        for initializer in initializers:
+            if initializer is None:
+                defaults.append(None)
+            elif isinstance(initializer, AST.LiteralExpression):
+                defaults.append(Interpreter.visit_literal_expression(self, initializer))
+            else:
+                defaults = None
+                break
+
+        parent_def = self.classes.get(class_def.parent) if class_def.parent else None
+        parent_ctor = self.constructor_table(parent_def.name).get(0) if parent_def else None
+        return ClassLayout(class_name, field_names, initializers, defaults,
+                           parent_ctor, self.constructor_table(class_name))
+
+    def initial_values(self, layout: ClassLayout) -> List[Any]:
+        """Field values of a new instance before any constructor ran"""
+        if layout.defaults is not None:
+            return layout.defaults.copy()
+        return [self.visit_expression(initializer) if initializer else None
+                for initializer in layout.initializers]
 
     def is_subclass(self, derived_name: str, base_name: str) -> bool:
         """Check if derived_name is a subclass of base_name"""
@@ -744,17 +917,7 @@ class Interpreter:
 
     def find_method(self, class_def: AST.ClassDefinition, method_name: str) -> Optional[AST.MethodDefinition]:
         """Find a method in class or parent classes"""
-        for member in class_def.members:
-            if isinstance(member, AST.MethodDefinition) and member.name == method_name:
-                return member
-
-        # Check parent
-        if class_def.parent:
-            parent_def = self.classes.get(class_def.parent)
-            if parent_def:
-                return self.find_method(parent_def, method_name)
-
-        return None
+        return self.vtable(class_def.name).get(method_name)
 
     def find_constructor(self, class_def: AST.ClassDefinition, arg_count: int, arg_types: List[Any] = None) -> Optional[AST.ConstructorDefinition]:
         """Find a constructor with matching argument count and types"""
@@ -764,16 +927,68 @@ class Interpreter:
             if isinstance(arg_type, ObjectValue) and arg_type.class_name == class_def.name:
                 return None  # Use implicit copy constructor
 
-        # Look for explicit constructors
-        for member in class_def.members:
-            if isinstance(member, AST.ConstructorDefinition) and len(member.parameters) == arg_count:
-                return member
+        # Look for explicit constructors; without one, arg_count 0 uses the implicit default constructor
+        return self.constructor_table(class_def.name).get(arg_count)
 
-        # If no explicit constructor found and arg_count is 0, use implicit default constructor
-        if arg_count == 0:
-            return None  # Use implicit default constructor
+    def vtable(self, class_name: str) -> Dict[str, AST.MethodDefinition]:
+        """Method name -> implementation for a class, including inherited methods"""
+        table = self.vtables.get(class_name)
+        if table is not None:
+            return table
 
-        return None
+        class_def = self.classes.get(class_name)
+        if not class_def:
+            return {}
+        table = dict(self.vtable(class_def.parent)) if class_def.parent else {}
+        own = set()
+        for member in class_def.members:
+            # The first definition of a name wins, and overrides the parent's
+            if isinstance(member, AST.MethodDefinition) and member.name not in own:
+                own.add(member.name)
+                table[member.name] = member
+        self.vtables[class_name] = table
+        return table
+
+    def constructor_table(self, class_name: str) -> Dict[int, AST.ConstructorDefinition]:
+        """Parameter count -> first constructor of a class with that many parameters"""
+        table = self.constructor_tables.get(class_name)
+        if table is not None:
+            return table
+
+        table = {}
+        class_def = self.classes.get(class_name)
+        if class_def:
+            for member in class_def.members:
+                if isinstance(member, AST.ConstructorDefinition):
+                    table.setdefault(len(member.parameters), member)
+            self.constructor_tables[class_name] = table
+        return table
+
+    def inline_cache(self, site: Any) -> InlineCache:
+        cache = self.inline_caches.get(site)
+        if cache is None:
+            cache = self.inline_caches[site] = InlineCache()
+        return cache
+
+    def lookup_method(self, cache: InlineCache, class_name: str, method_name: str) -> Optional[AST.MethodDefinition]:
+        """Method called on a receiver of class class_name, through a call site's cache"""
+        stats = self.cache_stats
+        if cache.epoch == self.class_epoch:
+            if cache.class_name == class_name:
+                stats.hits += 1
+                return cache.method
+            entries = cache.entries
+            if entries is not None and class_name in entries:
+                stats.hits += 1
+                return entries[class_name]
+        else:
+            cache.reset(self.class_epoch)
+
+        stats.misses += 1
+        method = self.vtable(class_name).get(method_name)
+        if not cache.add(class_name, method):
+            stats.megamorphic += 1
+        return method
 
     def is_truthy(self, value: Any) -> bool:
         """Convert value to boolean"""
@@ -788,34 +1003,85 @@ class Interpreter:
         return bool(value)
 
 
-def run_interpreter(path: Path) -> Tuple[bool, str]:
-    """Run interpreter on a file and return (success, output)"""
-    try:
-        # Parse
-        input_stream = FileStream(str(path), encoding="utf-8")
-        lexer = MiniCLexer(input_stream)
-        token_stream = CommonTokenStream(lexer)
-        parser = MiniCParser(token_stream)
+ENGINES = ("tree", "closure", "vm", "slots")
+
+
+def create_interpreter(engine: str = "tree", node_symbols: Dict[Any, Any] = None,
+                       max_depth: Optional[int] = None) -> Interpreter:
+    """Create an interpreter for the given execution engine
+
+    max_depth limits the call depth of the vm engine (vm.DEFAULT_MAX_DEPTH if
+    None); the other engines nest Python calls and stop at Python's recursion
+    limit (recursion_overflow)."""
+    if engine == "tree":
+        return Interpreter(node_symbols)
+    if engine == "closure":
+        from closure_compiler import ClosureInterpreter
+        return ClosureInterpreter(node_symbols)
+    if engine == "vm":
+        from vm import VirtualMachine
+        if max_depth is not None:
+            return VirtualMachine(node_symbols, max_depth)
+        return VirtualMachine(node_symbols)
+    if engine == "slots":
+        from slot_interpreter import SlotInterpreter
+        return SlotInterpreter(node_symbols)
+    raise ValueError(f"Unknown engine '{engine}'.")
+
+
+def recursion_overflow() -> RuntimeError:
+    """MiniC error for a program nested deeper than Python's recursion limit allows"""
+    return RuntimeError(f"Stack overflow: nesting exceeds Python's recursion limit "
+                        f"({sys.getrecursionlimit()}); the vm engine runs calls up to --max-depth deep")
+
+
+class BailErrorListener(ErrorListener):
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        raise SemanticError(f"Syntax Error at {line}:{column}: {msg}")
+
+
+def load_program(path: Path, lexer: str = "fast", parser: str = "fast") -> Tuple[AST.Program, SemanticAnalyzer]:
+    """Parse, build and analyze a file; raises SemanticError on failure
+
+    Results are reused from the on-disk cache (ast_cache.py) while the file
+    and the toolchain are unchanged.
+    """
+    return load_cached_source(Path(path).read_text(encoding="utf-8"), lexer, parser)
+
+
+def load_cached_source(code: str, lexer: str = "fast", parser: str = "fast") -> Tuple[AST.Program, SemanticAnalyzer]:
+    """load_source through the on-disk AST cache"""
+    return default_cache().analyze(code, lambda source: load_source(source, lexer, parser),
+                                   SemanticAnalyzer.__module__, lexer, parser)
 
-        class BailErrorListener(ErrorListener):
-            def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
-                raise SemanticError(f"Syntax Error at {line}:{column}: {msg}")
 
-        parser.removeErrorListeners()
-        parser.addErrorListener(BailErrorListener())
+def load_source(code: str, lexer: str = "fast", parser: str = "fast") -> Tuple[AST.Program, SemanticAnalyzer]:
+    """Parse, build and analyze program text; raises SemanticError on failure"""
+    return analyze_stream(InputStream(code), lexer, parser)
 
-        tree = parser.program()
 
-        # Build AST
-        ast_builder = ASTBuilder()
-        ast = ast_builder.visitProgram(tree)
+def analyze_stream(input_stream: InputStream, lexer: str = "fast",
+                   parser: str = "fast") -> Tuple[AST.Program, SemanticAnalyzer]:
+    # Parse and build AST
+    ast = parse_program(input_stream, BailErrorListener(), lexer, parser)
 
-        # Semantic analysis
-        analyzer = SemanticAnalyzer()
-        analyzer.visit_program(ast)
+    # Semantic analysis
+    analyzer = SemanticAnalyzer()
+    analyzer.visit_program(ast)
+    return ast, analyzer
+
+
+def run_interpreter(path: Path, engine: str = "tree", lexer: str = "fast",
+                    parser: str = "fast", optimize: bool = False,
+                    max_depth: Optional[int] = None) -> Tuple[bool, str]:
+    """Run interpreter on a file and return (success, output)"""
+    try:
+        ast, analyzer = load_program(path, lexer, parser)
+        if optimize:
+            optimize_program(ast, analyzer.node_symbols)
 
         # Interpret
-        interpreter = Interpreter(analyzer.node_symbols)
+        interpreter = create_interpreter(engine, analyzer.node_symbols, max_depth)
         interpreter.interpret(ast)
 
         output = '\n'.join(interpreter.output)
@@ -823,6 +1089,8 @@ def run_interpreter(path: Path) -> Tuple[bool, str]:
 
     except (SemanticError, RuntimeError) as e:
         return False, str(e)
+    except RecursionError:
+        return False, str(recursion_overflow())
     except Exception as e:
         return False, f"Internal error: {str(e)}"
 
@@ -855,31 +1123,27 @@ def is_complete_input(text: str) -> bool:
     return True
 
 
-def run_repl(initial_file: Optional[Path] = None):
-    analyzer = SemanticAnalyzer()
-    interpreter = Interpreter(analyzer.node_symbols)
-    ast_builder = ASTBuilder()
+def run_repl(initial_file: Optional[Path] = None, engine: str = "tree", lexer: str = "fast",
+             parser: str = "fast", optimize: bool = False, max_depth: Optional[int] = None):
+    analyzer = ReplAnalyzer()
+    interpreter = create_interpreter(engine, analyzer.node_symbols, max_depth)
 
     # Initial file processing
     if initial_file:
         try:
             input_stream = FileStream(str(initial_file), encoding="utf-8")
-            lexer = MiniCLexer(input_stream)
-            token_stream = CommonTokenStream(lexer)
-            parser = MiniCParser(token_stream)
-
             error_listener = CollectErrorListener()
-            parser.removeErrorListeners()
-            parser.addErrorListener(error_listener)
-
-            tree = parser.program()
+            ast = parse_program(input_stream, error_listener, lexer, parser)
             if error_listener.errors:
                 for err in error_listener.errors:
                     print(err, file=sys.stderr)
                 return
 
-            ast = ast_builder.visitProgram(tree)
             analyzer.visit_program(ast)
+            if optimize:
+                # No inlining: a function entered later may replace an inlined one
+                report = optimize_program(ast, analyzer.node_symbols, inline=False)
+                print(f"Optimizer: {report}", file=sys.stderr)
             interpreter.interpret(ast)
 
             if interpreter.output:
@@ -888,6 +1152,8 @@ def run_repl(initial_file: Optional[Path] = None):
 
         except (SemanticError, RuntimeError) as e:
             print(f"Error during initialization: {e}", file=sys.stderr)
+        except RecursionError:
+            print(f"Error during initialization: {recursion_overflow()}", file=sys.stderr)
         except Exception as e:
             print(
                 f"Internal error during initialization: {e}", file=sys.stderr)
@@ -915,46 +1181,23 @@ def run_repl(initial_file: Optional[Path] = None):
             if not code.strip():
                 continue
 
-            # Parse input
-            input_stream = InputStream(code)
-            lexer = MiniCLexer(input_stream)
-            token_stream = CommonTokenStream(lexer)
-            parser = MiniCParser(token_stream)
-
+            # Parse input as declarations, or else as a statement
             error_listener = CollectErrorListener()
-            parser.removeErrorListeners()
-            parser.addErrorListener(error_listener)
-
-            # Try parsing as program (declarations) first
-            tree = parser.program()
-
-            nodes = []
-            # We check if it matched at least one declaration and reached EOF
-            if not error_listener.errors and tree.children and token_stream.LA(1) == -1:
-                program_ast = ast_builder.visitProgram(tree)
-                nodes = program_ast.declarations
-            else:
-                # Try parsing as statement
-                token_stream.seek(0)
-                parser.reset()
-                error_listener.errors = []
-                tree = parser.statement()
-                # LA(1) == -1 is EOF
-                if not error_listener.errors and (token_stream.LA(1) == -1):
-                    nodes = [ast_builder.visitStatement(tree)]
+            nodes = parse_repl_input(InputStream(code), error_listener, lexer, parser)
+            if nodes is None:
+                if not error_listener.errors:
+                    print(
+                        "Syntax Error: Incomplete input or trailing characters.", file=sys.stderr)
                 else:
-                    if not error_listener.errors:
-                        print(
-                            "Syntax Error: Incomplete input or trailing characters.", file=sys.stderr)
-                    else:
-                        for err in error_listener.errors:
-                            print(err, file=sys.stderr)
-                    continue
+                    for err in error_listener.errors:
+                        print(err, file=sys.stderr)
+                continue
 
             # Execute nodes
             for node in nodes:
                 try:
-                    analyzer.analyze_repl_node(node)
+                    stale = analyzer.analyze_repl_node(node)
+                    interpreter.forget(stale)
                     interpreter.visit_repl_node(node)
 
                     if interpreter.output:
@@ -962,6 +1205,8 @@ def run_repl(initial_file: Optional[Path] = None):
                         interpreter.output = []
                 except (SemanticError, RuntimeError) as e:
                     print(f"Error: {e}")
+                except RecursionError:
+                    print(f"Error: {recursion_overflow()}")
                 except Exception as e:
                     print(f"Internal error: {e}")
 
@@ -990,7 +1235,23 @@ def extract_expected_output(file_path: Path) -> Optional[str]:
     return None
 
 
-def run_suite(path: Path):
+def check_file(f: Path, engine: str = "tree", lexer: str = "fast",
+               parser: str = "fast", optimize: bool = False) -> Tuple[str, str]:
+    """Run a test program against its EXPECT comment: (PASS/FAIL/SKIP, details)"""
+    success, output = run_interpreter(f, engine, lexer, parser, optimize)
+    if not success:
+        return "FAIL", f"    {output}"
+
+    expected = extract_expected_output(f)
+    if expected is None:
+        return "SKIP", ""
+    if output == expected:
+        return "PASS", ""
+    return "FAIL", f"    Expected:\n{expected}\n    Got:\n{output}"
+
+
+def run_suite(path: Path, engine: str = "tree", lexer: str = "fast", parser: str = "fast",
+              optimize: bool = False):
     """Run a test suite"""
     print(f"\nTesting {path.name}:")
     passed = 0
@@ -998,42 +1259,68 @@ def run_suite(path: Path):
     files = sorted(path.glob("*.cpp"))
 
     for f in files:
-        total += 1
-        success, output = run_interpreter(f)
-
-        if success:
-            expected = extract_expected_output(f)
-            if expected is None:
-                print(f"  [SKIP] {f.name} (no EXPECT comment)")
-                total -= 1
-                continue
+        status, details = check_file(f, engine, lexer, parser, optimize)
+        if status == "SKIP":
+            print(f"  [SKIP] {f.name} (no EXPECT comment)")
+            continue
 
-            if output == expected:
-                print(f"  [PASS] {f.name}")
-                passed += 1
-            else:
-                print(f"  [FAIL] {f.name}")
-                print(f"    Expected:\n{expected}")
-                print(f"    Got:\n{output}")
-        else:
-            print(f"  [FAIL] {f.name}")
-            print(f"    {output}")
+        total += 1
+        print(f"  [{status}] {f.name}")
+        if details:
+            print(details)
+        if status == "PASS":
+            passed += 1
 
     return passed, total
 
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "test":
-            base = Path(__file__).parent / "tests"
-            p_passed, p_total = run_suite(base / "positive")
-            print(f"\nSummary: {p_passed}/{p_total} tests passed")
-            sys.exit(0 if p_passed == p_total else 1)
-        path = Path(sys.argv[1])
-        if path.exists() and path.is_file():
-            run_repl(path)
+    import argparse
+
+    # The other engines import this module by name; share its classes (RuntimeError, ...)
+    sys.modules.setdefault("interpreter", sys.modules[__name__])
+
+    arg_parser = argparse.ArgumentParser(description="MiniC interpreter and REPL")
+    arg_parser.add_argument(
+        "target", nargs="?", help="'test' to run the positive test suite, or a file to load into the REPL")
+    arg_parser.add_argument("--engine", choices=ENGINES, default="tree",
+                            help="execution engine (default: tree)")
+    arg_parser.add_argument("--lexer", choices=LEXERS, default="fast",
+                            help="hand-written or ANTLR-generated lexer (default: fast)")
+    arg_parser.add_argument("--parser", choices=PARSERS, default="fast",
+                            help="hand-written parser or ANTLR parser + ASTBuilder (default: fast)")
+    arg_parser.add_argument("--optimize", "-O", action="store_true",
+                            help="fold constants, inline small functions and run tail calls as loops (optimizer.py)")
+    arg_parser.add_argument("--max-depth", type=int, default=None,
+                            help="nested calls before a stack overflow error, vm engine only "
+                                 "(default: 1000000)")
+    arg_parser.add_argument("--stats", nargs="?", const="table", choices=("table", "json"),
+                            help="run the file once and report time, memory and counts per phase "
+                                 "(pipeline_stats.py) instead of starting the REPL")
+    args = arg_parser.parse_args()
+    if args.stats and (not args.target or args.target == "test"):
+        arg_parser.error("--stats needs a program file")
+
+    if args.target == "test":
+        base = Path(__file__).parent / "tests"
+        p_passed, p_total = run_suite(base / "positive", args.engine, args.lexer, args.parser, args.optimize)
+        print(f"\nSummary: {p_passed}/{p_total} tests passed")
+        sys.exit(0 if p_passed == p_total else 1)
+    elif args.target:
+        path = Path(args.target)
+        if path.exists() and path.is_file() and args.stats:
+            from pipeline_stats import measure_file
+
+            metrics = measure_file(path, args.engine, args.lexer, args.parser, args.optimize, args.max_depth)
+            if metrics.output:
+                print("\n".join(metrics.output))
+            print(metrics.report(args.stats), file=sys.stderr)
+            sys.exit(0 if metrics.error is None else 1)
+        elif path.exists() and path.is_file():
+            run_repl(path, args.engine, args.lexer, args.parser, args.optimize, args.max_depth)
         else:
             print(f"Error: File {path} not found.")
             sys.exit(1)
     else:
-        run_repl()
+        run_repl(engine=args.engine, lexer=args.lexer, parser=args.parser, optimize=args.optimize,
+                 max_depth=args.max_depth)
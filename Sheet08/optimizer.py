@@ -0,0 +1,479 @@
+from __future__ import annotations
+import copy
+import operator
+from typing import Any, Dict, List, Optional
+
+from gen import AST
+from semantic import FunctionSymbol
+from repl_session import walk
+
+
+"""
+Constant folding and algebraic simplification for the MiniC AST
+
+Optional pass between SemanticAnalyzer.visit_program and
+Interpreter.interpret (python interpreter.py --optimize). It rewrites the
+analyzed AST in place:
+
+- every literal becomes a ConstantExpression that already holds its runtime
+  value, so the engines no longer convert literal text on each evaluation
+- operators whose operands are all constant are evaluated once, with the
+  semantics of the engines (// for '/'; a division or modulo by zero is
+  left in place, so it still fails at run time with the same error)
+- identities are simplified: x + 0, x - 0, x * 1, x / 1, -(-x), !(!x),
+  true && x, false || x, x && true, x || false; false && x and true || x
+  become constants because x is never evaluated
+- if statements with a constant condition are replaced by the branch that
+  runs (as a block, so its scope is kept), while (false) loops are removed
+
+Given the node_symbols of the analysis, calls are rewritten as well:
+
+- a call of a small function (body `return expr;`, primitive by-value
+  parameters and result, no assignments, no methods or reference
+  parameters called, not recursive) is replaced by its expression with the
+  arguments substituted, if every argument is a constant or a variable, or
+  has no effect and is used at most once; the result is folded again
+- `return f(...);` inside f itself (a function without reference
+  parameters) becomes a TailCallStatement: the engines bind the new
+  arguments and restart the body instead of nesting a call, so tail
+  recursion runs in constant stack depth
+
+Nothing that has an effect is removed or reordered, so a program prints the
+same with and without the pass. Constants and simplified expressions are
+never lvalues the analysis relied on: reference arguments and assignment
+targets are variables or fields, which are not folded.
+
+Optimizer.optimize returns an OptimizationReport with the changes made.
+"""
+
+
+class ConstantExpression(AST.LiteralExpression):
+    """Literal or folded expression whose value is already the runtime value"""
+
+
+class TailCallStatement(AST.ReturnStatement):
+    """return f(...); in f itself; expression is the CallExpression"""
+
+
+PRIMITIVE_TYPES = ("int", "bool", "char", "string")
+# Largest function expression (in AST nodes) that is inlined
+INLINE_MAX_NODES = 24
+
+
+FOLDABLE_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.floordiv,
+    '%': operator.mod,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+def literal_value(expr: AST.LiteralExpression) -> Any:
+    """Runtime value of a literal (Interpreter.visit_literal_expression)"""
+    if expr.literal_type == 'int':
+        return int(expr.value)
+    elif expr.literal_type == 'bool':
+        if isinstance(expr.value, bool):
+            return expr.value
+        return str(expr.value).lower() == 'true'
+    elif expr.literal_type == 'char':
+        # Remove quotes
+        s = str(expr.value)
+        if s.startswith("'") and s.endswith("'"):
+            s = s[1:-1]
+        return s
+    elif expr.literal_type == 'string':
+        # Remove quotes
+        s = str(expr.value)
+        if s.startswith('"') and s.endswith('"'):
+            s = s[1:-1]
+        return s
+    else:
+        return expr.value
+
+
+def source_text(expr: AST.Expression) -> str:
+    """Short MiniC text of an expression, for the report"""
+    if isinstance(expr, AST.LiteralExpression):
+        value = expr.value
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if expr.literal_type == 'char':
+            return f"'{value}'"
+        if expr.literal_type == 'string':
+            return f'"{value}"'
+        return str(value)
+    if isinstance(expr, AST.IdentifierExpression):
+        return expr.name
+    if isinstance(expr, AST.BinaryExpression):
+        return f"({source_text(expr.left)} {expr.operator} {source_text(expr.right)})"
+    if isinstance(expr, AST.UnaryExpression):
+        operand = source_text(expr.operand)
+        if isinstance(expr.operand, AST.UnaryExpression):
+            operand = f"({operand})"
+        return f"{expr.operator}{operand}"
+    if isinstance(expr, AST.AssignmentExpression):
+        return f"{source_text(expr.target)} = {source_text(expr.value)}"
+    if isinstance(expr, AST.CallExpression):
+        return f"{expr.callee}({', '.join(source_text(a) for a in expr.arguments)})"
+    if isinstance(expr, AST.MethodCallExpression):
+        return f"{source_text(expr.object)}.{expr.method}({', '.join(source_text(a) for a in expr.arguments)})"
+    if isinstance(expr, AST.MemberAccessExpression):
+        return f"{source_text(expr.object)}.{expr.member}"
+    return "?"
+
+
+class OptimizationReport:
+    def __init__(self):
+        self.literals = 0
+        self.folded = 0
+        self.simplified = 0
+        self.branches_pruned = 0
+        self.loops_removed = 0
+        self.inlined = 0
+        self.tail_calls = 0
+        # "function: what changed", in program order
+        self.changes: List[str] = []
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"literals": self.literals, "folded": self.folded, "simplified": self.simplified,
+                "branches_pruned": self.branches_pruned, "loops_removed": self.loops_removed,
+                "inlined": self.inlined, "tail_calls": self.tail_calls}
+
+    def summary(self) -> str:
+        return (f"{self.literals} literals converted, {self.folded} expressions folded, "
+                f"{self.simplified} simplified, {self.branches_pruned} branches pruned, "
+                f"{self.loops_removed} loops removed, {self.inlined} calls inlined, "
+                f"{self.tail_calls} tail calls")
+
+    def __str__(self):
+        return "\n".join([self.summary()] + [f"  {change}" for change in self.changes])
+
+    def __repr__(self):
+        return f"<OptimizationReport {self.summary()}>"
+
+
+class Optimizer:
+    """Rewrites an analyzed program in place; see the module docstring"""
+
+    def __init__(self, node_symbols: Optional[Dict[AST.ASTNode, Any]] = None, inline: bool = True):
+        self.report = OptimizationReport()
+        # Name of the function, method or class being optimized, for the report
+        self.location = ""
+        # Calls are only rewritten with the symbols of the analysis
+        self.node_symbols = node_symbols
+        self.inline = inline and node_symbols is not None
+        # Function definition -> its expression, for the functions that may be inlined
+        self.inline_candidates: Dict[AST.FunctionDefinition, AST.Expression] = {}
+        # Function whose self calls in return statements become tail calls
+        self.function: Optional[AST.FunctionDefinition] = None
+
+    def optimize(self, program: AST.Program) -> OptimizationReport:
+        if self.inline:
+            self.inline_candidates = self.find_inline_candidates(program)
+        for decl in program.declarations:
+            if isinstance(decl, AST.ClassDefinition):
+                self.function = None
+                self.optimize_class(decl)
+            elif isinstance(decl, AST.FunctionDefinition):
+                self.location = decl.name
+                self.function = decl if self._allows_tail_calls(decl) else None
+                decl.body = self.optimize_statements(decl.body)
+                if decl in self.inline_candidates:
+                    # Later call sites inline the optimized expression
+                    self.inline_candidates[decl] = decl.body[0].expression
+        self.function = None
+        return self.report
+
+    def optimize_class(self, node: AST.ClassDefinition):
+        for member in node.members:
+            if isinstance(member, AST.VariableDeclaration):
+                self.location = node.name
+                if member.initializer is not None:
+                    member.initializer = self.optimize_expression(member.initializer)
+            elif isinstance(member, (AST.MethodDefinition, AST.ConstructorDefinition)):
+                self.location = f"{node.name}::{member.name}"
+                member.body = self.optimize_statements(member.body)
+
+    def _change(self, text: str):
+        self.report.changes.append(f"{self.location}: {text}")
+
+    # Statements
+
+    def optimize_statements(self, stmts: List[AST.Statement]) -> List[AST.Statement]:
+        result = []
+        for stmt in stmts:
+            stmt = self.optimize_statement(stmt)
+            if stmt is not None:
+                result.append(stmt)
+        return result
+
+    def optimize_statement(self, stmt: AST.Statement) -> Optional[AST.Statement]:
+        """The optimized statement, or None if it has no effect"""
+        if isinstance(stmt, AST.VariableDeclaration):
+            if stmt.initializer is not None:
+                stmt.initializer = self.optimize_expression(stmt.initializer)
+        elif isinstance(stmt, AST.ExpressionStatement):
+            stmt.expression = self.optimize_expression(stmt.expression)
+        elif isinstance(stmt, AST.ReturnStatement):
+            if stmt.expression is not None:
+                stmt.expression = self.optimize_expression(stmt.expression)
+                if self._is_self_call(stmt.expression):
+                    self.report.tail_calls += 1
+                    self._change(f"return {source_text(stmt.expression)} runs as a tail call")
+                    return TailCallStatement(stmt.expression)
+        elif isinstance(stmt, AST.BlockStatement):
+            stmt.statements = self.optimize_statements(stmt.statements)
+        elif isinstance(stmt, AST.IfStatement):
+            return self._optimize_if(stmt)
+        elif isinstance(stmt, AST.WhileStatement):
+            return self._optimize_while(stmt)
+        return stmt
+
+    def _optimize_if(self, stmt: AST.IfStatement) -> Optional[AST.Statement]:
+        stmt.condition = self.optimize_expression(stmt.condition)
+        stmt.then_stmt = self.optimize_statements(stmt.then_stmt)
+        if stmt.else_stmt is not None:
+            stmt.else_stmt = self.optimize_statements(stmt.else_stmt)
+
+        if not isinstance(stmt.condition, ConstantExpression):
+            return stmt
+        taken = stmt.then_stmt if stmt.condition.value else stmt.else_stmt
+        self.report.branches_pruned += 1
+        if not taken:
+            self._change(f"if ({source_text(stmt.condition)}) removed")
+            return None
+        self._change(f"if ({source_text(stmt.condition)}) reduced to its "
+                     f"{'then' if stmt.condition.value else 'else'} branch")
+        # The branch runs in its own scope, like a block
+        return AST.BlockStatement(taken)
+
+    def _optimize_while(self, stmt: AST.WhileStatement) -> Optional[AST.Statement]:
+        stmt.condition = self.optimize_expression(stmt.condition)
+        stmt.body = self.optimize_statements(stmt.body)
+        if isinstance(stmt.condition, ConstantExpression) and not stmt.condition.value:
+            self.report.loops_removed += 1
+            self._change("while (false) removed")
+            return None
+        return stmt
+
+    # Expressions
+
+    def optimize_expression(self, expr: AST.Expression) -> AST.Expression:
+        if isinstance(expr, ConstantExpression):
+            return expr
+        if isinstance(expr, AST.LiteralExpression):
+            self.report.literals += 1
+            return ConstantExpression(literal_value(expr), expr.literal_type)
+        if isinstance(expr, AST.BinaryExpression):
+            return self._optimize_binary(expr)
+        if isinstance(expr, AST.UnaryExpression):
+            return self._optimize_unary(expr)
+        if isinstance(expr, AST.AssignmentExpression):
+            # The target stays: it is an lvalue
+            expr.value = self.optimize_expression(expr.value)
+        elif isinstance(expr, AST.CallExpression):
+            expr.arguments = [self.optimize_expression(a) for a in expr.arguments]
+            if self.inline:
+                return self._inline_call(expr)
+        elif isinstance(expr, AST.MethodCallExpression):
+            expr.object = self.optimize_expression(expr.object)
+            expr.arguments = [self.optimize_expression(a) for a in expr.arguments]
+        elif isinstance(expr, AST.MemberAccessExpression):
+            expr.object = self.optimize_expression(expr.object)
+        return expr
+
+    def _fold(self, expr: AST.Expression, value: Any) -> ConstantExpression:
+        self.report.folded += 1
+        constant = ConstantExpression(value, "bool" if isinstance(value, bool) else "int")
+        self._change(f"{source_text(expr)} folded to {source_text(constant)}")
+        return constant
+
+    def _simplify(self, expr: AST.Expression, result: AST.Expression) -> AST.Expression:
+        self.report.simplified += 1
+        self._change(f"{source_text(expr)} simplified to {source_text(result)}")
+        return result
+
+    def _optimize_binary(self, expr: AST.BinaryExpression) -> AST.Expression:
+        expr.left = self.optimize_expression(expr.left)
+        expr.right = self.optimize_expression(expr.right)
+        op, left, right = expr.operator, expr.left, expr.right
+        left_constant = isinstance(left, ConstantExpression)
+        right_constant = isinstance(right, ConstantExpression)
+
+        if op in ('&&', '||'):
+            # The left operand is evaluated first and may decide the result
+            if left_constant:
+                if bool(left.value) == (op == '||'):
+                    return self._fold(expr, op == '||')
+                return self._simplify(expr, right)
+            if right_constant and bool(right.value) == (op == '&&'):
+                return self._simplify(expr, left)
+            return expr
+
+        fn = FOLDABLE_OPERATORS.get(op)
+        if fn is None:
+            return expr
+        if left_constant and right_constant:
+            if op in ('/', '%') and right.value == 0:
+                # Fails at run time, as without the pass
+                return expr
+            return self._fold(expr, fn(left.value, right.value))
+
+        # Identities of int operators; the other operand is evaluated either way
+        if right_constant and type(right.value) is int:
+            if (op in ('+', '-') and right.value == 0) or (op in ('*', '/') and right.value == 1):
+                return self._simplify(expr, left)
+        if left_constant and type(left.value) is int:
+            if (op == '+' and left.value == 0) or (op == '*' and left.value == 1):
+                return self._simplify(expr, right)
+        return expr
+
+    def _optimize_unary(self, expr: AST.UnaryExpression) -> AST.Expression:
+        expr.operand = self.optimize_expression(expr.operand)
+        op, operand = expr.operator, expr.operand
+
+        if isinstance(operand, ConstantExpression):
+            if op == '!':
+                return self._fold(expr, not operand.value)
+            if op == '-':
+                return self._fold(expr, -operand.value)
+            if op == '+':
+                return self._fold(expr, +operand.value)
+            return expr
+        if op == '+':
+            return self._simplify(expr, operand)
+        if isinstance(operand, AST.UnaryExpression) and operand.operator == op and op in ('-', '!'):
+            return self._simplify(expr, operand.operand)
+        return expr
+
+    # Calls
+
+    def _function_of(self, call: AST.CallExpression) -> Optional[FunctionSymbol]:
+        """The free function a call resolved to (not a method, builtin or constructor)"""
+        sym = self.node_symbols.get(call) if self.node_symbols is not None else None
+        if isinstance(sym, FunctionSymbol) and not sym.is_method and sym.ast_node is not None:
+            return sym
+        return None
+
+    def _is_self_call(self, expr: AST.Expression) -> bool:
+        if self.function is None or not isinstance(expr, AST.CallExpression):
+            return False
+        sym = self._function_of(expr)
+        return sym is not None and sym.ast_node is self.function
+
+    def _allows_tail_calls(self, node: AST.FunctionDefinition) -> bool:
+        # A reference argument could point into the frame that a tail call reuses
+        return node.name != "main" and not any(p.param_type.is_reference for p in node.parameters)
+
+    def find_inline_candidates(self, program: AST.Program) -> Dict[AST.FunctionDefinition, AST.Expression]:
+        candidates = {}
+        for decl in program.declarations:
+            if isinstance(decl, AST.FunctionDefinition) and self._is_inlinable(decl):
+                candidates[decl] = decl.body[0].expression
+
+        # Inlining a function into itself would not end: drop every candidate
+        # that reaches itself through calls of candidates
+        callees = {decl: {self._function_of(n).ast_node for n in walk(expr)
+                          if isinstance(n, AST.CallExpression)} & candidates.keys()
+                   for decl, expr in candidates.items()}
+        for decl in list(candidates):
+            reached, pending = set(), list(callees[decl])
+            while pending:
+                callee = pending.pop()
+                if callee not in reached:
+                    reached.add(callee)
+                    pending.extend(callees[callee])
+            if decl in reached:
+                del candidates[decl]
+        return candidates
+
+    def _is_inlinable(self, node: AST.FunctionDefinition) -> bool:
+        if node.name == "main" or len(node.body) != 1 or not isinstance(node.body[0], AST.ReturnStatement):
+            return False
+        expr = node.body[0].expression
+        types = [node.return_type] + [p.param_type for p in node.parameters]
+        if expr is None or any(t.is_reference or t.base_type not in PRIMITIVE_TYPES for t in types):
+            return False
+        params = {p.name for p in node.parameters}
+        nodes = list(walk(expr))
+        if len(nodes) > INLINE_MAX_NODES:
+            return False
+        for n in nodes:
+            if isinstance(n, AST.IdentifierExpression):
+                if n.name not in params:
+                    return False
+            elif isinstance(n, AST.CallExpression):
+                # A reference parameter of the callee would bind to the caller's variable
+                sym = self._function_of(n)
+                if sym is None or any(p.param_type.is_reference for p in sym.ast_node.parameters):
+                    return False
+            elif not isinstance(n, (AST.LiteralExpression, AST.BinaryExpression, AST.UnaryExpression)):
+                return False
+        return True
+
+    def _inline_call(self, call: AST.CallExpression) -> AST.Expression:
+        sym = self._function_of(call)
+        if sym is None or sym.ast_node not in self.inline_candidates:
+            return call
+        node = sym.ast_node
+        body = self.inline_candidates[node]
+        uses = {p.name: 0 for p in node.parameters}
+        for n in walk(body):
+            if isinstance(n, AST.IdentifierExpression):
+                uses[n.name] += 1
+        # Every argument is evaluated once and first without inlining, so only
+        # arguments that may be moved, dropped or repeated are substituted
+        for param, arg in zip(node.parameters, call.arguments):
+            if not isinstance(arg, (ConstantExpression, AST.IdentifierExpression)):
+                if not _has_no_effect(arg) or uses[param.name] > 1:
+                    return call
+
+        arguments = {p.name: arg for p, arg in zip(node.parameters, call.arguments)}
+        inlined = self._substitute(body, arguments)
+        self.report.inlined += 1
+        self._change(f"{source_text(call)} inlined as {source_text(inlined)}")
+        return self.optimize_expression(inlined)
+
+    def _substitute(self, expr: AST.Expression, arguments: Dict[str, AST.Expression]) -> AST.Expression:
+        """Copy of expr with the parameters replaced by copies of the arguments"""
+        if isinstance(expr, AST.IdentifierExpression) and expr.name in arguments:
+            return self._copy(arguments[expr.name])
+        return self._copy(expr, arguments)
+
+    def _copy(self, expr: AST.Expression, arguments: Optional[Dict[str, AST.Expression]] = None) -> AST.Expression:
+        """Copy of an expression tree; the copies keep the symbols of the originals"""
+        result = copy.copy(expr)
+        for attr, value in vars(expr).items():
+            if isinstance(value, AST.Expression):
+                setattr(result, attr, self._substitute(value, arguments) if arguments else self._copy(value))
+            elif isinstance(value, list):
+                setattr(result, attr, [self._substitute(v, arguments) if arguments else self._copy(v)
+                                       for v in value])
+        if expr in self.node_symbols:
+            self.node_symbols[result] = self.node_symbols[expr]
+        return result
+
+
+def _has_no_effect(expr: AST.Expression) -> bool:
+    """True for variables, constants and operators on them that cannot fail"""
+    for n in walk(expr):
+        if isinstance(n, AST.BinaryExpression):
+            if n.operator in ('/', '%') and not (isinstance(n.right, ConstantExpression) and n.right.value != 0):
+                return False
+        elif not isinstance(n, (ConstantExpression, AST.IdentifierExpression, AST.UnaryExpression)):
+            return False
+    return True
+
+
+def optimize_program(program: AST.Program, node_symbols: Optional[Dict[AST.ASTNode, Any]] = None,
+                     inline: bool = True) -> OptimizationReport:
+    """Optimize a program; with the analyzer's node_symbols also inline calls and mark tail calls"""
+    return Optimizer(node_symbols, inline).optimize(program)
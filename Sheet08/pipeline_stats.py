@@ -0,0 +1,296 @@
+from __future__ import annotations
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from antlr4 import CommonTokenStream, InputStream, Token
+from antlr4.ListTokenSource import ListTokenSource
+from antlr4.tree.Tree import TerminalNode
+
+from gen import AST
+from semantic import SemanticAnalyzer, SemanticError, ClassSymbol, FunctionSymbol, VariableSymbol
+from interpreter import BailErrorListener, RuntimeError, create_interpreter, recursion_overflow
+from fast_lexer import create_lexer
+from fast_parser import FastParser
+from optimizer import optimize_program
+from repl_session import walk
+
+
+"""
+Pipeline phase metrics
+
+measure_file() and measure_source() run the MiniC pipeline one phase at a
+time and return a PipelineMetrics object with the wall time and the peak
+traced memory (tracemalloc) of every phase and what each phase produced:
+
+    lex        tokens (EOF not counted)
+    parse      parse tree nodes (ANTLR parser; the hand-written parser builds
+               the AST directly and has no parse tree)
+    build      AST nodes (ASTBuilder; the hand-written parser reports them
+               under parse)
+    analyze    symbols created: classes, fields, methods, constructors,
+               functions (builtins included), parameters and local variables
+    optimize   with optimize=True: the counts of the OptimizationReport
+    execute    statements executed (tree, slots and closure engines; the vm
+               runs bytecode and reports none)
+
+The AST cache is not used, every phase really runs. Tracing memory makes
+every phase several times slower; pass trace_memory=False for timings to
+compare with benchmark.py. A syntax, semantic or runtime error ends the
+run: the phases up to it are kept and PipelineMetrics.error holds the
+message.
+
+The same metrics are printed by `python interpreter.py FILE --stats` and
+`python semantic.py FILE --stats` (--stats=json for as_dict()).
+"""
+
+
+PHASES = ("lex", "parse", "build", "analyze", "optimize", "execute")
+STATS_FORMATS = ("table", "json")
+
+
+class PhaseMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        # Bytes; None without trace_memory
+        self.peak_memory: Optional[int] = None
+        # What the phase produced, e.g. {"tokens": 120}
+        self.counts: Dict[str, Optional[int]] = {}
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"seconds": round(self.seconds, 6), "peak_memory": self.peak_memory, **self.counts}
+
+
+class PipelineMetrics:
+    """Per-phase time, memory and counts of one run of the pipeline"""
+
+    def __init__(self, source: str, lexer: str, parser: str, engine: Optional[str], optimize: bool):
+        self.source = source
+        self.lexer = lexer
+        self.parser = parser
+        self.engine = engine
+        self.optimize = optimize
+        self.phases: Dict[str, PhaseMetrics] = {}
+        self.output: List[str] = []
+        self.error: Optional[str] = None
+
+    def count(self, name: str) -> Optional[int]:
+        """A count of any phase (tokens, ast_nodes, ...), None if it was not measured"""
+        for phase in self.phases.values():
+            if name in phase.counts:
+                return phase.counts[name]
+        return None
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(p.seconds for p in self.phases.values())
+
+    @property
+    def peak_memory(self) -> Optional[int]:
+        peaks = [p.peak_memory for p in self.phases.values() if p.peak_memory is not None]
+        return max(peaks) if peaks else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "source": self.source, "lexer": self.lexer, "parser": self.parser,
+            "engine": self.engine, "optimize": self.optimize,
+            "ok": self.error is None, "error": self.error,
+            "total_seconds": round(self.total_seconds, 6), "peak_memory": self.peak_memory,
+            "phases": {name: phase.as_dict() for name, phase in self.phases.items()},
+        }
+
+    def table(self) -> str:
+        header = ["phase", "ms", "peak KiB", "produced"]
+        rows = []
+        for phase in self.phases.values():
+            produced = ", ".join(f"{'-' if v is None else f'{v:,}'} {k.replace('_', ' ')}"
+                                 for k, v in phase.counts.items())
+            rows.append([phase.name, f"{phase.seconds * 1000:.2f}", _kib(phase.peak_memory), produced])
+        rows.append(["total", f"{self.total_seconds * 1000:.2f}", _kib(self.peak_memory), ""])
+        widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+        lines = [f"Pipeline metrics for {self.source} (lexer {self.lexer}, parser {self.parser}"
+                 + (f", engine {self.engine}" if self.engine else "") + (", optimized" if self.optimize else "") + "):",
+                 "  ".join(h.ljust(w) for h, w in zip(header, widths)).rstrip(),
+                 "  ".join("-" * w for w in widths)]
+        lines += ["  ".join(c.ljust(w) for c, w in zip(row, widths)).rstrip() for row in rows]
+        if self.error:
+            lines.append(f"Stopped by: {self.error}")
+        return "\n".join(lines)
+
+    def report(self, fmt: str = "table") -> str:
+        if fmt == "json":
+            return json.dumps(self.as_dict(), indent=2)
+        return self.table()
+
+
+def _kib(size: Optional[int]) -> str:
+    return "-" if size is None else f"{size / 1024:,.1f}"
+
+
+class _PhaseTimer:
+    def __init__(self, metrics: PipelineMetrics, trace_memory: bool):
+        self.metrics = metrics
+        self.trace_memory = trace_memory
+
+    def run(self, name: str, fn: Callable[[], Any]) -> Any:
+        phase = self.metrics.phases[name] = PhaseMetrics(name)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            phase.seconds = time.perf_counter() - start
+            if self.trace_memory:
+                phase.peak_memory = tracemalloc.get_traced_memory()[1] - base
+
+
+def count_parse_tree(tree: Any) -> int:
+    """Rule contexts and terminal nodes of an ANTLR parse tree"""
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if not isinstance(node, TerminalNode) and node.children:
+            stack.extend(node.children)
+    return count
+
+
+def count_symbols(analyzer: SemanticAnalyzer) -> int:
+    """Distinct symbols the analysis created (the global scope and all node symbols)"""
+    symbols: Dict[int, Any] = {}
+
+    def add(sym: Any):
+        if id(sym) not in symbols:
+            symbols[id(sym)] = sym
+            if isinstance(sym, FunctionSymbol):
+                for p in sym.parameters:
+                    add(p)
+
+    table = analyzer.symbol_table
+    for cls in table.classes.values():
+        add(cls)
+        for member in cls.members.values():
+            for sym in member if isinstance(member, list) else [member]:
+                add(sym)
+    for overloads in table.functions.values():
+        for fn in overloads:
+            add(fn)
+    for sym in analyzer.node_symbols.values():
+        if isinstance(sym, (ClassSymbol, FunctionSymbol, VariableSymbol)):
+            add(sym)
+    return len(symbols)
+
+
+def _count_statements(interpreter: Any, engine: str) -> Optional[List[int]]:
+    """Make the engine count the statements it executes; None for engines that cannot"""
+    counter = [0]
+    if engine in ("tree", "slots"):
+        visit = interpreter.visit_statement
+
+        def visit_counted(stmt):
+            counter[0] += 1
+            return visit(stmt)
+        interpreter.visit_statement = visit_counted
+    elif engine == "closure":
+        compile_statement = interpreter._compile_statement
+
+        def compile_counted(stmt):
+            code = compile_statement(stmt)
+
+            def run_counted():
+                counter[0] += 1
+                return code()
+            return run_counted
+        interpreter._compile_statement = compile_counted
+    else:
+        return None
+    return counter
+
+
+def measure_source(code: str, source: str = "<source>", engine: Optional[str] = "tree",
+                   lexer: str = "fast", parser: str = "fast", optimize: bool = False,
+                   max_depth: Optional[int] = None, trace_memory: bool = True) -> PipelineMetrics:
+    """Run the pipeline on program text phase by phase; engine=None stops after analysis"""
+    metrics = PipelineMetrics(source, lexer, parser, engine, optimize)
+    timer = _PhaseTimer(metrics, trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        _run_phases(code, metrics, timer, engine, lexer, parser, optimize, max_depth)
+    except (SemanticError, RuntimeError) as e:
+        metrics.error = str(e)
+    except RecursionError:
+        metrics.error = str(recursion_overflow())
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return metrics
+
+
+def measure_file(path: Path, engine: Optional[str] = "tree", lexer: str = "fast", parser: str = "fast",
+                 optimize: bool = False, max_depth: Optional[int] = None,
+                 trace_memory: bool = True) -> PipelineMetrics:
+    """measure_source on a file"""
+    return measure_source(Path(path).read_text(encoding="utf-8"), str(path), engine, lexer, parser,
+                          optimize, max_depth, trace_memory)
+
+
+def _run_phases(code: str, metrics: PipelineMetrics, timer: _PhaseTimer, engine: Optional[str],
+                lexer: str, parser: str, optimize: bool, max_depth: Optional[int]):
+    def lex() -> List[Token]:
+        token_source = create_lexer(InputStream(code), lexer)
+        tokens = []
+        while True:
+            token = token_source.nextToken()
+            tokens.append(token)
+            if token.type == Token.EOF:
+                return tokens
+
+    tokens = timer.run("lex", lex)
+    metrics.phases["lex"].counts["tokens"] = len(tokens) - 1
+
+    if parser == "fast":
+        def parse_fast() -> Optional[AST.Program]:
+            fast_parser = FastParser(ListTokenSource(tokens))
+            fast_parser.removeErrorListeners()
+            fast_parser.addErrorListener(BailErrorListener())
+            return fast_parser.program()
+
+        ast = timer.run("parse", parse_fast)
+        metrics.phases["parse"].counts.update(parse_tree_nodes=None, ast_nodes=sum(1 for _ in walk(ast)))
+    elif parser == "antlr":
+        from gen.ASTBuilder import ASTBuilder
+        from antlr_frontend import parse_rule
+
+        tree = timer.run("parse", lambda: parse_rule(CommonTokenStream(ListTokenSource(tokens)),
+                                                     "program", BailErrorListener())[1])
+        metrics.phases["parse"].counts["parse_tree_nodes"] = count_parse_tree(tree)
+        ast = timer.run("build", lambda: ASTBuilder().visitProgram(tree))
+        metrics.phases["build"].counts["ast_nodes"] = sum(1 for _ in walk(ast))
+    else:
+        raise ValueError(f"Unknown parser '{parser}'")
+
+    analyzer = SemanticAnalyzer()
+    timer.run("analyze", lambda: analyzer.visit_program(ast))
+    metrics.phases["analyze"].counts["symbols"] = count_symbols(analyzer)
+
+    if engine is None:
+        return
+    if optimize:
+        report = timer.run("optimize", lambda: optimize_program(ast, analyzer.node_symbols))
+        metrics.phases["optimize"].counts.update(report.as_dict())
+
+    interpreter = create_interpreter(engine, analyzer.node_symbols, max_depth)
+    counter = _count_statements(interpreter, engine)
+    try:
+        timer.run("execute", lambda: interpreter.interpret(ast))
+    finally:
+        metrics.phases["execute"].counts["statements_executed"] = counter[0] if counter is not None else None
+        metrics.output = interpreter.output
@@ -0,0 +1,318 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from gen import AST
+from semantic import SemanticAnalyzer, SemanticError, ClassSymbol, TypeSymbol
+
+
+"""
+Incremental semantic analysis for the REPL
+
+SemanticAnalyzer.analyze_repl_node checks every input against the whole
+session (resolve_inheritance() walks all classes whenever one is entered)
+and rejects a class or function that is entered a second time. ReplAnalyzer
+keeps a dependency graph instead: for every declaration the names of the
+classes and functions it uses (parent class, field, parameter and local
+types, called functions and constructors, classes whose members it
+accesses). Entering a declaration only checks that declaration and then
+re-checks the declarations that use its name, directly or through other
+declarations; everything else is left alone, so the cost of an input does
+not grow with the session.
+
+A class or a function with the same parameter types as an existing one
+replaces it. If the new definition or one of the re-checks fails, the
+session is restored to the state before the input and the error names the
+declaration that no longer checks.
+
+analyze_repl_node returns the AST nodes whose analysis is out of date (the
+replaced declaration and the re-checked ones), so the engines can drop what
+they compiled from them (Interpreter.forget).
+"""
+
+
+# A declaration is identified by ("class", name) or ("function", name, parameter types)
+DeclarationKey = Tuple[str, ...]
+
+_MISSING = object()
+
+
+def walk(node: AST.ASTNode) -> Iterator[AST.ASTNode]:
+    """The node and all nodes below it"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        yield current
+        for value in vars(current).values():
+            if isinstance(value, AST.ASTNode):
+                stack.append(value)
+            elif isinstance(value, list):
+                stack.extend(v for v in value if isinstance(v, AST.ASTNode))
+
+
+def declaration_key(node: Union[AST.ClassDefinition, AST.FunctionDefinition]) -> DeclarationKey:
+    if isinstance(node, AST.ClassDefinition):
+        return ("class", node.name)
+    # Same strings as FunctionSymbol.signature
+    param_types = tuple(p.param_type.base_type + ("&" if p.param_type.is_reference else "")
+                        for p in node.parameters)
+    return ("function", node.name) + param_types
+
+
+class DependencyGraph:
+    """Which declarations use which class and function names"""
+
+    def __init__(self):
+        self.uses: Dict[DeclarationKey, Set[str]] = {}
+        self.users: Dict[str, Set[DeclarationKey]] = {}
+
+    def set_uses(self, key: DeclarationKey, names: Optional[Set[str]]):
+        """Replace the names used by a declaration (None removes it)"""
+        for name in self.uses.pop(key, ()):
+            self.users[name].discard(key)
+        if names is not None:
+            self.uses[key] = names
+            for name in names:
+                self.users.setdefault(name, set()).add(key)
+
+    def dependents(self, name: str) -> Set[DeclarationKey]:
+        """Declarations that use the name, directly or through other declarations"""
+        result: Set[DeclarationKey] = set()
+        pending = [name]
+        while pending:
+            for key in self.users.get(pending.pop(), ()):
+                if key not in result:
+                    result.add(key)
+                    pending.append(key[1])
+        return result
+
+
+class Transaction:
+    """Undo log of one REPL input; rollback() restores the state before it"""
+
+    def __init__(self):
+        self._undo: List[Callable[[], None]] = []
+
+    def save(self, table: Dict[Any, Any], key: Any):
+        old = table.get(key, _MISSING)
+        if old is _MISSING:
+            self._undo.append(lambda: table.pop(key, None))
+        else:
+            self._undo.append(lambda: table.__setitem__(key, old))
+
+    def on_rollback(self, action: Callable[[], None]):
+        self._undo.append(action)
+
+    def rollback(self):
+        for action in reversed(self._undo):
+            action()
+        self._undo.clear()
+
+
+class ReplAnalyzer(SemanticAnalyzer):
+    """SemanticAnalyzer that re-checks only the dependents of a REPL declaration"""
+
+    def __init__(self):
+        super().__init__()
+        self.graph = DependencyGraph()
+        self.declarations: Dict[DeclarationKey, Union[AST.ClassDefinition, AST.FunctionDefinition]] = {}
+        # Definition order; re-checks run in this order, so a parent class comes before its subclasses
+        self.order: Dict[DeclarationKey, int] = {}
+        self._next_order = 0
+        # Names used by the declaration being analyzed
+        self._uses: Optional[Set[str]] = None
+
+    # Dependency recording
+
+    def _use(self, name: str):
+        if self._uses is not None:
+            self._uses.add(name)
+
+    def type_from_ast(self, type_node: AST.Type) -> TypeSymbol:
+        t = super().type_from_ast(type_node)
+        if type_node.base_type in self.symbol_table.classes:
+            self._use(type_node.base_type)
+        return t
+
+    def _resolve_global_call(self, callee, arg_infos, expr):
+        self._use(callee)
+        return super()._resolve_global_call(callee, arg_infos, expr)
+
+    def _resolve_constructor_call(self, class_name, arg_infos, expr):
+        self._use(class_name)
+        return super()._resolve_constructor_call(class_name, arg_infos, expr)
+
+    def _resolve_target_class(self, obj_type: TypeSymbol) -> ClassSymbol:
+        cls = super()._resolve_target_class(obj_type)
+        self._use(cls.name)
+        return cls
+
+    # Whole programs (the file the REPL starts with)
+
+    def visit_program(self, node: AST.Program):
+        declarations = [d for d in node.declarations
+                        if isinstance(d, (AST.ClassDefinition, AST.FunctionDefinition))]
+        uses: Dict[DeclarationKey, Set[str]] = {declaration_key(d): set() for d in declarations}
+        try:
+            for decl in declarations:
+                self._uses = uses[declaration_key(decl)]
+                if isinstance(decl, AST.ClassDefinition):
+                    self.collect_class(decl)
+                    if decl.parent:
+                        self._use(decl.parent)
+                else:
+                    self.collect_function(decl)
+            self._uses = None
+
+            self.resolve_inheritance()
+
+            for decl in declarations:
+                key = declaration_key(decl)
+                self._uses = uses[key]
+                if isinstance(decl, AST.ClassDefinition):
+                    self.analyze_class_body(decl)
+                else:
+                    self.analyze_function_body(decl)
+                self.graph.set_uses(key, uses[key])
+                self.declarations[key] = decl
+                self.order[key] = self._next_order
+                self._next_order += 1
+        finally:
+            self._uses = None
+
+    # REPL inputs
+
+    def analyze_repl_node(self, node: Union[AST.Declaration, AST.Statement]) -> List[AST.ASTNode]:
+        """Analyze one REPL input; returns the nodes whose earlier analysis is out of date"""
+        if isinstance(node, (AST.Statement, AST.VariableDeclaration)):
+            self.visit_statement(node)
+            return []
+        if not isinstance(node, (AST.ClassDefinition, AST.FunctionDefinition)):
+            raise SemanticError(f"Unsupported REPL node type: {type(node)}")
+
+        key = declaration_key(node)
+        old = self.declarations.get(key)
+        affected = sorted(self.graph.dependents(node.name) - {key}, key=self.order.__getitem__)
+
+        transaction = Transaction()
+        self._save_analyzer_state(transaction)
+        stale: List[AST.ASTNode] = []
+        if old is not None:
+            stale.extend(self._reset_analysis(old, transaction, keep_root=False))
+        self._reset_analysis(node, transaction, keep_root=False)
+        for k in affected:
+            stale.extend(self._reset_analysis(self.declarations[k], transaction, keep_root=True))
+
+        try:
+            self._define(key, node, old is not None, transaction)
+            for k in affected:
+                try:
+                    self._recheck(k, transaction)
+                except SemanticError as e:
+                    raise SemanticError(f"'{node.name}' breaks '{k[1]}': {e}")
+        except SemanticError:
+            transaction.rollback()
+            raise
+
+        self.declarations[key] = node
+        self.order[key] = self._next_order
+        self._next_order += 1
+        return stale
+
+    def _save_analyzer_state(self, transaction: Transaction):
+        # A failing body leaves the isolated function scope and the current class behind
+        transaction.save(vars(self.symbol_table), "scopes")
+        transaction.save(vars(self), "current_class")
+        transaction.save(vars(self), "current_function")
+
+    def _reset_analysis(self, decl: AST.ASTNode, transaction: Transaction, keep_root: bool) -> List[AST.ASTNode]:
+        """Forget the node symbols and expression types below a declaration"""
+        nodes = list(walk(decl))
+        for n in nodes:
+            if keep_root and n is decl:
+                continue
+            transaction.save(self.node_symbols, n)
+            transaction.save(self.expression_types, n)
+            self.node_symbols.pop(n, None)
+            self.expression_types.pop(n, None)
+        return nodes
+
+    def _save_uses(self, key: DeclarationKey, transaction: Transaction):
+        old = self.graph.uses.get(key)
+        transaction.on_rollback(lambda: self.graph.set_uses(key, None if old is None else set(old)))
+
+    def _define(self, key: DeclarationKey, node: Union[AST.ClassDefinition, AST.FunctionDefinition],
+                replaces: bool, transaction: Transaction):
+        self._save_uses(key, transaction)
+        self._uses = set()
+        try:
+            if isinstance(node, AST.ClassDefinition):
+                if replaces:
+                    cls = self.symbol_table.classes[node.name]
+                    self._save_class(cls, transaction)
+                    cls.parent_name = node.parent
+                else:
+                    transaction.save(self.symbol_table.classes, node.name)
+                    cls = self.symbol_table.declare_class(node.name, node.parent)
+                self._link_parent(cls)
+                self.analyze_class_body(node)
+            else:
+                functions = self.symbol_table.functions
+                overloads = functions.get(node.name, [])
+                transaction.save(functions, node.name)
+                if replaces:
+                    old = self.declarations[key]
+                    functions[node.name] = [f for f in overloads if f.ast_node is not old]
+                else:
+                    functions[node.name] = list(overloads)
+                self.collect_function(node)
+                self.analyze_function_body(node)
+            self.graph.set_uses(key, self._uses)
+        finally:
+            self._uses = None
+
+    def _recheck(self, key: DeclarationKey, transaction: Transaction):
+        decl = self.declarations[key]
+        self._save_uses(key, transaction)
+        self._uses = set()
+        try:
+            if isinstance(decl, AST.ClassDefinition):
+                cls = self.symbol_table.classes[decl.name]
+                self._save_class(cls, transaction)
+                self._link_parent(cls)
+                self.analyze_class_body(decl)
+            else:
+                # The symbol stays: its parameter and return types are classes redefined in place
+                for p in decl.parameters:
+                    self.type_from_ast(p.param_type)
+                self.type_from_ast(decl.return_type)
+                self.analyze_function_body(decl)
+            self.graph.set_uses(key, self._uses)
+        finally:
+            self._uses = None
+
+    def _save_class(self, cls: ClassSymbol, transaction: Transaction):
+        """Keep the symbol (session variables and signatures refer to it) but start its members over"""
+        state = vars(cls)
+        for attr in ("parent_name", "parent", "members"):
+            transaction.save(state, attr)
+        cls.parent = None
+        cls.members = {}
+
+    def _link_parent(self, cls: ClassSymbol):
+        """resolve_inheritance() for one class: its parent and the chain above it"""
+        if cls.parent_name:
+            self._use(cls.parent_name)
+            if cls.parent_name == cls.name:
+                raise SemanticError(
+                    f"Class '{cls.name}' cannot inherit from itself.")
+            if cls.parent_name not in self.symbol_table.classes:
+                raise SemanticError(
+                    f"Base class '{cls.parent_name}' of '{cls.name}' not found.")
+            cls.parent = self.symbol_table.classes[cls.parent_name]
+
+        curr = cls.parent
+        while curr:
+            if curr is cls:
+                raise SemanticError(
+                    f"Inheritance cycle detected involving '{cls.name}'.")
+            curr = curr.parent
@@ -0,0 +1,169 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+
+from gen import AST
+from semantic import FunctionSymbol
+
+
+"""
+Slot resolution for MiniC locals
+
+Assigns every parameter and local variable a fixed slot in a flat frame, so
+the engines can keep locals in a preallocated list instead of a chain of
+scope dicts.
+
+Scopes follow the discipline of SemanticAnalyzer._visit_block: the function
+body shares the scope of the parameters, and every block, if branch and
+while body opens a nested scope. A nested scope allocates its slots above
+the slots of its parent and releases them when it ends, so sibling blocks
+share slots.
+
+Fields named without object inside methods and constructors get no slot:
+the semantic analysis marks them with a FieldSymbol and the engines access
+the receiver directly.
+"""
+
+
+# Kinds of frames
+FUNCTION = "function"
+METHOD = "method"
+CONSTRUCTOR = "constructor"
+SESSION = "session"
+
+
+class FrameLayout:
+    """Slot assignment of one function body (or session input)"""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        # IdentifierExpression / VariableDeclaration node -> slot
+        self.slots: Dict[Any, int] = {}
+        self.nparams = 0
+        self.nlocals = 0
+        # slot -> names that live in the slot
+        self.local_names: Dict[int, List[str]] = {}
+
+
+class _FrameBuilder:
+    def __init__(self, layout: FrameLayout, scope: Dict[str, int], first_slot: int = 0):
+        self.layout = layout
+        self.scopes: List[Dict[str, int]] = [scope]
+        self.next_slot = first_slot
+        self.saved_slots: List[int] = []
+        layout.nlocals = max(layout.nlocals, first_slot)
+
+    def push_scope(self):
+        self.scopes.append({})
+        self.saved_slots.append(self.next_slot)
+
+    def pop_scope(self):
+        self.scopes.pop()
+        # Slots of the finished block can be reused by its siblings
+        self.next_slot = self.saved_slots.pop()
+
+    def declare(self, name: str) -> int:
+        # Redeclaring a name of the same scope reuses its slot, like the scope dict did
+        scope = self.scopes[-1]
+        slot = scope.get(name)
+        if slot is None:
+            slot = self.next_slot
+            self.next_slot += 1
+            self.layout.nlocals = max(self.layout.nlocals, self.next_slot)
+            scope[name] = slot
+            self.layout.local_names.setdefault(slot, []).append(name)
+        return slot
+
+    def lookup(self, name: str) -> Optional[int]:
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return None
+
+    def visit_block(self, stmts: List[AST.Statement]):
+        self.push_scope()
+        for s in stmts:
+            self.visit_statement(s)
+        self.pop_scope()
+
+    def visit_statement(self, stmt: AST.Statement):
+        if isinstance(stmt, AST.VariableDeclaration):
+            if stmt.initializer:
+                self.visit_expression(stmt.initializer)
+            # Declared after the initializer, which still sees outer variables
+            self.layout.slots[stmt] = self.declare(stmt.name)
+        elif isinstance(stmt, AST.BlockStatement):
+            self.visit_block(stmt.statements)
+        elif isinstance(stmt, AST.ReturnStatement):
+            if stmt.expression:
+                self.visit_expression(stmt.expression)
+        elif isinstance(stmt, AST.IfStatement):
+            self.visit_expression(stmt.condition)
+            self.visit_block(stmt.then_stmt)
+            if stmt.else_stmt:
+                self.visit_block(stmt.else_stmt)
+        elif isinstance(stmt, AST.WhileStatement):
+            self.visit_expression(stmt.condition)
+            self.visit_block(stmt.body)
+        elif isinstance(stmt, AST.ExpressionStatement):
+            self.visit_expression(stmt.expression)
+
+    def visit_expression(self, expr: AST.Expression):
+        if isinstance(expr, AST.IdentifierExpression):
+            slot = self.lookup(expr.name)
+            if slot is not None:
+                self.layout.slots[expr] = slot
+        elif isinstance(expr, AST.AssignmentExpression):
+            self.visit_expression(expr.value)
+            self.visit_expression(expr.target)
+        elif isinstance(expr, AST.BinaryExpression):
+            self.visit_expression(expr.left)
+            self.visit_expression(expr.right)
+        elif isinstance(expr, AST.UnaryExpression):
+            self.visit_expression(expr.operand)
+        elif isinstance(expr, AST.CallExpression):
+            for arg in expr.arguments:
+                self.visit_expression(arg)
+        elif isinstance(expr, AST.MethodCallExpression):
+            self.visit_expression(expr.object)
+            for arg in expr.arguments:
+                self.visit_expression(arg)
+        elif isinstance(expr, AST.MemberAccessExpression):
+            self.visit_expression(expr.object)
+
+
+class SlotResolver:
+    """Computes frame layouts for function bodies and session inputs"""
+
+    def __init__(self, classes: Dict[str, AST.ClassDefinition], node_symbols: Dict[Any, Any]):
+        self.classes = classes
+        self.node_symbols = node_symbols
+        # Session variables (main body and REPL statements) keep their slots across inputs
+        self.session_scope: Dict[str, int] = {}
+        self.session_slots = 0
+
+    def resolve_function(self, node: Any, kind: str) -> FrameLayout:
+        """Layout of a function, method or constructor body"""
+        layout = FrameLayout(node.name, kind)
+        builder = _FrameBuilder(layout, {})
+
+        for param in node.parameters:
+            builder.declare(param.name)
+        layout.nparams = builder.next_slot
+
+        for stmt in node.body:
+            builder.visit_statement(stmt)
+        return layout
+
+    def resolve_session(self, stmts: List[AST.Statement], name: str) -> FrameLayout:
+        """Layout of top-level statements against the persistent session scope"""
+        layout = FrameLayout(name, SESSION)
+        builder = _FrameBuilder(layout, self.session_scope, self.session_slots)
+        for stmt in stmts:
+            builder.visit_statement(stmt)
+        self.session_slots = builder.next_slot
+        return layout
+
+    def owner_class(self, node: Any) -> Optional[str]:
+        sym = self.node_symbols.get(node)
+        return sym.class_name if isinstance(sym, FunctionSymbol) else None
@@ -3,12 +3,11 @@ import sys
 from pathlib import Path
 from typing import List, Dict, Optional, Union, Any, Tuple
 
-from antlr4 import FileStream, CommonTokenStream
+from antlr4 import InputStream
 from antlr4.error.ErrorListener import ErrorListener
-from gen.MiniCLexer import MiniCLexer
-from gen.MiniCParser import MiniCParser
-from gen.ASTBuilder import ASTBuilder
 from gen import AST
+from ast_cache import default_cache
+from fast_parser import parse_program
 
 
 class SemanticError(Exception):
@@ -41,6 +40,12 @@ class VariableSymbol:
         self.type = type_sym
 
 
+class FieldSymbol(VariableSymbol):
+    def __init__(self, name: str, type_sym: TypeSymbol, class_name: str):
+        super().__init__(name, type_sym)
+        self.class_name = class_name
+
+
 class FunctionSymbol:
     def __init__(self, name: str, return_type: TypeSymbol, parameters: List[VariableSymbol], is_method=False, is_virtual=False, class_name=None):
         self.name = name
@@ -173,6 +178,8 @@ class SemanticAnalyzer:
     def __init__(self):
         self.symbol_table = SymbolTable()
         self.node_symbols: Dict[Any, Any] = {}
+        # Expression node -> (type, is_lvalue), every expression is typed once
+        self.expression_types: Dict[Any, Tuple[TypeSymbol, bool]] = {}
         self.current_class: Optional[ClassSymbol] = None
         self.current_function: Optional[FunctionSymbol] = None
 
@@ -200,7 +207,7 @@ class SemanticAnalyzer:
         elif isinstance(node, AST.FunctionDefinition):
             self.collect_function(node)
             self.analyze_function_body(node)
-        elif isinstance(node, AST.Statement):
+        elif isinstance(node, (AST.Statement, AST.VariableDeclaration)):
             self.visit_statement(node)
         else:
             raise SemanticError(f"Unsupported REPL node type: {type(node)}")
@@ -303,7 +310,7 @@ class SemanticAnalyzer:
         if member.name in cls.members:
             raise SemanticError(
                 f"Duplicate member '{member.name}' in class '{cls.name}'.")
-        cls.members[member.name] = VariableSymbol(member.name, t)
+        cls.members[member.name] = FieldSymbol(member.name, t, cls.name)
 
     def _collect_method(self, member: AST.MethodDefinition, cls: ClassSymbol):
         ret_type = self.type_from_ast(member.return_type)
@@ -463,6 +470,12 @@ class SemanticAnalyzer:
         self.symbol_table.pop_scope()
 
     def visit_expression(self, expr: AST.Expression) -> Tuple[TypeSymbol, bool]:
+        info = self.expression_types.get(expr)
+        if info is None:
+            info = self.expression_types[expr] = self._visit_expression(expr)
+        return info
+
+    def _visit_expression(self, expr: AST.Expression) -> Tuple[TypeSymbol, bool]:
         if isinstance(expr, AST.IdentifierExpression):
             return self._visit_identifier(expr)
         elif isinstance(expr, AST.LiteralExpression):
@@ -494,6 +507,8 @@ class SemanticAnalyzer:
             member = self.lookup_member(self.current_class, expr.name)
             if member:
                 if isinstance(member, VariableSymbol):
+                    # Implicit this: the engines access the receiver's field directly
+                    self.node_symbols[expr] = member
                     return member.type, True
                 raise SemanticError(
                     f"Method '{expr.name}' cannot be used as a variable.")
@@ -566,8 +581,7 @@ class SemanticAnalyzer:
         return self.symbol_table.void_type, False
 
     def _visit_call(self, expr: AST.CallExpression) -> Tuple[TypeSymbol, bool]:
-        arg_infos = [(self.visit_expression(a)[0], self.visit_expression(a)[1])
-                     for a in expr.arguments]
+        arg_infos = [self.visit_expression(a) for a in expr.arguments]
 
         # 1. Variables not callable
         if self.symbol_table.resolve_variable(expr.callee):
@@ -664,8 +678,7 @@ class SemanticAnalyzer:
 
         target_class = self._resolve_target_class(obj_type)
 
-        arg_infos = [(self.visit_expression(a)[0], self.visit_expression(a)[1])
-                     for a in expr.arguments]
+        arg_infos = [self.visit_expression(a) for a in expr.arguments]
 
         method = self.lookup_method_in_hierarchy(
             target_class, expr.method, arg_infos)
@@ -730,24 +743,21 @@ class SemanticAnalyzer:
 
 
 def analyze_file(path):
-    input_stream = FileStream(str(path), encoding="utf-8")
-    lexer = MiniCLexer(input_stream)
-    token_stream = CommonTokenStream(lexer)
-    parser = MiniCParser(token_stream)
+    source = Path(path).read_text(encoding="utf-8")
+    # Keyed by module: run as a script, the analyzer classes live in __main__
+    return default_cache().analyze(source, analyze_source, SemanticAnalyzer.__module__)
+
 
+def analyze_source(source: str):
     class BailErrorListener(ErrorListener):
         def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
             raise SemanticError(f"Syntax Error at {line}:{column}: {msg}")
 
-    parser.removeErrorListeners()
-    parser.addErrorListener(BailErrorListener())
-
-    tree = parser.program()
-    ast_builder = ASTBuilder()
-    ast = ast_builder.visitProgram(tree)
+    ast = parse_program(InputStream(source), BailErrorListener())
 
     analyzer = SemanticAnalyzer()
     analyzer.visit_program(ast)
+    return ast, analyzer
 
 # Test runner
 
@@ -790,9 +800,25 @@ def run_suite(path: Path, expect_success=True):
 
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
+    # --stats or --stats=json: time, memory and counts of lexing, parsing and analysis
+    stats = next((a.partition("=")[2] or "table" for a in sys.argv[1:] if a.startswith("--stats")), None)
+    files = [a for a in sys.argv[1:] if not a.startswith("--stats")]
+    if stats not in (None, "table", "json"):
+        print(f"Unknown --stats format '{stats}'. Choose one of: table, json")
+        sys.exit(2)
+    if stats and not files:
+        print("--stats needs a program file")
+        sys.exit(2)
+    if files and stats:
+        from pipeline_stats import measure_file
+
+        metrics = measure_file(files[0], engine=None)
+        print("Analysis successful." if metrics.error is None else f"Error: {metrics.error}")
+        print(metrics.report(stats))
+        sys.exit(0 if metrics.error is None else 1)
+    elif files:
         try:
-            analyze_file(sys.argv[1])
+            analyze_file(files[0])
             print("Analysis successful.")
             sys.exit(0)
         except SemanticError as e:
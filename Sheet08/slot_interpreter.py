@@ -0,0 +1,190 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Union
+
+from gen import AST
+from interpreter import (Interpreter, RuntimeError, Completion, ObjectValue,
+                         ReferenceValue, TailCall)
+from resolver import FrameLayout, SlotResolver, FUNCTION, METHOD, CONSTRUCTOR
+
+
+"""
+MiniC Interpreter with slot-resolved locals
+
+Walks the AST like Interpreter, but keeps the locals of a function body in a
+preallocated list frame instead of a chain of scope dicts. The slots come
+from resolver.py, so variable accesses index the frame directly and blocks,
+if branches and loop iterations allocate no scope of their own.
+
+References to locals are ReferenceValue(slot, frame), so they stay valid
+when the referenced frame belongs to a caller.
+"""
+
+
+class SlotInterpreter(Interpreter):
+    """Tree-walking interpreter with list-backed frames"""
+
+    def __init__(self, node_symbols: Dict[Any, Any] = None):
+        super().__init__(node_symbols)
+        self.resolver = SlotResolver(self.classes, self.node_symbols)
+        self.frame_layouts: Dict[str, Dict[Any, FrameLayout]] = {
+            FUNCTION: {}, METHOD: {}, CONSTRUCTOR: {}}
+        # Session variables (main body and REPL statements) keep their slots
+        self.session_frame: List[Any] = []
+        self.frame: List[Any] = self.session_frame
+        self.slots: Dict[Any, int] = {}
+
+    def interpret(self, ast: AST.Program):
+        """Interpret the program"""
+        for decl in ast.declarations:
+            self.register_declaration(decl)
+
+        if 'main' in self.functions:
+            main_func = self.functions['main'][0][0]
+            # Execute main body in the session frame
+            self.run_session(main_func.body, "main")
+
+    def visit_repl_node(self, node: Union[AST.Declaration, AST.Statement]):
+        """Execute a single node (declaration or statement) in REPL mode"""
+        if isinstance(node, (AST.Statement, AST.VariableDeclaration)):
+            self.run_session([node], "<repl>")
+        else:
+            self.register_declaration(node)
+
+    def forget(self, nodes):
+        for table in self.frame_layouts.values():
+            for node in nodes:
+                table.pop(node, None)
+        super().forget(nodes)
+
+    def run_session(self, stmts: List[AST.Statement], name: str):
+        layout = self.resolver.resolve_session(stmts, name)
+        frame = self.session_frame
+        if len(frame) < layout.nlocals:
+            frame.extend([None] * (layout.nlocals - len(frame)))
+
+        old_frame, old_slots = self.frame, self.slots
+        self.frame, self.slots = frame, layout.slots
+        try:
+            self.execute_statements(stmts)
+        finally:
+            self.frame, self.slots = old_frame, old_slots
+
+    def frame_layout_for(self, node: Any, kind: str) -> FrameLayout:
+        """Frame layout of a function, method or constructor (resolved on first use)"""
+        layouts = self.frame_layouts[kind]
+        layout = layouts.get(node)
+        if layout is None:
+            layout = layouts[node] = self.resolver.resolve_function(node, kind)
+        return layout
+
+    # Calls
+
+    def new_frame(self, layout: FrameLayout, args: List[Any]) -> List[Any]:
+        frame = args[:layout.nparams]
+        frame.extend([None] * (layout.nlocals - len(frame)))
+        return frame
+
+    def run_body(self, node: Any, layout: FrameLayout, frame: List[Any]) -> Any:
+        old_frame, old_slots = self.frame, self.slots
+        self.frame, self.slots = frame, layout.slots
+        try:
+            completion = self.execute_statements(node.body)
+        finally:
+            self.frame, self.slots = old_frame, old_slots
+        if type(completion) is TailCall:
+            # Run again by visit_function_definition
+            return completion
+        # No explicit return, return None/void
+        return completion[0] if completion is not None else None
+
+    def visit_function_definition(self, node: AST.FunctionDefinition, args: List[Any]) -> Any:
+        """Execute a function with given arguments"""
+        layout = self.frame_layout_for(node, FUNCTION)
+        result = self.run_body(node, layout, self.new_frame(layout, args))
+        while type(result) is TailCall:
+            result = self.run_body(node, layout, self.new_frame(layout, result.args))
+        return result
+
+    def visit_method_definition(self, node: AST.MethodDefinition, obj: ObjectValue, args: List[Any]) -> Any:
+        """Execute a method with given object and arguments"""
+        layout = self.frame_layout_for(node, METHOD)
+        old_this = self.this
+        self.this = obj
+        try:
+            return self.run_body(node, layout, self.new_frame(layout, args))
+        finally:
+            self.this = old_this
+
+    def visit_constructor_definition(self, node: AST.ConstructorDefinition, obj: ObjectValue, args: List[Any]):
+        """Execute a constructor"""
+        self.run_parent_default_constructor(node, obj)
+        layout = self.frame_layout_for(node, CONSTRUCTOR)
+        old_this = self.this
+        self.this = obj
+        try:
+            self.run_body(node, layout, self.new_frame(layout, args))
+        finally:
+            self.this = old_this
+
+    # Blocks need no scope of their own: their slots are part of the frame
+
+    def visit_block_statement(self, stmt: AST.BlockStatement) -> Completion:
+        return self.execute_statements(stmt.statements)
+
+    def visit_if_statement(self, stmt: AST.IfStatement) -> Completion:
+        condition = self.visit_expression(stmt.condition)
+        if self.is_truthy(condition):
+            return self.execute_statements(stmt.then_stmt)
+        elif stmt.else_stmt:
+            return self.execute_statements(stmt.else_stmt)
+        return None
+
+    def visit_while_statement(self, stmt: AST.WhileStatement) -> Completion:
+        body = stmt.body
+        while self.is_truthy(self.visit_expression(stmt.condition)):
+            completion = self.execute_statements(body)
+            if completion is not None:
+                return completion
+        return None
+
+    # Variables; names without slot (fields of the receiver) are left to Interpreter
+
+    def declare_local(self, node: AST.VariableDeclaration, value: Any):
+        self.frame[self.slots[node]] = value
+
+    def reference_to_variable(self, expr: AST.IdentifierExpression) -> ReferenceValue:
+        slot = self.slots.get(expr)
+        if slot is None:
+            return super().reference_to_variable(expr)
+        value = self.frame[slot]
+        if isinstance(value, ReferenceValue):
+            # Passing a reference on: refer to its target, not to the reference
+            return value
+        return ReferenceValue(slot, self.frame)
+
+    def visit_identifier_expression(self, expr: AST.IdentifierExpression) -> Any:
+        slot = self.slots.get(expr)
+        if slot is None:
+            return super().visit_identifier_expression(expr)
+
+        value = self.frame[slot]
+        # If it's a reference, get the referenced value
+        if isinstance(value, ReferenceValue):
+            return value.get()
+        return value
+
+    def assign_variable(self, target: AST.IdentifierExpression, value: Any):
+        slot = self.slots.get(target)
+        if slot is None:
+            super().assign_variable(target, value)
+            return
+
+        frame = self.frame
+        current = frame[slot]
+        if isinstance(current, ReferenceValue):
+            current.set(value)
+        elif isinstance(current, ObjectValue) and isinstance(value, ObjectValue):
+            # For object assignment, copy the fields
+            self.copy_fields(current, value)
+        else:
+            frame[slot] = value
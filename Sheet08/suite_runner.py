@@ -0,0 +1,294 @@
+from __future__ import annotations
+import json
+import multiprocessing
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from multiprocessing.connection import Connection, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+"""
+Parallel MiniC test-suite runner
+
+Runs the interpreter suite (tests/positive, compared with the EXPECT
+comments like `python interpreter.py test`) and the semantic suite
+(tests/positive must analyze, tests/negative must be rejected, like
+`python semantic.py`) on a pool of worker processes.
+
+Each worker imports the ANTLR parser, the analyzer and the interpreter once
+and then takes files one at a time. A file that runs longer than --timeout
+seconds (e.g. an infinite MiniC loop) is reported as TIMEOUT and its worker
+is killed and replaced. Results are printed as they complete; the summary
+uses the same PASS/FAIL rules as the sequential runners, and --json/--junit
+write it with the wall time of every file.
+
+Usage:
+    python suite_runner.py                      # both suites, one worker per CPU
+    python suite_runner.py interpreter --engine vm --jobs 4
+    python suite_runner.py --timeout 5 --json results.json --junit results.xml
+    python suite_runner.py interpreter --optimize    # same outputs with optimizer.py
+"""
+
+
+SUITES = ("interpreter", "semantic")
+TESTS_DIR = Path(__file__).parent / "tests"
+DEFAULT_TIMEOUT = 10.0
+
+
+class Job:
+    def __init__(self, index: int, suite: str, path: Path, expect_success: bool = True):
+        self.index = index
+        self.suite = suite
+        self.path = path
+        self.expect_success = expect_success
+
+    @property
+    def name(self) -> str:
+        return f"{self.path.parent.name}/{self.path.name}"
+
+
+class Result:
+    def __init__(self, job: Job, status: str, details: str, wall_time: float):
+        self.job = job
+        # PASS, FAIL, SKIP, CRASH or TIMEOUT
+        self.status = status
+        self.details = details
+        self.wall_time = wall_time
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"suite": self.job.suite, "file": self.job.name, "status": self.status,
+                "details": self.details, "time": round(self.wall_time, 6)}
+
+
+def collect_jobs(suites: List[str]) -> List[Job]:
+    jobs = []
+    for suite in suites:
+        if suite == "interpreter":
+            groups = [("positive", True)]
+        else:
+            groups = [("positive", True), ("negative", False)]
+        for directory, expect_success in groups:
+            for f in sorted((TESTS_DIR / directory).glob("*.cpp")):
+                jobs.append(Job(len(jobs), suite, f, expect_success))
+    return jobs
+
+
+# Worker side
+
+def run_job(job: Job, options: Dict[str, str]) -> Tuple[str, str]:
+    if job.suite == "interpreter":
+        from interpreter import check_file
+        return check_file(job.path, options["engine"], options["lexer"], options["parser"], options["optimize"])
+
+    from semantic import test_single_file
+    status, error_msg = test_single_file(job.path, job.expect_success)
+    if status.startswith("FAIL") and status != "FAIL":
+        # "FAIL (Unexpected success)"
+        return "FAIL", "    " + status[5:].strip("()")
+    return status, f"    {error_msg}" if error_msg else ""
+
+
+def worker_main(conn: Connection, options: Dict[str, str]):
+    # Loaded once per worker, not once per file
+    import gen.MiniCParser  # noqa: F401
+    import semantic  # noqa: F401
+    import interpreter  # noqa: F401
+
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        start = time.perf_counter()
+        try:
+            status, details = run_job(job, options)
+        except BaseException as e:
+            status, details = "CRASH", f"    {type(e).__name__}: {e}"
+        conn.send((status, details, time.perf_counter() - start))
+
+
+# Parent side
+
+class Worker:
+    def __init__(self, options: Dict[str, str]):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=worker_main, args=(child_conn, options), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.job: Optional[Job] = None
+        self.started = 0.0
+
+    def submit(self, job: Job):
+        self.job = job
+        self.started = time.perf_counter()
+        self.conn.send(job)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+def run_parallel(jobs: List[Job], options: Dict[str, str], workers: int, timeout: float,
+                 on_result=None) -> List[Result]:
+    """Run all jobs on `workers` processes; on_result is called as results arrive"""
+    pending = list(reversed(jobs))
+    results: List[Result] = []
+    pool = [Worker(options) for _ in range(max(1, min(workers, len(jobs))))]
+
+    def finish(result: Result):
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    try:
+        while pending or any(w.job is not None for w in pool):
+            for w in pool:
+                if w.job is None and pending:
+                    w.submit(pending.pop())
+
+            busy = [w for w in pool if w.job is not None]
+            now = time.perf_counter()
+            next_deadline = min(w.started + timeout for w in busy)
+            ready = wait([w.conn for w in busy], max(0.0, next_deadline - now))
+
+            now = time.perf_counter()
+            for i, w in enumerate(pool):
+                if w.job is None:
+                    continue
+                if w.conn in ready:
+                    job, w.job = w.job, None
+                    try:
+                        status, details, elapsed = w.conn.recv()
+                    except EOFError:
+                        # The worker died (e.g. killed by the OS)
+                        status, details, elapsed = "CRASH", "    worker process exited", now - w.started
+                        w.kill()
+                        pool[i] = Worker(options)
+                    finish(Result(job, status, details, elapsed))
+                elif now - w.started >= timeout:
+                    finish(Result(w.job, "TIMEOUT", f"    no result after {timeout:g} s", now - w.started))
+                    w.kill()
+                    pool[i] = Worker(options)
+    finally:
+        for w in pool:
+            w.stop()
+
+    results.sort(key=lambda r: r.job.index)
+    return results
+
+
+# Reports
+
+def summarize(results: List[Result]) -> Dict[str, Dict[str, int]]:
+    """Passed/total per suite and test directory, skipped files not counted"""
+    summary: Dict[str, Dict[str, int]] = {}
+    for r in results:
+        if r.status == "SKIP":
+            continue
+        counts = summary.setdefault(f"{r.job.suite}/{r.job.path.parent.name}", {"passed": 0, "total": 0})
+        counts["total"] += 1
+        if r.status == "PASS":
+            counts["passed"] += 1
+    return summary
+
+
+def write_json(path: Path, results: List[Result], options: Dict[str, Any], wall_time: float):
+    report = {
+        "options": options,
+        "wall_time": round(wall_time, 6),
+        "summary": summarize(results),
+        "results": [r.to_json() for r in results],
+    }
+    path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+def write_junit(path: Path, results: List[Result], wall_time: float):
+    root = ET.Element("testsuites", time=f"{wall_time:.3f}")
+    for suite in SUITES:
+        suite_results = [r for r in results if r.job.suite == suite]
+        if not suite_results:
+            continue
+        element = ET.SubElement(root, "testsuite", name=suite)
+        counts = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0}
+        for r in suite_results:
+            case = ET.SubElement(element, "testcase", classname=f"{suite}.{r.job.path.parent.name}",
+                                 name=r.job.path.name, time=f"{r.wall_time:.3f}")
+            counts["tests"] += 1
+            if r.status == "FAIL":
+                counts["failures"] += 1
+                ET.SubElement(case, "failure", message="FAIL").text = r.details
+            elif r.status in ("CRASH", "TIMEOUT"):
+                counts["errors"] += 1
+                ET.SubElement(case, "error", message=r.status).text = r.details
+            elif r.status == "SKIP":
+                counts["skipped"] += 1
+                ET.SubElement(case, "skipped", message="no EXPECT comment")
+        for key, value in counts.items():
+            element.set(key, str(value))
+        element.set("time", f"{sum(r.wall_time for r in suite_results):.3f}")
+    ET.indent(root)
+    ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def print_result(result: Result):
+    print(f"  [{result.status}] {result.job.suite}: {result.job.name} ({result.wall_time * 1000:.0f} ms)")
+    if result.details:
+        print(result.details)
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    import argparse
+    from interpreter import ENGINES
+    from fast_lexer import LEXERS
+    from fast_parser import PARSERS
+
+    arg_parser = argparse.ArgumentParser(description="Parallel MiniC test-suite runner")
+    arg_parser.add_argument("suites", nargs="*",
+                            help=f"suites to run: {', '.join(SUITES)} (default: all)")
+    arg_parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                            help="worker processes (default: one per CPU)")
+    arg_parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                            help=f"seconds per file before it is killed (default: {DEFAULT_TIMEOUT:g})")
+    arg_parser.add_argument("--engine", choices=ENGINES, default="tree")
+    arg_parser.add_argument("--lexer", choices=LEXERS, default="fast")
+    arg_parser.add_argument("--parser", choices=PARSERS, default="fast")
+    arg_parser.add_argument("--optimize", "-O", action="store_true",
+                            help="run the interpreter suite with the optimizer pass")
+    arg_parser.add_argument("--json", type=Path, help="write a JSON report to this file")
+    arg_parser.add_argument("--junit", type=Path, help="write a JUnit XML report to this file")
+    args = arg_parser.parse_args()
+    unknown = [s for s in args.suites if s not in SUITES]
+    if unknown:
+        arg_parser.error(f"unknown suite(s): {', '.join(unknown)}")
+
+    options = {"engine": args.engine, "lexer": args.lexer, "parser": args.parser, "optimize": args.optimize}
+    jobs = collect_jobs(args.suites or list(SUITES))
+    print(f"Running {len(jobs)} files on {min(args.jobs, len(jobs))} workers:")
+    start = time.perf_counter()
+    results = run_parallel(jobs, options, args.jobs, args.timeout, print_result)
+    wall_time = time.perf_counter() - start
+
+    summary = summarize(results)
+    print()
+    for key, counts in summary.items():
+        print(f"Summary {key}: {counts['passed']}/{counts['total']}")
+    print(f"Wall time: {wall_time:.2f} s (files: {sum(r.wall_time for r in results):.2f} s)")
+
+    if args.json:
+        write_json(args.json, results, {**options, "jobs": args.jobs, "timeout": args.timeout}, wall_time)
+    if args.junit:
+        write_junit(args.junit, results, wall_time)
+    sys.exit(0 if all(c["passed"] == c["total"] for c in summary.values()) else 1)
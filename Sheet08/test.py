@@ -1,6 +1,7 @@
-from gen.MiniCParser import MiniCParser
 from gen.MiniCLexer import MiniCLexer
+from antlr_frontend import parse_rule, warm_up, stats
 import sys
+import time
 from pathlib import Path
 from antlr4 import *
 from antlr4.error.ErrorListener import ErrorListener
@@ -17,26 +18,34 @@ class MyErrorListener(ErrorListener):
 def run_suite(path):
     print(f"\nTesting {path.name}:")
     valid = 0
+    parse_time = 0.0
     files = sorted(path.glob("*.cpp"))
     for f in files:
-        parser = MiniCParser(CommonTokenStream(
-            MiniCLexer(FileStream(str(f), encoding="utf-8"))))
+        token_stream = CommonTokenStream(
+            MiniCLexer(FileStream(str(f), encoding="utf-8")))
+        # Lex up front so the time below is parsing only
+        token_stream.fill()
         errs = MyErrorListener()
-        parser.removeErrorListeners()
-        parser.addErrorListener(errs)
-        parser.program()
+        start = time.perf_counter()
+        parse_rule(token_stream, "program", errs)
+        elapsed = time.perf_counter() - start
+        parse_time += elapsed
 
         status = "PASS" if not errs.errors else "FAIL"
-        print(f"  [{status}] {f.name}")
+        print(f"  [{status}] {f.name} ({elapsed * 1000:.1f} ms)")
         for e in errs.errors[:3]:
             print(f"    {e}")
         if not errs.errors:
             valid += 1
+    print(f"  parse time: {parse_time * 1000:.1f} ms")
     return valid, len(files)
 
 
 if __name__ == "__main__":
+    # Learn the prediction DFA once, before the per-file times are taken
+    warm_up()
     base = Path(__file__).parent / "tests"
     p_v, p_t = run_suite(base / "positive")
     n_v, n_t = run_suite(base / "negative")
     print(f"\nSummary: Positive {p_v}/{p_t}, Negative {n_v}/{n_t}")
+    print(f"SLL parses: {stats.sll_parses}, LL fallbacks: {stats.ll_fallbacks}")
@@ -0,0 +1,23 @@
+#include "hsbi_runtime.h"
+
+// Tief geschachtelte Aufrufargumente: jedes Argument wird nur einmal analysiert
+
+int inc(int x) { return x + 1; }
+
+class Counter {
+public:
+  int add(int a, int b) { return a + b; }
+};
+
+int main() {
+  print_int(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(inc(0)))))))))))))))))))))))));   // 24
+
+  Counter c;
+  print_int(c.add(c.add(c.add(c.add(c.add(c.add(c.add(c.add(c.add(c.add(c.add(c.add(c.add(c.add(c.add(c.add(1, 1), 1), 1), 1), 1), 1), 1), 1), 1), 1), 1), 1), 1), 1), 1), 1));   // 17
+
+  return 0;
+}
+/* EXPECT (Zeile für Zeile):
+24
+17
+*/
@@ -0,0 +1,492 @@
+from __future__ import annotations
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from gen import AST
+from interpreter import (Interpreter, RuntimeError, ObjectValue, ClassLayout,
+                         ReferenceValue, FieldReferenceValue)
+from resolver import SlotResolver
+from bytecode import (
+    CodeObject, MethodSite, FUNCTION, METHOD, CONSTRUCTOR, COPY_CODE, BINARY_OPERATORS,
+    compile_function, compile_session, compile_field_initializers, disassemble,
+    LOAD_CONST, LOAD_LOCAL, STORE_LOCAL, ASSIGN_LOCAL, LOAD_REF, LOAD_FIELD_REF, POP, EXPR_STMT,
+    BINARY_OP, UNARY_NOT, UNARY_NEG, UNARY_POS, TO_BOOL, JUMP, POP_JUMP_IF_FALSE,
+    POP_JUMP_IF_TRUE, CALL, CALL_BY_NAME, CALL_BUILTIN, CALL_METHOD, VCALL, RET, NEW, GETFIELD,
+    SETFIELD, SLICE, LOAD_THIS_FIELD, ASSIGN_THIS_FIELD, INIT_FIELD, INIT_PARENT, COPY_FIELDS, RAISE,
+    LOAD_THIS, TAIL_CALL)
+
+
+"""
+MiniC Stack VM
+
+Executes the bytecode produced by bytecode.py. All MiniC calls (functions,
+methods, constructors and field initializers) run in a single dispatch loop
+with heap-allocated frames, so the Python stack does not grow with the
+MiniC call depth. TAIL_CALL reuses the current frame, so tail recursion
+does not grow the frame list either.
+
+The call depth is limited only by memory and by max_depth (--max-depth,
+DEFAULT_MAX_DEPTH nested frames): a deeper program fails with a MiniC
+"Stack overflow" RuntimeError instead of exhausting the memory.
+
+The VM keeps the semantics of the tree-walking Interpreter: reference
+parameters and variables, slicing copies, virtual dispatch on the dynamic
+type and overloads resolved by the semantic analysis.
+"""
+
+
+# Nested frames (calls, constructors, field initializers) per execution; about 300 MB
+DEFAULT_MAX_DEPTH = 1_000_000
+
+
+class VirtualMachine(Interpreter):
+    """Compiles MiniC to bytecode and runs it on a stack machine"""
+
+    def __init__(self, node_symbols: Dict[Any, Any] = None, max_depth: int = DEFAULT_MAX_DEPTH):
+        super().__init__(node_symbols)
+        self.max_depth = max_depth
+        self.codes: Dict[str, Dict[Any, CodeObject]] = {
+            FUNCTION: {}, METHOD: {}, CONSTRUCTOR: {}}
+        # class name -> code evaluating non-literal field initializers
+        self.init_codes: Dict[str, CodeObject] = {}
+        self.resolver = SlotResolver(self.classes, self.node_symbols)
+        # Session variables (main body and REPL statements) live in numbered slots too
+        self.session_locals: List[Any] = []
+
+    def interpret(self, ast: AST.Program):
+        """Interpret the program"""
+        for decl in ast.declarations:
+            self.register_declaration(decl)
+
+        if 'main' in self.functions:
+            main_func = self.functions['main'][0][0]
+            # Execute main body in the session scope
+            self.run_session(main_func.body, "main")
+
+    def visit_repl_node(self, node: Union[AST.Declaration, AST.Statement]):
+        """Execute a single node (declaration or statement) in REPL mode"""
+        if isinstance(node, (AST.Statement, AST.VariableDeclaration)):
+            self.run_session([node], "<repl>")
+        else:
+            self.register_declaration(node)
+
+    def forget(self, nodes):
+        for table in self.codes.values():
+            for node in nodes:
+                table.pop(node, None)
+        super().forget(nodes)
+
+    def visit_statement(self, stmt: AST.Statement):
+        return self.run_session([stmt], "<stmt>")
+
+    def run_session(self, stmts: List[AST.Statement], name: str) -> Any:
+        code = self.compile_session(stmts, name)
+        locals_ = self.session_locals
+        if len(locals_) < code.nlocals:
+            locals_.extend([None] * (code.nlocals - len(locals_)))
+        return self.execute(code, locals_)
+
+    def invalidate_class_caches(self):
+        super().invalidate_class_caches()
+        self.init_codes.clear()
+
+    # Compilation
+
+    def compile_session(self, stmts: List[AST.Statement], name: str) -> CodeObject:
+        return compile_session(self, self.resolver, stmts, name)
+
+    def code_for(self, node: Any, kind: str) -> CodeObject:
+        """Compiled body of a function, method or constructor (compiled on first use)"""
+        codes = self.codes[kind]
+        code = codes.get(node)
+        if code is None:
+            code = compile_function(self, self.resolver, node, kind)
+            codes[node] = code
+        return code
+
+    def init_code_for(self, layout: ClassLayout) -> CodeObject:
+        code = self.init_codes.get(layout.class_name)
+        if code is None:
+            code = self.init_codes[layout.class_name] = compile_field_initializers(
+                self, layout)
+        return code
+
+    # Runtime helpers
+
+    def resolve_method(self, site: MethodSite, obj: ObjectValue) -> AST.MethodDefinition:
+        """Method executed by a VCALL on the given receiver"""
+        if site.method is None:
+            # Call without symbol: look the method up by name
+            class_def = self.classes.get(obj.class_name)
+            if not class_def:
+                raise RuntimeError(f"Class '{obj.class_name}' not found.")
+            method = self.lookup_method(site.cache, obj.class_name, site.name)
+            if not method:
+                raise RuntimeError(
+                    f"Method '{site.name}' not found in class '{obj.class_name}'.")
+            return method
+
+        # Look for the method in the dynamic type
+        actual_method = self.lookup_method(site.cache, obj.class_name, site.name)
+        return actual_method or site.method
+
+    def stack_overflow(self, code: CodeObject) -> RuntimeError:
+        return RuntimeError(f"Stack overflow: more than {self.max_depth} nested calls (calling {code.name})")
+
+    # Dispatch loop
+
+    def execute(self, code: CodeObject, locals_: List[Any], this: Optional[ObjectValue] = None) -> Any:
+        """Run code until its frame returns and return the result"""
+        truthy = self.is_truthy
+        binary_operators = BINARY_OPERATORS
+        max_depth = self.max_depth
+        # Saved frames: (code, pc, locals, stack, this, discard result)
+        frames: List[tuple] = []
+
+        instructions = code.instructions
+        constants = code.constants
+        stack: List[Any] = []
+        discard = False
+        pc = 0
+
+        while True:
+            op = instructions[pc]
+            arg = instructions[pc + 1]
+            pc += 2
+
+            if op == LOAD_LOCAL:
+                value = locals_[arg]
+                # If it's a reference, get the referenced value
+                if isinstance(value, ReferenceValue):
+                    value = value.get()
+                stack.append(value)
+
+            elif op == LOAD_CONST:
+                stack.append(constants[arg])
+
+            elif op == BINARY_OP:
+                right = stack.pop()
+                stack[-1] = binary_operators[arg](stack[-1], right)
+
+            elif op == POP_JUMP_IF_FALSE:
+                value = stack.pop()
+                if value is not True and (value is False or not truthy(value)):
+                    pc = arg
+
+            elif op == ASSIGN_LOCAL:
+                value = stack[-1]
+                target = locals_[arg]
+                if isinstance(target, ReferenceValue):
+                    target.set(value)
+                elif isinstance(target, ObjectValue) and isinstance(value, ObjectValue):
+                    # For object assignment, copy the fields
+                    self.copy_fields(target, value)
+                else:
+                    locals_[arg] = value
+
+            elif op == STORE_LOCAL:
+                locals_[arg] = stack.pop()
+
+            elif op == EXPR_STMT:
+                value = stack.pop()
+                if self.repl_mode and value is not None:
+                    print(value)
+
+            elif op == JUMP:
+                pc = arg
+
+            elif op == CALL:
+                site = constants[arg]
+                callee = site.code
+                if callee is None:
+                    callee = site.code = self.code_for(site.node, FUNCTION)
+                if len(frames) >= max_depth:
+                    raise self.stack_overflow(callee)
+                argc = site.argc
+                base = len(stack) - argc
+                new_locals = stack[base:]
+                del stack[base:]
+                new_locals.extend(callee.padding)
+
+                frames.append((code, pc, locals_, stack, this, discard))
+                code, pc, locals_, stack, this, discard = callee, 0, new_locals, [], None, False
+                instructions = code.instructions
+                constants = code.constants
+
+            elif op == TAIL_CALL:
+                # The frame is reused: the arguments become the new locals
+                base = len(stack) - arg
+                locals_ = stack[base:]
+                locals_.extend(code.padding)
+                stack = []
+                pc = 0
+
+            elif op == RET:
+                value = stack.pop()
+                if not frames:
+                    return value
+                result_wanted = not discard
+                code, pc, locals_, stack, this, discard = frames.pop()
+                instructions = code.instructions
+                constants = code.constants
+                if result_wanted:
+                    stack.append(value)
+
+            elif op == CALL_BUILTIN:
+                site = constants[arg]
+                base = len(stack) - site.argc
+                args = stack[base:]
+                del stack[base:]
+                site.function(*args)
+                stack.append(None)
+
+            elif op == GETFIELD:
+                obj = stack[-1]
+                if not isinstance(obj, ObjectValue):
+                    raise RuntimeError("Cannot access member of non-object")
+                site = constants[arg]
+                if obj.layout is not site.layout:
+                    site.index = self.field_index(obj, site.name)
+                    site.layout = obj.layout
+                stack[-1] = obj.values[site.index]
+
+            elif op == SETFIELD:
+                obj = stack.pop()
+                if not isinstance(obj, ObjectValue):
+                    raise RuntimeError("Cannot access member of non-object")
+                site = constants[arg]
+                if obj.layout is not site.layout:
+                    site.index = self.field_index(obj, site.name)
+                    site.layout = obj.layout
+                obj.values[site.index] = stack[-1]
+
+            elif op == CALL_METHOD or op == VCALL:
+                site = constants[arg]
+                base = len(stack) - site.argc
+                new_locals = stack[base:]
+                del stack[base:]
+                obj = stack.pop()
+                if not isinstance(obj, ObjectValue):
+                    raise RuntimeError("Cannot call method on non-object")
+
+                if op == VCALL:
+                    callee = self.code_for(
+                        self.resolve_method(site, obj), METHOD)
+                else:
+                    callee = site.code
+                    if callee is None:
+                        callee = site.code = self.code_for(site.method, METHOD)
+                if len(frames) >= max_depth:
+                    raise self.stack_overflow(callee)
+                new_locals.extend(callee.padding)
+
+                frames.append((code, pc, locals_, stack, this, discard))
+                code, pc, locals_, stack, this, discard = callee, 0, new_locals, [], obj, False
+                instructions = code.instructions
+                constants = code.constants
+
+            elif op == LOAD_THIS_FIELD:
+                site = constants[arg]
+                if this.layout is not site.layout:
+                    site.index = self.field_index(this, site.name)
+                    site.layout = this.layout
+                stack.append(this.values[site.index])
+
+            elif op == ASSIGN_THIS_FIELD:
+                site = constants[arg]
+                if this.layout is not site.layout:
+                    site.index = self.field_index(this, site.name)
+                    site.layout = this.layout
+                value = stack[-1]
+                target = this.values[site.index]
+                if isinstance(target, ObjectValue) and isinstance(value, ObjectValue):
+                    # For object assignment, copy the fields
+                    self.copy_fields(target, value)
+                else:
+                    this.values[site.index] = value
+
+            elif op == LOAD_THIS:
+                stack.append(this)
+
+            elif op == NEW:
+                site = constants[arg]
+                layout = self.layout_for(site.class_name)
+                base = len(stack) - site.argc
+                args = stack[base:]
+                del stack[base:]
+
+                defaults = layout.defaults
+                obj = ObjectValue(layout, defaults.copy() if defaults is not None
+                                  else [None] * len(layout.field_names))
+                stack.append(obj)
+
+                # Frames still to run on the new object, in execution order
+                pending = []
+                if defaults is None:
+                    pending.append((self.init_code_for(layout), 0, [], [], obj, True))
+                if layout.parent_ctor is not None:
+                    ctor_code = self.code_for(layout.parent_ctor, CONSTRUCTOR)
+                    pending.append(
+                        (ctor_code, 0, list(ctor_code.padding), [], obj, True))
+
+                if len(args) == 1 and isinstance(args[0], ObjectValue) and args[0].class_name == site.class_name:
+                    # Implicit copy constructor
+                    if pending:
+                        pending.append((COPY_CODE, 0, args, [], obj, True))
+                    else:
+                        self.copy_fields(obj, args[0])
+                else:
+                    ctor = layout.constructors.get(len(args))
+                    if ctor is not None:
+                        ctor_code = self.code_for(ctor, CONSTRUCTOR)
+                        args.extend(ctor_code.padding)
+                        pending.append((ctor_code, 0, args, [], obj, True))
+
+                if pending:
+                    if len(frames) + len(pending) > max_depth:
+                        raise self.stack_overflow(pending[-1][0])
+                    frames.append((code, pc, locals_, stack, this, discard))
+                    for frame in reversed(pending[1:]):
+                        frames.append(frame)
+                    code, pc, locals_, stack, this, discard = pending[0]
+                    instructions = code.instructions
+                    constants = code.constants
+
+            elif op == POP_JUMP_IF_TRUE:
+                value = stack.pop()
+                if value is True or (value is not False and truthy(value)):
+                    pc = arg
+
+            elif op == TO_BOOL:
+                stack[-1] = truthy(stack[-1])
+
+            elif op == UNARY_NOT:
+                stack[-1] = not truthy(stack[-1])
+
+            elif op == UNARY_NEG:
+                stack[-1] = -stack[-1]
+
+            elif op == UNARY_POS:
+                stack[-1] = +stack[-1]
+
+            elif op == LOAD_REF:
+                value = locals_[arg]
+                if isinstance(value, ReferenceValue):
+                    # Passing a reference parameter on: no chain of references
+                    stack.append(value)
+                else:
+                    stack.append(ReferenceValue(arg, locals_))
+
+            elif op == LOAD_FIELD_REF:
+                obj = stack[-1]
+                if not isinstance(obj, ObjectValue):
+                    raise RuntimeError(
+                        "Cannot initialize reference with non-object member access.")
+                stack[-1] = FieldReferenceValue(obj, constants[arg])
+
+            elif op == SLICE:
+                value = stack[-1]
+                class_name = constants[arg]
+                # Slice if a derived object is assigned to a base variable
+                if isinstance(value, ObjectValue) and value.class_name != class_name:
+                    if self.is_subclass(value.class_name, class_name):
+                        stack[-1] = self.slice_object(value, class_name)
+
+            elif op == INIT_FIELD:
+                this.values[arg] = stack.pop()
+
+            elif op == INIT_PARENT:
+                site = constants[arg]
+                callee = site.code
+                if callee is None:
+                    callee = site.code = self.code_for(site.node, CONSTRUCTOR)
+                if len(frames) >= max_depth:
+                    raise self.stack_overflow(callee)
+                frames.append((code, pc, locals_, stack, this, discard))
+                code, pc, locals_, stack, discard = callee, 0, list(
+                    callee.padding), [], True
+                instructions = code.instructions
+                constants = code.constants
+
+            elif op == COPY_FIELDS:
+                self.copy_fields(this, locals_[0])
+
+            elif op == CALL_BY_NAME:
+                site = constants[arg]
+                callee = None
+                for func_def, closure in self.functions.get(site.name, []):
+                    if len(func_def.parameters) == site.argc:
+                        callee = self.code_for(func_def, FUNCTION)
+                        break
+                if callee is None:
+                    raise RuntimeError(f"Unknown function '{site.name}'.")
+                if len(frames) >= max_depth:
+                    raise self.stack_overflow(callee)
+                base = len(stack) - site.argc
+                new_locals = stack[base:]
+                del stack[base:]
+                new_locals.extend(callee.padding)
+
+                frames.append((code, pc, locals_, stack, this, discard))
+                code, pc, locals_, stack, this, discard = callee, 0, new_locals, [], None, False
+                instructions = code.instructions
+                constants = code.constants
+
+            elif op == POP:
+                stack.pop()
+
+            elif op == RAISE:
+                raise RuntimeError(constants[arg])
+
+            else:
+                raise RuntimeError(f"Unknown opcode {op} in {code.name}")
+
+
+def disassemble_program(path: Path) -> str:
+    """Disassemble all functions, methods and constructors of a program"""
+    from interpreter import load_program
+
+    ast, analyzer = load_program(path)
+    vm = VirtualMachine(analyzer.node_symbols)
+    for decl in ast.declarations:
+        vm.register_declaration(decl)
+
+    listings = []
+    for decl in ast.declarations:
+        if isinstance(decl, AST.FunctionDefinition):
+            listings.append(disassemble(vm.code_for(decl, FUNCTION)))
+        elif isinstance(decl, AST.ClassDefinition):
+            layout = vm.layout_for(decl.name)
+            if layout.defaults is None:
+                listings.append(disassemble(vm.init_code_for(layout)))
+            for member in decl.members:
+                if isinstance(member, AST.MethodDefinition):
+                    listings.append(disassemble(vm.code_for(member, METHOD)))
+                elif isinstance(member, AST.ConstructorDefinition):
+                    listings.append(disassemble(
+                        vm.code_for(member, CONSTRUCTOR)))
+    return "\n\n".join(listings)
+
+
+if __name__ == "__main__":
+    import argparse
+    from interpreter import run_interpreter
+    from semantic import SemanticError
+
+    arg_parser = argparse.ArgumentParser(description="MiniC bytecode VM")
+    arg_parser.add_argument("file", help="MiniC source file")
+    arg_parser.add_argument("--dis", action="store_true",
+                            help="print the bytecode instead of running the program")
+    args = arg_parser.parse_args()
+
+    if args.dis:
+        try:
+            print(disassemble_program(Path(args.file)))
+        except SemanticError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    else:
+        success, output = run_interpreter(Path(args.file), "vm")
+        print(output)
+        sys.exit(0 if success else 1)